@@ -0,0 +1,10 @@
+-- Lease-based claiming for the utility-lineage worker.
+-- Workers set claimed_by/lease_expires_at in the same UPDATE that selects events, then
+-- commit; an expired lease makes the event claimable again.
+ALTER TABLE outbox_events
+    ADD COLUMN IF NOT EXISTS claimed_by TEXT,
+    ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMPTZ;
+
+CREATE INDEX IF NOT EXISTS outbox_events_pending_created_at_idx
+    ON outbox_events (created_at)
+    WHERE processed_at IS NULL;
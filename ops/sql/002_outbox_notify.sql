@@ -0,0 +1,18 @@
+-- Wake-up notifications for the utility-lineage worker (OUTBOX_LISTEN=true).
+-- One notification per INSERT statement; the payload is informational only because the
+-- worker always claims from outbox_events itself. The channel below must match
+-- OUTBOX_LISTEN_CHANNEL (default outbox_events); edit it here if you change the setting, or the
+-- worker never hears a notification and falls back to polling (it logs a warning when that happens).
+CREATE OR REPLACE FUNCTION notify_outbox_events() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('outbox_events', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS outbox_events_notify ON outbox_events;
+CREATE TRIGGER outbox_events_notify
+    AFTER INSERT ON outbox_events
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_outbox_events();
@@ -0,0 +1,4 @@
+-- Dimension-name cache invalidation: the worker reads recent vendors/products events
+-- (processed or not) by table_name and created_at on every mapping load.
+CREATE INDEX IF NOT EXISTS outbox_events_table_created_at_idx
+    ON outbox_events (table_name, created_at);
@@ -0,0 +1,16 @@
+-- Retry scheduling and dead-lettering for the utility-lineage worker.
+-- A failed event is not claimable again until next_attempt_at (exponential backoff with
+-- jitter); once it has used up MAX_ATTEMPTS it is moved to outbox_dead_letters, where
+-- `python -m src.workers.dead_letters` can inspect and requeue it.
+ALTER TABLE outbox_events
+    ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMPTZ;
+
+CREATE TABLE IF NOT EXISTS outbox_dead_letters (
+    LIKE outbox_events INCLUDING DEFAULTS
+);
+
+ALTER TABLE outbox_dead_letters
+    ADD COLUMN IF NOT EXISTS dead_lettered_at TIMESTAMPTZ NOT NULL DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS outbox_dead_letters_dead_lettered_at_idx
+    ON outbox_dead_letters (dead_lettered_at DESC);
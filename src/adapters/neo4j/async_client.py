@@ -0,0 +1,174 @@
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from neo4j import AsyncGraphDatabase, AsyncManagedTransaction
+from neo4j.exceptions import TransientError
+
+from src.adapters.neo4j.client import LOCK_ERROR_CODES, driver_options
+from src.utils import metrics, profiler
+
+
+class AsyncNeo4jClient:
+    """``Neo4jClient`` on the asyncio driver: same methods as coroutines, same stats and metrics.
+
+    Calls inside ``session_scope`` share one session. Slow operations are recorded without a
+    ``PROFILE`` plan; re-running the statement would need the event loop the recorder is
+    called from.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        user: str,
+        password: str,
+        write_batch_size: int = 500,
+        max_connection_pool_size: int = 100,
+        **driver_config: Any,
+    ):
+        self._driver = AsyncGraphDatabase.driver(
+            uri,
+            auth=(user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            **driver_config,
+        )
+        self.sessions_in_use = 0
+        metrics.recorder().set("neo4j_pool_max", max_connection_pool_size)
+        # Rows per UNWIND transaction; the runner may retune it while running.
+        self.write_batch_size = write_batch_size
+        # Only the event loop thread updates these, so unlike Neo4jClient there is no lock.
+        self._stats = {"writes": 0, "write_seconds": 0.0, "transient_errors": 0, "lock_errors": 0}
+        # Per asyncio task, so concurrent partitions never share a session.
+        self._scoped: ContextVar = ContextVar(f"neo4j_async_session_{id(self)}", default=None)
+
+    @classmethod
+    def from_settings(cls, settings, **overrides: Any) -> "AsyncNeo4jClient":
+        options = {"write_batch_size": settings.neo4j_write_batch_size, **driver_options(settings), **overrides}
+        return cls(settings.neo4j_uri, settings.neo4j_user, settings.neo4j_password, **options)
+
+    def write_stats(self) -> Dict[str, float]:
+        return dict(self._stats)
+
+    def _count(self, **deltas) -> None:
+        for key, delta in deltas.items():
+            self._stats[key] += delta
+
+    @asynccontextmanager
+    async def _open_session(self):
+        self.sessions_in_use += 1
+        metrics.recorder().set("neo4j_sessions_in_use", self.sessions_in_use)
+        try:
+            async with self._driver.session() as session:
+                yield session
+        finally:
+            self.sessions_in_use -= 1
+            metrics.recorder().set("neo4j_sessions_in_use", self.sessions_in_use)
+
+    @asynccontextmanager
+    async def session_scope(self) -> AsyncIterator[None]:
+        """Run the enclosed writes and reads on one session; nested scopes reuse the outer one."""
+        if self._scoped.get() is not None:
+            yield
+            return
+        async with self._open_session() as session:
+            token = self._scoped.set(session)
+            try:
+                yield
+            finally:
+                self._scoped.reset(token)
+
+    @asynccontextmanager
+    async def _session(self):
+        session = self._scoped.get()
+        if session is not None:
+            yield session
+            return
+        async with self._open_session() as session:
+            yield session
+
+    async def close(self) -> None:
+        await self._driver.close()
+
+    def _record_slow(self, kind: str, cypher: str, parameters: Dict[str, Any], elapsed: float, summary, error) -> None:
+        slow_ops = profiler.profiler()
+        if slow_ops is None or not slow_ops.is_slow(elapsed):
+            return
+        timings: Dict[str, Any] = {"error": type(error).__name__} if error is not None else {}
+        if summary is not None:
+            timings["available_after_ms"] = summary.result_available_after
+            timings["consumed_after_ms"] = summary.result_consumed_after
+        slow_ops.record(kind, cypher, parameters, elapsed, timings)
+
+    async def write(self, cypher: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        async def work(tx: AsyncManagedTransaction):
+            try:
+                result = await tx.run(cypher, **parameters)
+                records = [record.data() async for record in result]
+                return records, await result.consume()
+            except TransientError as exc:
+                lock_error = exc.code in LOCK_ERROR_CODES
+                self._count(transient_errors=1, lock_errors=int(lock_error))
+                metrics.recorder().inc("neo4j_transient_errors_total", labels={"lock": str(lock_error).lower()})
+                raise
+
+        started = time.perf_counter()
+        summary, error = None, None
+        try:
+            async with self._session() as session:
+                records, summary = await session.execute_write(work)
+            return records
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._count(writes=1, write_seconds=elapsed)
+            metrics.recorder().observe("neo4j_write_seconds", elapsed)
+            self._record_slow("neo4j_write", cypher, parameters, elapsed, summary, error)
+
+    async def write_rows(
+        self,
+        cypher: str,
+        rows: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        records: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Tuple[int, Exception]]:
+        """``Neo4jClient.write_rows``: one transaction per chunk, failed chunks replayed row by row."""
+        size = max(1, batch_size or self.write_batch_size)
+        failures: List[Tuple[int, Exception]] = []
+        async with self.session_scope():
+            for start in range(0, len(rows), size):
+                chunk = rows[start:start + size]
+                try:
+                    returned = await self.write(cypher, {"rows": chunk})
+                    if records is not None:
+                        records.extend(returned)
+                    continue
+                except Exception as exc:  # noqa: BLE001
+                    if len(chunk) == 1:
+                        failures.append((start, exc))
+                        continue
+                for offset, row in enumerate(chunk):
+                    try:
+                        returned = await self.write(cypher, {"rows": [row]})
+                        if records is not None:
+                            records.extend(returned)
+                    except Exception as exc:  # noqa: BLE001
+                        failures.append((start + offset, exc))
+        return failures
+
+    async def read(self, cypher: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        summary, error = None, None
+        try:
+            async with self._session() as session:
+                result = await session.run(cypher, **parameters)
+                records = [record.data() async for record in result]
+                summary = await result.consume()
+            return records
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._record_slow("neo4j_read", cypher, parameters, time.perf_counter() - started, summary, error)
@@ -1,26 +1,235 @@
-from typing import Any, Dict, Iterable
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from neo4j import GraphDatabase, Transaction
+from neo4j import READ_ACCESS, GraphDatabase, Transaction
+from neo4j.exceptions import TransientError
+
+from src.utils import metrics, profiler
+from src.utils.profiler import plan_summary
+
+
+# Transient error codes that mean lock contention rather than e.g. a leader switch.
+LOCK_ERROR_CODES = (
+    "Neo.TransientError.Transaction.DeadlockDetected",
+    "Neo.TransientError.Transaction.LockClientStopped",
+    "Neo.TransientError.Transaction.LockAcquisitionTimeout",
+)
+
+
+def driver_options(settings) -> Dict[str, Any]:
+    """Driver pool configuration from ``Settings``, shared by the sync and async clients."""
+    return {
+        "max_connection_pool_size": settings.neo4j_max_connection_pool_size,
+        "max_connection_lifetime": settings.neo4j_max_connection_lifetime,
+        "connection_acquisition_timeout": settings.neo4j_connection_acquisition_timeout,
+        "connection_timeout": settings.neo4j_connection_timeout,
+        "liveness_check_timeout": settings.neo4j_liveness_check_timeout,
+    }
 
 
 class Neo4jClient:
-    """Thin wrapper around the Neo4j driver to keep a consistent API."""
+    """Thin wrapper around the Neo4j driver to keep a consistent API.
+
+    Calls inside ``session_scope`` share one session instead of opening one each.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        user: str,
+        password: str,
+        write_batch_size: int = 500,
+        max_connection_pool_size: int = 100,
+        **driver_config: Any,
+    ):
+        self._driver = self._connect(
+            uri,
+            (user, password),
+            max_connection_pool_size=max_connection_pool_size,
+            **driver_config,
+        )
+        # The driver has no public pool gauges; open sessions approximate borrowed connections.
+        self.sessions_in_use = 0
+        metrics.recorder().set("neo4j_pool_max", max_connection_pool_size)
+        # Rows per UNWIND transaction; the runner may retune it while running.
+        self.write_batch_size = write_batch_size
+        self._stats = {"writes": 0, "write_seconds": 0.0, "transient_errors": 0, "lock_errors": 0}
+        self._stats_lock = threading.Lock()
+        # Per thread (and per asyncio task), so concurrent partitions never share a session.
+        self._scoped: ContextVar = ContextVar(f"neo4j_session_{id(self)}", default=None)
+
+    def _connect(self, uri: str, auth: Tuple[str, str], **config: Any):
+        return GraphDatabase.driver(uri, auth=auth, **config)
+
+    @classmethod
+    def from_settings(cls, settings, **overrides: Any) -> "Neo4jClient":
+        options = {"write_batch_size": settings.neo4j_write_batch_size, **driver_options(settings), **overrides}
+        return cls(settings.neo4j_uri, settings.neo4j_user, settings.neo4j_password, **options)
+
+    def write_stats(self) -> Dict[str, float]:
+        """Cumulative write counters: transactions, seconds spent, transient and lock errors.
 
-    def __init__(self, uri: str, user: str, password: str):
-        self._driver = GraphDatabase.driver(uri, auth=(user, password))
+        Errors are counted per attempt, including those the driver retried successfully.
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, **deltas) -> None:
+        with self._stats_lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    @contextmanager
+    def _open_session(self):
+        with self._stats_lock:
+            self.sessions_in_use += 1
+            metrics.recorder().set("neo4j_sessions_in_use", self.sessions_in_use)
+        try:
+            with self._driver.session() as session:
+                yield session
+        finally:
+            with self._stats_lock:
+                self.sessions_in_use -= 1
+                metrics.recorder().set("neo4j_sessions_in_use", self.sessions_in_use)
+
+    @contextmanager
+    def session_scope(self) -> Iterator[None]:
+        """Run the enclosed writes and reads on one session; nested scopes reuse the outer one."""
+        if self._scoped.get() is not None:
+            yield
+            return
+        with self._open_session() as session:
+            token = self._scoped.set(session)
+            try:
+                yield
+            finally:
+                self._scoped.reset(token)
+
+    @contextmanager
+    def _session(self):
+        session = self._scoped.get()
+        if session is not None:
+            yield session
+            return
+        with self._open_session() as session:
+            yield session
 
     def close(self) -> None:
         self._driver.close()
 
-    def write(self, cypher: str, parameters: Dict[str, Any]) -> None:
-        with self._driver.session() as session:
-            session.execute_write(lambda tx: tx.run(cypher, **parameters))
+    def profile(self, cypher: str, parameters: Dict[str, Any], write: bool = True) -> Optional[Dict[str, Any]]:
+        """Re-run ``cypher`` under ``PROFILE`` and return its plan without keeping any effects.
+
+        Writes run in a transaction that is explicitly rolled back; reads use a read-access
+        session so a cluster routes them to a replica.
+        """
+        if write:
+            with self._driver.session() as session:
+                # Not ``with begin_transaction()``: leaving that block commits. If the run
+                # fails, closing the session rolls the transaction back instead.
+                tx = session.begin_transaction()
+                summary = tx.run(f"PROFILE {cypher}", **parameters).consume()
+                tx.rollback()
+        else:
+            with self._driver.session(default_access_mode=READ_ACCESS) as session:
+                summary = session.run(f"PROFILE {cypher}", **parameters).consume()
+        return plan_summary(summary.profile)
+
+    def _record_slow(self, kind: str, cypher: str, parameters: Dict[str, Any], elapsed: float, summary, error) -> None:
+        slow_ops = profiler.profiler()
+        if slow_ops is None or not slow_ops.is_slow(elapsed):
+            return
+        timings: Dict[str, Any] = {"error": type(error).__name__} if error is not None else {}
+        if summary is not None:
+            timings["available_after_ms"] = summary.result_available_after
+            timings["consumed_after_ms"] = summary.result_consumed_after
+        # Never re-run a statement that failed (constraint violation, lock timeout) for a plan.
+        plan = partial(self.profile, cypher, parameters, write=kind == "neo4j_write") if error is None else None
+        slow_ops.record(kind, cypher, parameters, elapsed, timings, plan=plan)
+
+    def write(self, cypher: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Run ``cypher`` in a write transaction; returns the records it RETURNs, if any."""
+        def work(tx: Transaction):
+            try:
+                result = tx.run(cypher, **parameters)
+                records = [record.data() for record in result]
+                return records, result.consume()
+            except TransientError as exc:
+                lock_error = exc.code in LOCK_ERROR_CODES
+                self._count(transient_errors=1, lock_errors=int(lock_error))
+                metrics.recorder().inc("neo4j_transient_errors_total", labels={"lock": str(lock_error).lower()})
+                raise
+
+        started = time.perf_counter()
+        summary, error = None, None
+        try:
+            with self._session() as session:
+                records, summary = session.execute_write(work)
+            return records
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._count(writes=1, write_seconds=elapsed)
+            metrics.recorder().observe("neo4j_write_seconds", elapsed)
+            self._record_slow("neo4j_write", cypher, parameters, elapsed, summary, error)
+
+    def write_rows(
+        self,
+        cypher: str,
+        rows: List[Dict[str, Any]],
+        batch_size: Optional[int] = None,
+        records: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Tuple[int, Exception]]:
+        """Write ``rows`` through an ``UNWIND $rows`` query, one transaction per chunk.
+
+        All chunks share one session. A chunk that fails is replayed row by row so one bad
+        row doesn't fail its neighbours. Returns ``(index, exception)`` for every row that
+        still failed; records the statement RETURNs are appended to ``records``.
+        """
+        size = max(1, batch_size or self.write_batch_size)
+        failures: List[Tuple[int, Exception]] = []
+        with self.session_scope():
+            for start in range(0, len(rows), size):
+                chunk = rows[start:start + size]
+                try:
+                    returned = self.write(cypher, {"rows": chunk})
+                    if records is not None:
+                        records.extend(returned)
+                    continue
+                except Exception as exc:  # noqa: BLE001
+                    if len(chunk) == 1:
+                        failures.append((start, exc))
+                        continue
+                for offset, row in enumerate(chunk):
+                    try:
+                        returned = self.write(cypher, {"rows": [row]})
+                        if records is not None:
+                            records.extend(returned)
+                    except Exception as exc:  # noqa: BLE001
+                        failures.append((start + offset, exc))
+        return failures
 
     def write_transaction(self, fn, *args, **kwargs):
-        with self._driver.session() as session:
+        with self._session() as session:
             return session.execute_write(fn, *args, **kwargs)
 
     def read(self, cypher: str, parameters: Dict[str, Any]) -> Iterable[Dict[str, Any]]:
-        with self._driver.session() as session:
-            result = session.run(cypher, **parameters)
-            return [record.data() for record in result]
+        started = time.perf_counter()
+        summary, error = None, None
+        try:
+            with self._session() as session:
+                result = session.run(cypher, **parameters)
+                records = [record.data() for record in result]
+                summary = result.consume()
+            return records
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._record_slow("neo4j_read", cypher, parameters, time.perf_counter() - started, summary, error)
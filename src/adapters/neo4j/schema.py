@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from src.adapters.neo4j.client import Neo4jClient
+
+
+@dataclass(frozen=True)
+class SchemaRequirement:
+    """A constraint or range index that a pipeline MERGE/MATCH key depends on."""
+
+    name: str
+    label: str
+    properties: Tuple[str, ...]
+    unique: bool
+
+    def create_cypher(self) -> str:
+        props = ", ".join(f"n.{prop}" for prop in self.properties)
+        if self.unique:
+            target = props if len(self.properties) == 1 else f"({props})"
+            return f"CREATE CONSTRAINT {self.name} IF NOT EXISTS FOR (n:{self.label}) REQUIRE {target} IS UNIQUE"
+        return f"CREATE INDEX {self.name} IF NOT EXISTS FOR (n:{self.label}) ON ({props})"
+
+
+# Nodes this pipeline MERGEs get uniqueness constraints. Entity nodes (Product, Ingredient,
+# Recipe, NutritionFact) are owned by other pipelines and only MATCHed here, so a range index
+# is enough and doesn't fail on data we don't control.
+REQUIREMENTS: List[SchemaRequirement] = [
+    SchemaRequirement("lineage_run_id", "LineageRun", ("id",), unique=True),
+    SchemaRequirement("source_system_name", "SourceSystem", ("name",), unique=True),
+    SchemaRequirement("bronze_record_id", "BronzeRecord", ("id",), unique=True),
+    SchemaRequirement("silver_record_id", "SilverRecord", ("id",), unique=True),
+    SchemaRequirement("change_event_id", "ChangeEvent", ("id",), unique=True),
+    # Compaction walks ChangeEvents by changed_at and MERGEs one summary per day/table/user.
+    SchemaRequirement("change_event_changed_at", "ChangeEvent", ("changed_at",), unique=False),
+    SchemaRequirement("change_event_summary_id", "ChangeEventSummary", ("id",), unique=True),
+    SchemaRequirement("internal_user_id", "InternalUser", ("id",), unique=True),
+    SchemaRequirement("vendor_id", "Vendor", ("id",), unique=True),
+    SchemaRequirement("vendor_product_key", "VendorProduct", ("vendor_id", "vendor_product_id"), unique=True),
+    SchemaRequirement("product_id", "Product", ("id",), unique=False),
+    SchemaRequirement("ingredient_id", "Ingredient", ("id",), unique=False),
+    SchemaRequirement("recipe_id", "Recipe", ("id",), unique=False),
+    SchemaRequirement("nutrition_fact_id", "NutritionFact", ("id",), unique=False),
+]
+
+SHOW_INDEXES_CYPHER = """
+SHOW INDEXES
+YIELD name, type, entityType, labelsOrTypes, properties, owningConstraint
+WHERE entityType = 'NODE' AND type = 'RANGE'
+RETURN name, labelsOrTypes, properties, owningConstraint
+"""
+
+
+def _existing(client: Neo4jClient) -> Dict[Tuple[str, Tuple[str, ...]], bool]:
+    """(label, properties) -> whether a uniqueness constraint backs it, for every range index."""
+    existing: Dict[Tuple[str, Tuple[str, ...]], bool] = {}
+    for row in client.read(SHOW_INDEXES_CYPHER, {}):
+        labels = row.get("labelsOrTypes") or []
+        if len(labels) != 1:
+            continue
+        key = (labels[0], tuple(row.get("properties") or ()))
+        existing[key] = existing.get(key, False) or row.get("owningConstraint") is not None
+    return existing
+
+
+def missing_requirements(client: Neo4jClient) -> List[SchemaRequirement]:
+    """Requirements not covered by any existing index/constraint, whatever its name."""
+    existing = _existing(client)
+    missing = []
+    for requirement in REQUIREMENTS:
+        key = (requirement.label, requirement.properties)
+        if key not in existing or (requirement.unique and not existing[key]):
+            missing.append(requirement)
+    return missing
+
+
+def ensure_schema(client: Neo4jClient) -> List[SchemaRequirement]:
+    """Create every missing constraint/index; returns what was created. Safe to re-run."""
+    missing = missing_requirements(client)
+    for requirement in missing:
+        client.write(requirement.create_cypher(), {})
+    return missing
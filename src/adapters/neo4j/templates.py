@@ -0,0 +1,71 @@
+import functools
+import threading
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from src.adapters.neo4j.schema import REQUIREMENTS
+
+
+# Every label the pipelines interpolate into Cypher has a schema requirement behind it.
+ALLOWED_LABELS: FrozenSet[str] = frozenset(requirement.label for requirement in REQUIREMENTS)
+
+TemplateKey = Tuple[str, Tuple[Optional[str], ...]]
+
+
+class TemplateRegistry:
+    """Cypher text built once per ``(template, labels)`` and handed back as the same string.
+
+    Labels cannot be query parameters, so the per-label statements are f-strings. Building
+    each one once keeps the text Neo4j sees byte-identical between calls (one plan-cache
+    entry per label) and is the single place labels are checked against the allowlist.
+    """
+
+    def __init__(self, allowed_labels: FrozenSet[str] = ALLOWED_LABELS):
+        self.allowed_labels = allowed_labels
+        self._templates: Dict[TemplateKey, str] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, labels: Tuple[Optional[str], ...], build: Callable[[], str]) -> str:
+        """The ``name`` template for ``labels``, built with ``build()`` on first use.
+
+        Raises ``ValueError`` for a label outside the allowlist; ``None`` (no label) is allowed.
+        """
+        key = (name, labels)
+        cypher = self._templates.get(key)
+        if cypher is not None:
+            return cypher
+        for label in labels:
+            if label is not None and label not in self.allowed_labels:
+                raise ValueError(f"Label {label!r} is not allowed in Cypher template {name!r}")
+        with self._lock:
+            return self._templates.setdefault(key, build())
+
+    def names(self) -> List[TemplateKey]:
+        return sorted(self._templates, key=repr)
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+_registry = TemplateRegistry()
+
+
+def registry() -> TemplateRegistry:
+    """The process-wide template registry."""
+    return _registry
+
+
+def cypher_template(name: str):
+    """Cache a Cypher builder method in the registry, keyed by ``name`` and its label arguments.
+
+    The decorated method takes only labels (or ``None``) after ``self``, and must return the
+    same text for the same labels whichever instance calls it.
+    """
+
+    def decorate(build: Callable[..., str]) -> Callable[..., str]:
+        @functools.wraps(build)
+        def cached(self, *labels: Optional[str]) -> str:
+            return _registry.get(name, labels, lambda: build(self, *labels))
+
+        return cached
+
+    return decorate
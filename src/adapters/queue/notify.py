@@ -0,0 +1,82 @@
+import select
+from typing import Optional
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from src.utils.logging import configure_logging
+
+
+# Idle waits that timed out before a claim found events, with no notification heard at all,
+# before the listener warns that the trigger is not notifying its channel.
+MISSED_WAKEUPS_WARNING = 3
+
+
+class OutboxListener:
+    """Dedicated autocommit connection that LISTENs for outbox insert notifications.
+
+    Pairs with the trigger in ``ops/sql/002_outbox_notify.sql``. Notifications are only a
+    wake-up hint; the worker always claims from the table, so a missed or coalesced
+    notification costs latency, never correctness. The trigger's channel is fixed in that SQL
+    file; if it does not match ``channel`` nothing is ever heard and the worker silently falls
+    back to polling, so ``saw_events`` warns once events keep arriving unannounced.
+    """
+
+    def __init__(self, dsn: str, channel: str):
+        self.dsn = dsn
+        self.channel = channel
+        self.log = configure_logging("outbox_listener")
+        self.heard = 0
+        self.missed = 0
+        self._timed_out = False
+        self._conn: Optional[psycopg2.extensions.connection] = None
+
+    def _connect(self) -> psycopg2.extensions.connection:
+        if self._conn is None or self._conn.closed:
+            conn = psycopg2.connect(self.dsn)
+            conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+            self._conn = conn
+        return self._conn
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to ``timeout`` seconds; True when a notification (or reconnect) arrived."""
+        try:
+            conn = self._connect()
+            if not conn.notifies:
+                ready, _, _ = select.select([conn], [], [], timeout)
+                if not ready:
+                    self._timed_out = True
+                    return False
+                conn.poll()
+            heard = bool(conn.notifies)
+            conn.notifies.clear()
+            if heard:
+                self.heard += 1
+                self._timed_out = False
+            return heard
+        except psycopg2.Error:
+            # Anything could have been inserted while we were deaf; make the caller poll.
+            self.log.exception("Outbox listener connection failed; reconnecting", extra={"channel": self.channel})
+            self.close()
+            return True
+
+    def saw_events(self) -> None:
+        """Call when a claim found events; counts those that no notification announced."""
+        if not self._timed_out:
+            return
+        self._timed_out = False
+        self.missed += 1
+        if self.heard == 0 and self.missed == MISSED_WAKEUPS_WARNING:
+            self.log.warning(
+                "No NOTIFY received while outbox events keep arriving; polling instead. Check that "
+                "ops/sql/002_outbox_notify.sql is applied and notifies this channel",
+                extra={"channel": self.channel, "missed_wakeups": self.missed},
+            )
+
+    def close(self) -> None:
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+        self._conn = None
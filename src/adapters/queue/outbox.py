@@ -1,20 +1,50 @@
 from datetime import datetime
-from typing import Iterable, List, Optional
+from typing import Iterable, List, Optional, Sequence, Tuple
 
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
 from src.domain.models.events import OutboxEvent
 
 
-def fetch_pending_events(
-    conn,
-    batch_size: int,
+EVENT_COLUMNS = "id, aggregate_type, table_name, op, aggregate_id, payload, created_at, attempts"
+
+# outbox_events.id is a uuid; psycopg2 sends Python lists as text[], so id arrays are cast
+# with ``%s::uuid[]`` (and VALUES ids with ``%s::uuid``) or Postgres rejects uuid = text.
+
+# Columns carried between outbox_events and outbox_dead_letters.
+DEAD_LETTER_COLUMNS = f"{EVENT_COLUMNS}, error_message"
+
+# Default retry schedule: base * 2^attempts seconds, capped, with jitter.
+RETRY_BASE_SECONDS = 5.0
+RETRY_MAX_SECONDS = 900.0
+
+
+def _retry_delay_sql(base_seconds: float, max_seconds: float, attempts_column: str = "attempts") -> str:
+    """SQL for the next attempt time: exponential in the prior attempts, capped, half-jittered.
+
+    The jitter (50-100% of the delay, drawn per row) spreads out retries of events that
+    failed together, e.g. during a Neo4j outage.
+    """
+    delay = f"LEAST({float(max_seconds)}, {float(base_seconds)} * power(2, {attempts_column}))"
+    return f"NOW() + make_interval(secs => {delay} * (0.5 + random() * 0.5))"
+
+
+def _pending_filters(
     max_attempts: Optional[int] = None,
     table_names: Optional[List[str]] = None,
     aggregate_types: Optional[List[str]] = None,
-) -> List[OutboxEvent]:
-    """Fetch a batch of pending outbox events with SKIP LOCKED to support concurrency."""
-    filters = ["processed_at IS NULL"]
+    shard: Optional[Tuple[int, int]] = None,
+) -> Tuple[List[str], List]:
+    """WHERE clauses (and their params) selecting unprocessed, unleased events.
+
+    ``shard=(index, count)`` keeps only events whose aggregate hashes to ``index``, so every
+    event for one entity is always handled by the same shard.
+    """
+    filters = [
+        "processed_at IS NULL",
+        "(lease_expires_at IS NULL OR lease_expires_at < NOW())",
+        "(next_attempt_at IS NULL OR next_attempt_at <= NOW())",
+    ]
     params: List = []
 
     if max_attempts is not None:
@@ -29,9 +59,54 @@ def fetch_pending_events(
         filters.append("aggregate_type = ANY(%s)")
         params.append(aggregate_types)
 
+    if shard is not None and shard[1] > 1:
+        filters.append("mod(hashtext(aggregate_id::text) & 2147483647, %s) = %s")
+        params.extend([shard[1], shard[0]])
+
+    return filters, params
+
+
+def _claim(conn, filters: List[str], params: List, limit: int, worker_id: str, lease_seconds: int) -> List[OutboxEvent]:
     where_clause = " AND ".join(filters)
     sql = f"""
-    SELECT id, aggregate_type, table_name, op, aggregate_id, payload, created_at, attempts
+    WITH candidates AS (
+        SELECT id
+        FROM outbox_events
+        WHERE {where_clause}
+        ORDER BY created_at
+        FOR UPDATE SKIP LOCKED
+        LIMIT %s
+    )
+    UPDATE outbox_events o
+    SET claimed_by = %s,
+        lease_expires_at = NOW() + make_interval(secs => %s)
+    FROM candidates c
+    WHERE o.id = c.id
+    RETURNING o.id, o.aggregate_type, o.table_name, o.op, o.aggregate_id, o.payload, o.created_at, o.attempts;
+    """
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, [*params, limit, worker_id, lease_seconds])
+        rows = cur.fetchall()
+    # RETURNING has no defined order; restore created_at order for dispatch.
+    return sorted((OutboxEvent(**row) for row in rows), key=lambda event: event.created_at)
+
+
+def fetch_pending_events(
+    conn,
+    batch_size: int,
+    max_attempts: Optional[int] = None,
+    table_names: Optional[List[str]] = None,
+    aggregate_types: Optional[List[str]] = None,
+) -> List[OutboxEvent]:
+    """Fetch a batch of pending outbox events with SKIP LOCKED to support concurrency.
+
+    Row locks only last until the caller commits; use ``claim_pending_events`` when the
+    events are processed after the fetch transaction ends.
+    """
+    filters, params = _pending_filters(max_attempts, table_names, aggregate_types)
+    where_clause = " AND ".join(filters)
+    sql = f"""
+    SELECT {EVENT_COLUMNS}
     FROM outbox_events
     WHERE {where_clause}
     ORDER BY created_at
@@ -46,21 +121,323 @@ def fetch_pending_events(
     return [OutboxEvent(**row) for row in rows]
 
 
+def oldest_pending_age(conn, table_names: Optional[List[str]] = None) -> float:
+    """Seconds since the oldest unprocessed event was created (0 when none are pending)."""
+    where = "processed_at IS NULL" + (" AND table_name = ANY(%s)" if table_names else "")
+    sql = f"""
+    SELECT COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(created_at)), 0) AS lag
+    FROM outbox_events
+    WHERE {where};
+    """
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, [table_names] if table_names else [])
+        return float(cur.fetchone()["lag"])
+
+
+def claim_pending_events(
+    conn,
+    worker_id: str,
+    batch_size: int,
+    lease_seconds: int,
+    max_attempts: Optional[int] = None,
+    table_names: Optional[List[str]] = None,
+    aggregate_types: Optional[List[str]] = None,
+    shard: Optional[Tuple[int, int]] = None,
+) -> List[OutboxEvent]:
+    """Atomically lease a batch of pending events to ``worker_id``.
+
+    Events whose lease has expired are eligible again, so work held by a crashed worker is
+    reclaimed once its lease runs out. The caller should commit straight away; the lease,
+    not the row lock, keeps other workers off the claimed events.
+    """
+    filters, params = _pending_filters(max_attempts, table_names, aggregate_types, shard)
+    return _claim(conn, filters, params, batch_size, worker_id, lease_seconds)
+
+
+def claim_superseded_events(
+    conn,
+    worker_id: str,
+    events: List[OutboxEvent],
+    limit: int,
+    lease_seconds: int,
+    max_attempts: Optional[int] = None,
+) -> List[OutboxEvent]:
+    """Lease other pending events for the aggregates in ``events`` so they can be coalesced.
+
+    Pipelines reload current state, so any pending event for an aggregate that is about to
+    be processed is satisfied by that run and can be acked with it.
+    """
+    if not events or limit <= 0:
+        return []
+
+    keys = {(event.aggregate_type, event.aggregate_id) for event in events}
+    filters, params = _pending_filters(max_attempts)
+    filters += [
+        "aggregate_type = ANY(%s)",
+        "aggregate_id = ANY(%s)",
+        "NOT (id = ANY(%s::uuid[]))",
+    ]
+    params += [
+        sorted({agg for agg, _ in keys}),
+        sorted({agg_id for _, agg_id in keys}),
+        [event.id for event in events],
+    ]
+    claimed = _claim(conn, filters, params, limit, worker_id, lease_seconds)
+
+    # The ANY() filters over-select across type/id pairs; hand the extras straight back.
+    matched = [event for event in claimed if (event.aggregate_type, event.aggregate_id) in keys]
+    matched_ids = {event.id for event in matched}
+    release_claims(conn, worker_id, [event.id for event in claimed if event.id not in matched_ids], commit=False)
+    return matched
+
+
+def renew_leases(conn, worker_id: str, event_ids: Sequence, lease_seconds: int) -> List[str]:
+    """Extend the lease on events still claimed by ``worker_id``; returns the ids still held."""
+    if not event_ids:
+        return []
+    sql = """
+    UPDATE outbox_events
+    SET lease_expires_at = NOW() + make_interval(secs => %s)
+    WHERE id = ANY(%s::uuid[]) AND claimed_by = %s AND processed_at IS NULL
+    RETURNING id;
+    """
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, (lease_seconds, list(event_ids), worker_id))
+        held = [row["id"] for row in cur.fetchall()]
+    conn.commit()
+    return held
+
+
+def release_claims(conn, worker_id: str, event_ids: Sequence, commit: bool = True) -> None:
+    """Give unprocessed events back to the queue without counting an attempt."""
+    if event_ids:
+        sql = """
+        UPDATE outbox_events
+        SET claimed_by = NULL,
+            lease_expires_at = NULL
+        WHERE id = ANY(%s::uuid[]) AND claimed_by = %s AND processed_at IS NULL;
+        """
+        with conn.cursor() as cur:
+            cur.execute(sql, (list(event_ids), worker_id))
+    if commit:
+        conn.commit()
+
+
 def mark_processed(conn, event_id) -> None:
-    sql = "UPDATE outbox_events SET processed_at = NOW(), error_message = NULL WHERE id = %s;"
+    sql = """
+    UPDATE outbox_events
+    SET processed_at = NOW(),
+        error_message = NULL,
+        claimed_by = NULL,
+        lease_expires_at = NULL
+    WHERE id = %s;
+    """
     with conn.cursor() as cur:
         cur.execute(sql, (event_id,))
     conn.commit()
 
 
-def mark_failed(conn, event_id, error_message: str) -> None:
-    sql = """
+def mark_failed(
+    conn,
+    event_id,
+    error_message: str,
+    retry_base_seconds: float = RETRY_BASE_SECONDS,
+    retry_max_seconds: float = RETRY_MAX_SECONDS,
+) -> None:
+    sql = f"""
     UPDATE outbox_events
     SET attempts = attempts + 1,
         error_message = %s,
-        processed_at = NULL
+        processed_at = NULL,
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        next_attempt_at = {_retry_delay_sql(retry_base_seconds, retry_max_seconds)}
     WHERE id = %s;
     """
     with conn.cursor() as cur:
         cur.execute(sql, (error_message[:1000], event_id))
     conn.commit()
+
+
+def mark_processed_many(conn, event_ids: Sequence, commit: bool = True) -> None:
+    """Mark every event in ``event_ids`` processed, and release its claim, with a single UPDATE."""
+    if not event_ids:
+        return
+    sql = """
+    UPDATE outbox_events
+    SET processed_at = NOW(),
+        error_message = NULL,
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        next_attempt_at = NULL
+    WHERE id = ANY(%s::uuid[]);
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, (list(event_ids),))
+    if commit:
+        conn.commit()
+
+
+def mark_failed_many(
+    conn,
+    failures: Sequence[Tuple[str, str]],
+    commit: bool = True,
+    worker_id: Optional[str] = None,
+    retry_base_seconds: float = RETRY_BASE_SECONDS,
+    retry_max_seconds: float = RETRY_MAX_SECONDS,
+) -> None:
+    """Record ``(event_id, error_message)`` failures with a single UPDATE.
+
+    Each event is scheduled for retry with exponential backoff (``next_attempt_at``) so it
+    does not come straight back in the next claim. With ``worker_id`` only events still
+    claimed by that worker are touched, so a worker whose lease ran out cannot reset a claim
+    another worker has since taken.
+    """
+    if not failures:
+        return
+    owner_filter = "AND o.claimed_by = v.worker_id" if worker_id else ""
+    sql = f"""
+    UPDATE outbox_events AS o
+    SET attempts = o.attempts + 1,
+        error_message = v.error_message,
+        processed_at = NULL,
+        claimed_by = NULL,
+        lease_expires_at = NULL,
+        next_attempt_at = {_retry_delay_sql(retry_base_seconds, retry_max_seconds, "o.attempts")}
+    FROM (VALUES %s) AS v(id, error_message, worker_id)
+    WHERE o.id = v.id {owner_filter};
+    """
+    values = [(event_id, error_message[:1000], worker_id) for event_id, error_message in failures]
+    with conn.cursor() as cur:
+        execute_values(cur, sql, values, template="(%s::uuid, %s, %s)")
+    if commit:
+        conn.commit()
+
+
+def dead_letter_exhausted(
+    conn,
+    max_attempts: int,
+    event_ids: Optional[Sequence] = None,
+    commit: bool = True,
+) -> int:
+    """Move unprocessed events with ``attempts >= max_attempts`` to ``outbox_dead_letters``.
+
+    Restricted to ``event_ids`` when given (the usual case: a batch's failures); without it
+    every exhausted event is swept. Returns the number of events moved.
+    """
+    # claimed_by IS NULL: never pull an event out from under a worker that holds it.
+    filters = ["processed_at IS NULL", "claimed_by IS NULL", "attempts >= %s"]
+    params: List = [max_attempts]
+    if event_ids is not None:
+        if not event_ids:
+            return 0
+        filters.append("id = ANY(%s::uuid[])")
+        params.append(list(event_ids))
+    sql = f"""
+    WITH moved AS (
+        DELETE FROM outbox_events
+        WHERE {" AND ".join(filters)}
+        RETURNING {DEAD_LETTER_COLUMNS}
+    )
+    INSERT INTO outbox_dead_letters ({DEAD_LETTER_COLUMNS})
+    SELECT {DEAD_LETTER_COLUMNS} FROM moved;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        moved = cur.rowcount
+    if commit:
+        conn.commit()
+    return moved
+
+
+def list_dead_letters(conn, limit: int = 50, table_name: Optional[str] = None) -> List[dict]:
+    """Most recently dead-lettered events first."""
+    where = "WHERE table_name = %s" if table_name else ""
+    sql = f"""
+    SELECT {DEAD_LETTER_COLUMNS}, dead_lettered_at
+    FROM outbox_dead_letters
+    {where}
+    ORDER BY dead_lettered_at DESC
+    LIMIT %s;
+    """
+    params = [table_name, limit] if table_name else [limit]
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def requeue_dead_letters(
+    conn,
+    event_ids: Optional[Sequence] = None,
+    table_name: Optional[str] = None,
+    commit: bool = True,
+) -> int:
+    """Move dead-lettered events back into the outbox with a fresh attempt budget.
+
+    Selects ``event_ids`` if given, else every event (optionally for one ``table_name``).
+    Returns the number of events requeued.
+    """
+    filters: List[str] = []
+    params: List = []
+    if event_ids is not None:
+        filters.append("id = ANY(%s::uuid[])")
+        params.append(list(event_ids))
+    if table_name:
+        filters.append("table_name = %s")
+        params.append(table_name)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    sql = f"""
+    WITH moved AS (
+        DELETE FROM outbox_dead_letters
+        {where}
+        RETURNING {EVENT_COLUMNS}
+    )
+    INSERT INTO outbox_events ({EVENT_COLUMNS})
+    SELECT id, aggregate_type, table_name, op, aggregate_id, payload, created_at, 0
+    FROM moved;
+    """
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        moved = cur.rowcount
+    if commit:
+        conn.commit()
+    return moved
+
+
+def ack_events(
+    conn,
+    processed_ids: Sequence,
+    failures: Sequence[Tuple[str, str]],
+    worker_id: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+    retry_base_seconds: float = RETRY_BASE_SECONDS,
+    retry_max_seconds: float = RETRY_MAX_SECONDS,
+) -> int:
+    """Flush a batch of acks in one transaction; returns how many events were dead-lettered.
+
+    Failures are scheduled for a backed-off retry; with ``max_attempts`` those that have now
+    used up their attempts move to ``outbox_dead_letters`` instead. Everything commits
+    together or not at all: if the flush fails, none of the batch's events are acked, so they
+    are fetched again once their lease expires and replayed. Pipeline writes are MERGE/SET
+    based and therefore safe to repeat.
+    """
+    try:
+        mark_processed_many(conn, processed_ids, commit=False)
+        mark_failed_many(
+            conn,
+            failures,
+            commit=False,
+            worker_id=worker_id,
+            retry_base_seconds=retry_base_seconds,
+            retry_max_seconds=retry_max_seconds,
+        )
+        dead_lettered = 0
+        if max_attempts is not None and failures:
+            dead_lettered = dead_letter_exhausted(
+                conn, max_attempts, [event_id for event_id, _ in failures], commit=False
+            )
+        conn.commit()
+        return dead_lettered
+    except Exception:
+        conn.rollback()
+        raise
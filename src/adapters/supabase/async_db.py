@@ -0,0 +1,67 @@
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from psycopg import AsyncConnection
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from src.adapters.supabase.db import _observe
+from src.utils import metrics
+
+
+class AsyncPostgresPool:
+    """asyncio counterpart of ``PostgresPool`` on psycopg 3.
+
+    psycopg 3 uses the same ``%s`` placeholders and list-to-array adaptation as psycopg2, so
+    the pipelines' SQL builders serve both pools unchanged. Rows come back as dicts, like
+    ``RealDictCursor``. Unlike ``ThreadedConnectionPool`` an exhausted pool makes callers wait.
+    """
+
+    def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 5):
+        self._pool = AsyncConnectionPool(
+            dsn,
+            min_size=minconn,
+            max_size=maxconn,
+            kwargs={"row_factory": dict_row},
+            open=False,
+        )
+        self.maxconn = maxconn
+        self.in_use = 0
+        metrics.recorder().set("postgres_pool_max", maxconn)
+
+    async def open(self) -> None:
+        await self._pool.open()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[AsyncConnection]:
+        # One event loop thread touches the counter, so no lock is needed.
+        async with self._pool.connection() as conn:
+            self.in_use += 1
+            metrics.recorder().set("postgres_pool_in_use", self.in_use)
+            try:
+                yield conn
+            finally:
+                self.in_use -= 1
+                metrics.recorder().set("postgres_pool_in_use", self.in_use)
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+
+async def fetch_one(conn: AsyncConnection, query: str, params: Optional[tuple] = None):
+    started = time.perf_counter()
+    async with conn.cursor() as cur:
+        await cur.execute(query, params or ())
+        row = await cur.fetchone()
+    _observe("postgres_fetch_one", query, params, started, [row] if row is not None else [])
+    return row
+
+
+async def fetch_all(conn: AsyncConnection, query: str, params: Optional[tuple] = None):
+    started = time.perf_counter()
+    async with conn.cursor() as cur:
+        await cur.execute(query, params or ())
+        rows = await cur.fetchall()
+    _observe("postgres_fetch_all", query, params, started, rows)
+    return rows
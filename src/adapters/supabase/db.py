@@ -1,39 +1,94 @@
+import threading
+import time
 from contextlib import contextmanager
-from typing import Iterator, Optional
+from typing import Callable, Iterator, List, Optional
+from uuid import uuid4
 
 import psycopg2
 from psycopg2.extras import RealDictCursor
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.pool import ThreadedConnectionPool
+
+from src.utils import metrics, profiler
 
 
 class PostgresPool:
-    """Minimal connection pool for Supabase Postgres (Gold layer)."""
+    """Minimal thread-safe connection pool for Supabase Postgres (Gold layer)."""
 
     def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 5):
-        self._pool = SimpleConnectionPool(minconn, maxconn, dsn=dsn, cursor_factory=RealDictCursor)
+        self._pool = ThreadedConnectionPool(minconn, maxconn, dsn=dsn, cursor_factory=RealDictCursor)
+        self.maxconn = maxconn
+        self.in_use = 0
+        self._lock = threading.Lock()
+        metrics.recorder().set("postgres_pool_max", maxconn)
+
+    def _checked_out(self, delta: int) -> None:
+        with self._lock:
+            self.in_use += delta
+            in_use = self.in_use
+        metrics.recorder().set("postgres_pool_in_use", in_use)
 
     @contextmanager
     def connection(self) -> Iterator[psycopg2.extensions.connection]:
         conn = self._pool.getconn()
+        self._checked_out(1)
         try:
             yield conn
         finally:
             self._pool.putconn(conn)
+            self._checked_out(-1)
 
     def close(self) -> None:
         self._pool.closeall()
 
 
+# Receives (query, rows) for every fetch_one/fetch_all while set; used by traffic capture.
+_row_sink: Optional[Callable[[str, List], None]] = None
+
+
+def set_row_sink(sink: Optional[Callable[[str, List], None]]) -> None:
+    global _row_sink
+    _row_sink = sink
+
+
+def _observe(kind: str, query: str, params: Optional[tuple], started: float, rows: List) -> None:
+    elapsed = time.perf_counter() - started
+    metrics.recorder().observe("postgres_query_seconds", elapsed)
+    slow_ops = profiler.profiler()
+    if slow_ops is not None and slow_ops.is_slow(elapsed):
+        slow_ops.record(kind, query, list(params or ()), elapsed, {"rows": len(rows)})
+    sink = _row_sink
+    if sink is not None:
+        sink(query, rows)
+
+
 def fetch_one(conn, query: str, params: Optional[tuple] = None):
+    started = time.perf_counter()
     with conn.cursor() as cur:
         cur.execute(query, params or ())
-        return cur.fetchone()
+        row = cur.fetchone()
+    _observe("postgres_fetch_one", query, params, started, [row] if row is not None else [])
+    return row
 
 
 def fetch_all(conn, query: str, params: Optional[tuple] = None):
+    started = time.perf_counter()
     with conn.cursor() as cur:
         cur.execute(query, params or ())
-        return cur.fetchall()
+        rows = cur.fetchall()
+    _observe("postgres_fetch_all", query, params, started, rows)
+    return rows
+
+
+def stream_rows(conn, query: str, params: Optional[tuple] = None, itersize: int = 1000) -> Iterator:
+    """Iterate a query through a server-side named cursor so memory stays flat.
+
+    Runs inside the connection's open transaction; the caller ends it when done.
+    """
+    with conn.cursor(name=f"stream_{uuid4().hex}", cursor_factory=RealDictCursor) as cur:
+        cur.itersize = itersize
+        cur.execute(query, params or ())
+        for row in cur:
+            yield row
 
 
 def execute(conn, query: str, params: Optional[tuple] = None) -> None:
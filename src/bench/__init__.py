@@ -0,0 +1 @@
+# Placeholder package for utility-lineage
@@ -0,0 +1,482 @@
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.adapters.neo4j.client import Neo4jClient
+from src.domain.models.events import OutboxEvent
+
+
+# aggregate type -> source table, as routed by the runner
+AGGREGATE_TABLES = {
+    "lineage_entity": "data_lineage",
+    "vendor_product_mapping": "vendor_product_mappings",
+    "audit_event": "audit_log",
+    "data_quality_entity": "data_quality_scores",
+}
+
+ENTITY_TYPES = ("product", "ingredient", "recipe")
+AUDITED_TABLES = ("products", "ingredients", "recipes", "vendor_product_mappings")
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class DataShape:
+    """Knobs for the synthetic workload.
+
+    ``entities`` is the number of distinct aggregate ids per type; ``duplicate_ratio`` the
+    chance an event repeats an aggregate already emitted in the same batch (what coalescing
+    folds); ``delete_ratio`` the share of DELETE events whose source row is gone.
+    ``synced_lineage_rows`` of each entity's runs (its oldest) are already linked in the
+    graph; the rest are new.
+    """
+
+    entities: int = 1000
+    duplicate_ratio: float = 0.2
+    delete_ratio: float = 0.05
+    lineage_rows: int = 5
+    synced_lineage_rows: int = 3
+    vendors: int = 50
+    users: int = 20
+    mix: Dict[str, float] = field(
+        default_factory=lambda: {
+            "lineage_entity": 0.3,
+            "vendor_product_mapping": 0.2,
+            "audit_event": 0.3,
+            "data_quality_entity": 0.2,
+        }
+    )
+
+
+class SyntheticSource:
+    """Deterministic Supabase rows and outbox events generated from a ``DataShape``.
+
+    Rows are derived from their ids on demand, so memory reflects the pipelines under test
+    rather than the stand-in. Aggregates that received a DELETE have no source row.
+    """
+
+    def __init__(self, shape: DataShape, seed: int = 0):
+        self.shape = shape
+        self._random = random.Random(seed)
+        self._next_event = 0
+        self.missing: Set[str] = set()
+
+    def _index(self, key: str) -> int:
+        return int(key.rsplit("-", 1)[1])
+
+    def aggregate_id(self, aggregate_type: str, index: int) -> str:
+        return f"{aggregate_type}-{index:08d}"
+
+    def events(self, count: int) -> List[OutboxEvent]:
+        """One batch of outbox events following the shape's mix, duplicates and deletes."""
+        types = list(self.shape.mix)
+        weights = [self.shape.mix[agg] for agg in types]
+        emitted: List[Tuple[str, str]] = []
+        events: List[OutboxEvent] = []
+        for _ in range(count):
+            if emitted and self._random.random() < self.shape.duplicate_ratio:
+                aggregate_type, aggregate_id = self._random.choice(emitted)
+            else:
+                aggregate_type = self._random.choices(types, weights)[0]
+                aggregate_id = self.aggregate_id(aggregate_type, self._random.randrange(self.shape.entities))
+                emitted.append((aggregate_type, aggregate_id))
+
+            # Lineage runs are only ever appended; the other tables are edited in place.
+            op = "INSERT" if aggregate_type == "lineage_entity" else "UPDATE"
+            payload: Optional[Dict[str, Any]] = None
+            if self._random.random() < self.shape.delete_ratio:
+                op = "DELETE"
+                self.missing.add(aggregate_id)
+                if aggregate_type == "vendor_product_mapping":
+                    payload = self.mapping_keys(aggregate_id)
+            elif aggregate_id in self.missing:
+                op = "INSERT"
+                self.missing.discard(aggregate_id)
+
+            self._next_event += 1
+            events.append(
+                OutboxEvent(
+                    id=f"event-{self._next_event:010d}",
+                    aggregate_type=aggregate_type,
+                    table_name=AGGREGATE_TABLES[aggregate_type],
+                    op=op,
+                    aggregate_id=aggregate_id,
+                    payload=payload,
+                    created_at=EPOCH + timedelta(milliseconds=self._next_event),
+                )
+            )
+        return events
+
+    def mapping_keys(self, mapping_id: str) -> Dict[str, str]:
+        index = self._index(mapping_id)
+        return {"vendor_id": f"vendor-{index % self.shape.vendors:08d}", "vendor_product_id": f"sku-{index:08d}"}
+
+    def lineage_rows(self, entity_id: str) -> List[Dict[str, Any]]:
+        if entity_id in self.missing:
+            return []
+        index = self._index(entity_id)
+        rows = []
+        for rank in range(1, self.shape.lineage_rows + 1):
+            processed_at = EPOCH + timedelta(hours=index % 97, minutes=-rank)
+            rows.append({
+                "id": f"lineage-{index:08d}-{rank}",
+                "entity_id": entity_id,
+                "entity_type": ENTITY_TYPES[index % len(ENTITY_TYPES)],
+                "source_system": f"source-{index % 7}",
+                "transformation_applied": "normalize",
+                "ingested_at": processed_at - timedelta(minutes=5),
+                "processed_at": processed_at,
+                "created_at": processed_at,
+                "bronze_record_id": f"bronze-{index:08d}-{rank}",
+                "silver_record_id": f"silver-{index:08d}-{rank}" if rank % 2 else None,
+                "lineage_rank": rank,
+            })
+        return rows
+
+    def lineage_runs(self, entity_ids: List[str]) -> List[Dict[str, Any]]:
+        """The runs each entity is already linked to, as the graph would return them."""
+        synced = []
+        for entity_id in entity_ids:
+            rows = self.lineage_rows(entity_id)[-self.shape.synced_lineage_rows:] if self.shape.synced_lineage_rows else []
+            if rows:
+                synced.append({
+                    "entity_id": entity_id,
+                    "run_ids": [row["id"] for row in rows],
+                    "oldest": min(row["processed_at"] for row in rows),
+                })
+        return synced
+
+    def quality_row(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        if entity_id in self.missing:
+            return None
+        index = self._index(entity_id)
+        return {
+            "id": f"quality-{index:08d}",
+            "entity_id": entity_id,
+            "entity_type": ENTITY_TYPES[index % len(ENTITY_TYPES)],
+            "quality_score": (index % 100) / 100,
+            "completeness": 0.9,
+            "accuracy": 0.95,
+            "last_checked": EPOCH + timedelta(hours=index % 97),
+            "issues": [] if index % 3 else ["missing_unit"],
+            "quality_rank": 1,
+        }
+
+    def audit_row(self, audit_id: str) -> Optional[Dict[str, Any]]:
+        if audit_id in self.missing:
+            return None
+        index = self._index(audit_id)
+        return {
+            "id": audit_id,
+            "table_name": AUDITED_TABLES[index % len(AUDITED_TABLES)],
+            "record_id": f"record-{index % self.shape.entities:08d}",
+            "action": "UPDATE",
+            "changed_by": f"user-{index % self.shape.users:04d}",
+            "changed_at": EPOCH + timedelta(seconds=index),
+            "ip_address": "10.0.0.1",
+            "user_agent": "bench",
+        }
+
+    def names(self, table: str, keys: List[str]) -> List[Dict[str, Any]]:
+        return [{"id": key, "name": f"{table[:-1]} {key}"} for key in keys]
+
+    def mapping_row(self, mapping_id: str) -> Optional[Dict[str, Any]]:
+        if mapping_id in self.missing:
+            return None
+        index = self._index(mapping_id)
+        return {
+            "id": mapping_id,
+            **self.mapping_keys(mapping_id),
+            "global_product_id": f"product-{index % self.shape.entities:08d}",
+            "created_at": EPOCH,
+            "confidence_score": 0.9,
+            "mapping_method": "exact",
+        }
+
+
+class FakeCursor:
+    """Answers the pipelines' SQL from a source by routing on the table it reads.
+
+    The source is a ``SyntheticSource`` or anything with the same row lookups (e.g. replay's
+    captured rows).
+    """
+
+    def __init__(self, connection: "FakeConnection"):
+        self.connection = connection
+        self.rowcount = 0
+        self._rows: List[Dict[str, Any]] = []
+
+    def __enter__(self) -> "FakeCursor":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def mogrify(self, template, args) -> bytes:
+        # execute_values builds its VALUES list through mogrify; the text is never parsed.
+        return b"(" + b",".join(repr(arg).encode("utf-8") for arg in args) + b")"
+
+    def execute(self, query, params=None) -> None:
+        sql = query.decode("utf-8") if isinstance(query, bytes) else query
+        self.connection.pool.round_trip(sql)
+        self._rows = self._answer(" ".join(sql.split()), list(params or ()))
+        self.rowcount = len(self._rows)
+
+    def _answer(self, sql: str, params: List[Any]) -> List[Dict[str, Any]]:
+        source = self.connection.pool.source
+        keys = [str(key) for key in params[0]] if params and isinstance(params[0], list) else [str(params[0])] if params else []
+        if not sql.upper().startswith("SELECT") and not sql.upper().startswith("WITH"):
+            return []
+        if "clock_timestamp()" in sql:
+            return [{"now": datetime.now(timezone.utc)}]
+        if "FROM data_lineage" in sql:
+            return [row for key in keys for row in source.lineage_rows(key)]
+        if "FROM data_quality_scores" in sql:
+            return [row for row in (source.quality_row(key) for key in keys) if row]
+        if "FROM audit_log" in sql:
+            return [row for row in (source.audit_row(key) for key in keys) if row]
+        if "FROM vendor_product_mappings" in sql:
+            return [row for row in (source.mapping_row(key) for key in keys) if row]
+        match = re.search(r"FROM (vendors|products)\b", sql)
+        if match:
+            return source.names(match.group(1), keys)
+        return []  # outbox reads (invalidation, lag) see an otherwise empty queue
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return list(self._rows)
+
+
+class FakeConnection:
+    encoding = "UTF8"
+
+    def __init__(self, pool: "FakePostgresPool"):
+        self.pool = pool
+        self.autocommit = False
+
+    def cursor(self, name: Optional[str] = None, cursor_factory=None) -> FakeCursor:
+        return FakeCursor(self)
+
+    def commit(self) -> None:
+        self.pool.count("commit")
+
+    def rollback(self) -> None:
+        self.pool.count("rollback")
+
+
+class FakePostgresPool:
+    """Stands in for ``PostgresPool``; counts round trips by statement verb.
+
+    ``rtt_seconds`` is slept per statement to model network latency, which is what makes
+    round-trip counts matter in production.
+    """
+
+    def __init__(self, source, rtt_seconds: float = 0.0):
+        self.source = source
+        self.rtt_seconds = rtt_seconds
+        self.maxconn = 1_000
+        self.in_use = 0
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def count(self, kind: str) -> None:
+        with self._lock:
+            self.counts[kind] += 1
+
+    def round_trip(self, sql: str) -> None:
+        self.count(sql.split(None, 1)[0].lower())
+        self.count("round_trips")
+        if self.rtt_seconds:
+            time.sleep(self.rtt_seconds)
+
+    @contextmanager
+    def connection(self) -> Iterator[FakeConnection]:
+        yield FakeConnection(self)
+
+    def close(self) -> None:
+        pass
+
+
+# "RETURN [DISTINCT] row.<field> AS key" at the end of the pipelines' UNWIND statements
+RETURN_KEY = re.compile(r"RETURN\s+(?:DISTINCT\s+)?\w+\.(\w+)\s+AS\s+key\s*$")
+
+
+def returned_keys(cypher: str, parameters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """What a statement that RETURNs its row keys would return if every MATCH found its node."""
+    match = RETURN_KEY.search(cypher)
+    if match is None:
+        return []
+    keys = {row.get(match.group(1)) for row in parameters.get("rows") or []}
+    return [{"key": key} for key in keys if key is not None]
+
+
+Answer = Callable[[Dict[str, Any]], List[Dict[str, Any]]]
+
+
+@dataclass
+class RecordingSummary:
+    result_available_after: int = 0
+    result_consumed_after: int = 0
+    profile: Optional[Dict[str, Any]] = None
+
+
+class RecordingRecord:
+    def __init__(self, values: Dict[str, Any]):
+        self._values = values
+
+    def data(self) -> Dict[str, Any]:
+        return dict(self._values)
+
+    def __getitem__(self, key: str) -> Any:
+        return self._values[key]
+
+
+class RecordingResult:
+    def __init__(self, records: List[Dict[str, Any]]):
+        self._records = [RecordingRecord(values) for values in records]
+
+    def __iter__(self) -> Iterator[RecordingRecord]:
+        return iter(self._records)
+
+    def single(self) -> Optional[RecordingRecord]:
+        return self._records[0] if self._records else None
+
+    def consume(self) -> RecordingSummary:
+        return RecordingSummary()
+
+
+class RecordingGraph:
+    """What the stand-in driver saw: sessions, transactions, reads, statements and rows.
+
+    Statements are answered by the first ``respond`` pattern they match; otherwise reads
+    return nothing and writes return ``returned_keys`` (every MATCH finds its node).
+    """
+
+    def __init__(self, rtt_seconds: float = 0.0):
+        self.rtt_seconds = rtt_seconds
+        self.counts: Counter = Counter()
+        self.statements: Counter = Counter()
+        self._responses: List[Tuple["re.Pattern[str]", Answer]] = []
+        self._lock = threading.Lock()
+
+    def respond(self, pattern: str, answer: Answer) -> None:
+        self._responses.append((re.compile(pattern), answer))
+
+    def count(self, kind: str) -> None:
+        with self._lock:
+            self.counts[kind] += 1
+
+    def run(self, kind: str, cypher: str, parameters: Dict[str, Any]) -> RecordingResult:
+        with self._lock:
+            self.counts[kind] += 1
+            self.counts["rows"] += len(parameters.get("rows") or [None])
+            # First clause keyword + label is enough to tell the statement shapes apart.
+            self.statements[" ".join(cypher.split()[:3])] += 1
+        if self.rtt_seconds:
+            time.sleep(self.rtt_seconds)
+        for pattern, answer in self._responses:
+            if pattern.search(cypher):
+                return RecordingResult(answer(parameters))
+        return RecordingResult(returned_keys(cypher, parameters) if kind == "statements" else [])
+
+
+class RecordingTransaction:
+    def __init__(self, graph: RecordingGraph):
+        self.graph = graph
+
+    def run(self, cypher: str, **parameters: Any) -> RecordingResult:
+        return self.graph.run("statements", cypher, parameters)
+
+
+class RecordingExplicitTransaction(RecordingTransaction):
+    """``session.begin_transaction()``; like the driver's, leaving its ``with`` block commits."""
+
+    def __init__(self, graph: RecordingGraph):
+        super().__init__(graph)
+        self.closed = False
+
+    def __enter__(self) -> "RecordingExplicitTransaction":
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if not self.closed:
+            self.commit() if exc_type is None else self.rollback()
+
+    def commit(self) -> None:
+        self.graph.count("commits")
+        self.closed = True
+
+    def rollback(self) -> None:
+        self.graph.count("rollbacks")
+        self.closed = True
+
+
+class RecordingSession:
+    def __init__(self, graph: RecordingGraph):
+        self.graph = graph
+
+    def __enter__(self) -> "RecordingSession":
+        self.graph.count("sessions")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def execute_write(self, fn, *args, **kwargs):
+        self.graph.count("transactions")
+        return fn(RecordingTransaction(self.graph), *args, **kwargs)
+
+    def begin_transaction(self) -> RecordingExplicitTransaction:
+        self.graph.count("transactions")
+        return RecordingExplicitTransaction(self.graph)
+
+    def execute_read(self, fn, *args, **kwargs):
+        return fn(RecordingTransaction(self.graph), *args, **kwargs)
+
+    def run(self, cypher: str, **parameters: Any) -> RecordingResult:
+        return self.graph.run("reads", cypher, parameters)
+
+
+class RecordingDriver:
+    def __init__(self, graph: RecordingGraph):
+        self.graph = graph
+
+    def session(self, **config: Any) -> RecordingSession:
+        return RecordingSession(self.graph)
+
+    def close(self) -> None:
+        pass
+
+
+class RecordingNeo4jClient(Neo4jClient):
+    """``Neo4jClient`` on a driver that only records what it is sent.
+
+    Everything above the driver is the production client, so sessions, chunking, per-row
+    fallback and ``write_transaction`` behave as they do against Neo4j. Seed answers with
+    ``respond`` (e.g. lineage runs already linked); unseeded reads return nothing.
+    """
+
+    def __init__(self, write_batch_size: int = 500, rtt_seconds: float = 0.0):
+        self.graph = RecordingGraph(rtt_seconds)
+        super().__init__("bench://", "bench", "bench", write_batch_size=write_batch_size)
+
+    def _connect(self, uri: str, auth: Tuple[str, str], **config: Any) -> RecordingDriver:
+        return RecordingDriver(self.graph)
+
+    @property
+    def counts(self) -> Counter:
+        return self.graph.counts
+
+    @property
+    def statements(self) -> Counter:
+        return self.graph.statements
+
+    def respond(self, pattern: str, answer: Answer) -> None:
+        self.graph.respond(pattern, answer)
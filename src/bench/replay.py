@@ -0,0 +1,167 @@
+import argparse
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from src.adapters.neo4j.client import Neo4jClient
+from src.bench.fakes import FakePostgresPool, RecordingNeo4jClient
+from src.bench.suite import bench_settings
+from src.config.settings import Settings
+from src.domain.services.reference_nodes import ReferenceNodeStage
+from src.domain.services.write_cache import WriteSuppressionCache
+from src.pipelines.audit_pipeline import AuditPipeline
+from src.pipelines.lineage_pipeline import LineagePipeline
+from src.pipelines.quality_pipeline import QualityPipeline
+from src.pipelines.vendor_mapping_pipeline import VendorMappingPipeline
+from src.utils import metrics
+from src.utils.logging import configure_logging
+from src.workers.capture import CAPTURED_TABLES, read_capture
+from src.workers.runner import process_batch
+
+
+class CapturedSource:
+    """Serves captured Supabase rows to ``FakePostgresPool`` with ``SyntheticSource``'s lookups.
+
+    Each replayed batch loads the rows captured with it, replacing older rows for the same
+    keys. Keys never captured are treated as missing, as they were in production, except
+    vendor/product names, which the worker may have served from its cache; those get a
+    placeholder name.
+    """
+
+    def __init__(self):
+        self._rows: Dict[str, Dict[str, Any]] = {table: {} for table in CAPTURED_TABLES}
+
+    def load(self, rows_by_table: Dict[str, List[Dict[str, Any]]]) -> None:
+        for table, rows in rows_by_table.items():
+            key_column = CAPTURED_TABLES[table]
+            if table == "data_lineage":
+                grouped: Dict[str, List[Dict[str, Any]]] = {}
+                for row in rows:
+                    grouped.setdefault(str(row[key_column]), []).append(row)
+                self._rows[table].update(grouped)
+            else:
+                self._rows[table].update((str(row[key_column]), row) for row in rows)
+
+    def lineage_rows(self, entity_id: str) -> List[Dict[str, Any]]:
+        return self._rows["data_lineage"].get(entity_id, [])
+
+    def quality_row(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        return self._rows["data_quality_scores"].get(entity_id)
+
+    def audit_row(self, audit_id: str) -> Optional[Dict[str, Any]]:
+        return self._rows["audit_log"].get(audit_id)
+
+    def mapping_row(self, mapping_id: str) -> Optional[Dict[str, Any]]:
+        return self._rows["vendor_product_mappings"].get(mapping_id)
+
+    def names(self, table: str, keys: List[str]) -> List[Dict[str, Any]]:
+        captured = self._rows[table]
+        return [captured.get(key) or {"id": key, "name": f"{table[:-1]} {key}"} for key in keys]
+
+
+def replay(
+    path: str,
+    settings: Settings,
+    neo4j: Neo4jClient,
+    paced: bool = False,
+    speed: float = 1.0,
+    concurrency: int = 1,
+    limit: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Feed a capture file through ``process_batch``; returns throughput and per-stage timings."""
+    log = configure_logging("utility_lineage_replay")
+    log.setLevel(logging.WARNING)
+    recorder = metrics.install(metrics.PrometheusRecorder())
+    source = CapturedSource()
+    pg_pool = FakePostgresPool(source)
+    write_cache = WriteSuppressionCache(settings.write_cache_size) if settings.write_cache_size > 0 else None
+    reference_nodes = ReferenceNodeStage(neo4j)
+    lineage = LineagePipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    vendor = VendorMappingPipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    audit = AuditPipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    quality = QualityPipeline(settings, pg_pool, neo4j, write_cache)
+    for pipeline in (lineage, vendor, audit, quality):
+        pipeline.log.setLevel(logging.ERROR)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="replay") if concurrency > 1 else None
+
+    batches = events = 0
+    started = time.monotonic()
+    first_offset: Optional[float] = None
+    try:
+        for record in read_capture(path):
+            if limit is not None and batches >= limit:
+                break
+            if paced:
+                # Offsets count from when capture started, and sampling may skip its first
+                # minutes; pace on the gaps between records, starting with the first one.
+                if first_offset is None:
+                    first_offset = record["offset"]
+                delay = started + (record["offset"] - first_offset) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            source.load(record["rows"])
+            process_batch(
+                lineage,
+                vendor,
+                audit,
+                quality,
+                record["events"],
+                pg_pool,
+                log,
+                worker_id="replay",
+                executor=executor,
+                concurrency=concurrency,
+                settings=settings,
+            )
+            batches += 1
+            events += len(record["events"])
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+    seconds = time.monotonic() - started
+
+    report: Dict[str, Any] = {
+        "batches": batches,
+        "events": events,
+        "seconds": round(seconds, 4),
+        "events_per_sec": round(events / max(seconds, 1e-9), 1),
+        "pg_round_trips": pg_pool.counts["round_trips"],
+        "stages": recorder.histogram_summary(),
+    }
+    if isinstance(neo4j, RecordingNeo4jClient):
+        report["neo4j_transactions"] = neo4j.counts["transactions"]
+        report["neo4j_rows"] = neo4j.counts["rows"]
+    return report
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay captured outbox traffic through the pipelines.")
+    parser.add_argument("path", help="capture file written with CAPTURE_PATH")
+    parser.add_argument("--paced", action="store_true", help="keep the recorded gaps between batches")
+    parser.add_argument("--speed", type=float, default=1.0, help="pacing multiplier with --paced")
+    parser.add_argument("--concurrency", type=int, default=1, help="dispatch threads, as DISPATCH_CONCURRENCY")
+    parser.add_argument("--batches", type=int, default=None, help="stop after this many batches")
+    parser.add_argument(
+        "--neo4j",
+        action="store_true",
+        help="write to the Neo4j in NEO4J_URI (use a scratch database) instead of the recording stand-in",
+    )
+    args = parser.parse_args(argv)
+
+    if args.neo4j:
+        settings = Settings()
+        neo4j: Neo4jClient = Neo4jClient.from_settings(settings)
+    else:
+        settings = bench_settings()
+        neo4j = RecordingNeo4jClient(settings.neo4j_write_batch_size)
+    try:
+        report = replay(args.path, settings, neo4j, args.paced, args.speed, args.concurrency, args.batches)
+    finally:
+        neo4j.close()
+    print(json.dumps(report, indent=2, sort_keys=True))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from src.bench.fakes import DataShape, FakePostgresPool, RecordingNeo4jClient, SyntheticSource
+from src.config.settings import Settings
+from src.domain.services.reference_nodes import ReferenceNodeStage
+from src.domain.services.write_cache import WriteSuppressionCache
+from src.pipelines.audit_pipeline import AuditPipeline
+from src.pipelines.lineage_pipeline import LineagePipeline
+from src.pipelines.quality_pipeline import QualityPipeline
+from src.pipelines.vendor_mapping_pipeline import VendorMappingPipeline
+from src.utils.logging import configure_logging
+from src.workers.runner import process_batch
+
+
+# handle_event scenarios: scenario name -> aggregate type it drives
+EVENT_SCENARIOS = {
+    "lineage_event": "lineage_entity",
+    "vendor_mapping_event": "vendor_product_mapping",
+    "audit_event": "audit_event",
+    "quality_event": "data_quality_entity",
+}
+SCENARIOS = ["process_batch", *EVENT_SCENARIOS]
+
+# Metrics where lower is better; everything else compared is higher-is-better.
+COST_METRICS = ("pg_round_trips", "neo4j_transactions", "neo4j_statements", "peak_memory_kb")
+
+
+def bench_settings(**overrides) -> Settings:
+    """Settings that need no environment; the stand-ins never connect anywhere."""
+    values = {
+        "supabase_dsn": "bench",
+        "neo4j_uri": "bench://",
+        "neo4j_user": "bench",
+        "neo4j_password": "bench",
+        "queue_url": "bench",
+        "write_cache_path": None,
+    }
+    values.update(overrides)
+    return Settings(**values)
+
+
+class Bench:
+    """One scenario's stand-ins and pipelines, wired the way ``runner.run`` wires them."""
+
+    def __init__(self, settings: Settings, shape: DataShape, seed: int, pg_rtt: float, neo4j_rtt: float):
+        self.settings = settings
+        self.source = SyntheticSource(shape, seed)
+        self.pg_pool = FakePostgresPool(self.source, pg_rtt)
+        self.neo4j = RecordingNeo4jClient(settings.neo4j_write_batch_size, neo4j_rtt)
+        # Seeded linked runs send lineage through the incremental path, as in production.
+        self.neo4j.respond(r"AS run_ids", lambda parameters: self.source.lineage_runs(parameters["entity_ids"]))
+        write_cache = WriteSuppressionCache(settings.write_cache_size) if settings.write_cache_size > 0 else None
+        reference_nodes = ReferenceNodeStage(self.neo4j)
+        self.pipelines = {
+            "lineage_entity": LineagePipeline(settings, self.pg_pool, self.neo4j, write_cache, reference_nodes),
+            "vendor_product_mapping": VendorMappingPipeline(settings, self.pg_pool, self.neo4j, write_cache, reference_nodes),
+            "audit_event": AuditPipeline(settings, self.pg_pool, self.neo4j, write_cache, reference_nodes),
+            "data_quality_entity": QualityPipeline(settings, self.pg_pool, self.neo4j, write_cache),
+        }
+        # Per-event INFO lines (and expected skip warnings) would dominate the measurement.
+        for pipeline in self.pipelines.values():
+            pipeline.log.setLevel(logging.ERROR)
+
+    def measure(self, events: int, body: Callable[[], None]) -> Dict[str, float]:
+        # Throughput is taken with tracemalloc on; it slows every scenario alike, so runs stay
+        # comparable with each other and with the baseline.
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            body()
+        finally:
+            seconds = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        return {
+            "events": events,
+            "seconds": round(seconds, 4),
+            "events_per_sec": round(events / max(seconds, 1e-9), 1),
+            "pg_round_trips": self.pg_pool.counts["round_trips"],
+            "neo4j_transactions": self.neo4j.counts["transactions"],
+            "neo4j_statements": self.neo4j.counts["transactions"] + self.neo4j.counts["reads"],
+            "neo4j_rows": self.neo4j.counts["rows"],
+            "peak_memory_kb": round(peak / 1024),
+        }
+
+
+def run_process_batch(bench: Bench, events: int, batch_size: int, log) -> Dict[str, float]:
+    batches = [bench.source.events(min(batch_size, events - start)) for start in range(0, events, batch_size)]
+    pipelines = bench.pipelines
+
+    def body() -> None:
+        for batch in batches:
+            process_batch(
+                pipelines["lineage_entity"],
+                pipelines["vendor_product_mapping"],
+                pipelines["audit_event"],
+                pipelines["data_quality_entity"],
+                batch,
+                bench.pg_pool,
+                log,
+                worker_id="bench",
+                settings=bench.settings,
+            )
+
+    return bench.measure(events, body)
+
+
+def run_handle_event(bench: Bench, aggregate_type: str, events: int) -> Dict[str, float]:
+    shape = bench.source.shape
+    shape.mix = {aggregate_type: 1.0}
+    batch = bench.source.events(events)
+    pipeline = bench.pipelines[aggregate_type]
+
+    def body() -> None:
+        for event in batch:
+            try:
+                pipeline.handle_event(event)
+            except Exception:  # noqa: BLE001
+                pass  # failures (e.g. unsupported entity types) still count their round trips
+
+    return bench.measure(events, body)
+
+
+def compare(report: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float, count_tolerance: float) -> List[str]:
+    """Regressions of ``report`` against ``baseline``, as readable messages."""
+    regressions = []
+    for scenario, current in report.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        if current["events_per_sec"] < previous["events_per_sec"] * (1 - tolerance):
+            regressions.append(f"{scenario}: events_per_sec {current['events_per_sec']} < {previous['events_per_sec']}")
+        for metric in COST_METRICS:
+            allowed = tolerance if metric == "peak_memory_kb" else count_tolerance
+            if current[metric] > previous[metric] * (1 + allowed):
+                regressions.append(f"{scenario}: {metric} {current[metric]} > {previous[metric]}")
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark process_batch and handle_event against in-process stand-ins.")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="scenario to run (repeatable; default all)")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--entities", type=int, default=1000, help="distinct aggregate ids per type")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2)
+    parser.add_argument("--delete-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pg-rtt-ms", type=float, default=0.0, help="simulated latency per Postgres statement")
+    parser.add_argument("--neo4j-rtt-ms", type=float, default=0.0, help="simulated latency per Neo4j transaction")
+    parser.add_argument("--baseline", help="fail (exit 1) on regressions against this report")
+    parser.add_argument("--save-baseline", help="write this run's report here")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput/memory regression")
+    parser.add_argument("--count-tolerance", type=float, default=0.0, help="allowed round-trip/transaction growth")
+    args = parser.parse_args(argv)
+
+    log = configure_logging("utility_lineage_bench")
+    # process_batch logs coalescing per batch at INFO; keep only problems.
+    log.setLevel(logging.WARNING)
+    settings = bench_settings()
+    report: Dict[str, Dict] = {}
+    for scenario in args.scenario or SCENARIOS:
+        shape = DataShape(entities=args.entities, duplicate_ratio=args.duplicate_ratio, delete_ratio=args.delete_ratio)
+        bench = Bench(settings, shape, args.seed, args.pg_rtt_ms / 1000, args.neo4j_rtt_ms / 1000)
+        if scenario == "process_batch":
+            report[scenario] = run_process_batch(bench, args.events, args.batch_size, log)
+        else:
+            report[scenario] = run_handle_event(bench, EVENT_SCENARIOS[scenario], args.events)
+        report[scenario]["statements"] = dict(bench.neo4j.statements.most_common(10))
+
+    print(json.dumps(report, indent=2, sort_keys=True))
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            regressions = compare(report, json.load(handle), args.tolerance, args.count_tolerance)
+        for regression in regressions:
+            log.error("Benchmark regression: %s", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
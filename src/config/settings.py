@@ -1,3 +1,8 @@
+import os
+import socket
+
+from typing import Dict, Optional
+
 from pydantic import BaseSettings, Field
 
 
@@ -11,9 +16,126 @@ class Settings(BaseSettings):
     queue_url: str = Field(..., env="QUEUE_URL")
     pipeline_name: str = Field("utility-lineage", env="PIPELINE_NAME")
 
+    # Idle polling backs off exponentially from idle_backoff_min_seconds up to this ceiling.
     poll_interval_seconds: int = Field(5, env="POLL_INTERVAL_SECONDS")
+    idle_backoff_min_seconds: float = Field(0.25, env="IDLE_BACKOFF_MIN_SECONDS")
     batch_size: int = Field(100, env="BATCH_SIZE")
     max_attempts: int = Field(5, env="MAX_ATTEMPTS")
+    # Failed events wait retry_base_seconds * 2^attempts (capped at retry_max_seconds, jittered)
+    # before they can be claimed again; after max_attempts they are dead-lettered.
+    retry_base_seconds: float = Field(5.0, env="RETRY_BASE_SECONDS")
+    retry_max_seconds: float = Field(900.0, env="RETRY_MAX_SECONDS")
+    neo4j_write_batch_size: int = Field(500, env="NEO4J_WRITE_BATCH_SIZE")
+
+    # Adaptive batching: BATCH_SIZE/NEO4J_WRITE_BATCH_SIZE are starting points, tuned per batch
+    # (AIMD) within these bounds from claim latency, write latency and Neo4j transient errors.
+    adaptive_batching: bool = Field(True, env="ADAPTIVE_BATCHING")
+    batch_size_min: int = Field(10, env="BATCH_SIZE_MIN")
+    batch_size_max: int = Field(1000, env="BATCH_SIZE_MAX")
+    neo4j_write_batch_size_min: int = Field(50, env="NEO4J_WRITE_BATCH_SIZE_MIN")
+    neo4j_write_batch_size_max: int = Field(2000, env="NEO4J_WRITE_BATCH_SIZE_MAX")
+    adaptive_target_fetch_seconds: float = Field(0.5, env="ADAPTIVE_TARGET_FETCH_SECONDS")
+    adaptive_target_write_seconds: float = Field(2.0, env="ADAPTIVE_TARGET_WRITE_SECONDS")
+    neo4j_max_connection_pool_size: int = Field(100, env="NEO4J_MAX_CONNECTION_POOL_SIZE")
+    # Driver pool (seconds): connections are retired after the lifetime (keep it under any load
+    # balancer idle timeout), callers wait up to the acquisition timeout for a free one, and
+    # connections idle longer than the liveness timeout are pinged before reuse (unset: never).
+    neo4j_max_connection_lifetime: float = Field(3600, env="NEO4J_MAX_CONNECTION_LIFETIME")
+    neo4j_connection_acquisition_timeout: float = Field(60, env="NEO4J_CONNECTION_ACQUISITION_TIMEOUT")
+    neo4j_connection_timeout: float = Field(30, env="NEO4J_CONNECTION_TIMEOUT")
+    neo4j_liveness_check_timeout: Optional[float] = Field(None, env="NEO4J_LIVENESS_CHECK_TIMEOUT")
+    # Startup check for pipeline constraints/indexes: strict (refuse to run), warn, off.
+    schema_check: str = Field("warn", env="SCHEMA_CHECK")
+    pg_pool_minconn: int = Field(1, env="PG_POOL_MINCONN")
+    pg_pool_maxconn: int = Field(5, env="PG_POOL_MAXCONN")
+    # Max extra pending events per batch pulled in to be coalesced with it; 0 = within-batch only.
+    coalesce_lookahead: int = Field(1000, env="COALESCE_LOOKAHEAD")
+
+    # Claims: each worker leases events for lease_seconds and renews while processing.
+    worker_id: str = Field(default_factory=lambda: f"{socket.gethostname()}:{os.getpid()}", env="WORKER_ID")
+    lease_seconds: int = Field(300, env="LEASE_SECONDS")
+
+    # LISTEN/NOTIFY wake-ups (needs ops/sql/002_outbox_notify.sql); idle ceiling while listening.
+    # The channel is hardcoded in that SQL file; change both together.
+    listen_enabled: bool = Field(False, env="OUTBOX_LISTEN")
+    listen_channel: str = Field("outbox_events", env="OUTBOX_LISTEN_CHANNEL")
+    listen_idle_max_seconds: float = Field(60, env="OUTBOX_LISTEN_IDLE_MAX_SECONDS")
+
+    # Parallel dispatch threads; capped at PG_POOL_MAXCONN - 1 and the Neo4j pool size.
+    dispatch_concurrency: int = Field(1, env="DISPATCH_CONCURRENCY")
+
+    # Async worker (src.workers.async_runner): partitions loading/writing at once, capped at the
+    # Postgres and Neo4j pool sizes; and whether the next batch is claimed while one is written.
+    async_max_in_flight: int = Field(8, env="ASYNC_MAX_IN_FLIGHT")
+    async_prefetch: bool = Field(True, env="ASYNC_PREFETCH")
+
+    # Priority lanes (JSON objects keyed by aggregate type): each batch is claimed as weighted
+    # per-type quotas, and each type may use at most its lane_concurrency dispatch threads.
+    lane_weights: Dict[str, int] = Field(
+        default_factory=lambda: {
+            "lineage_entity": 4,
+            "data_quality_entity": 4,
+            "vendor_product_mapping": 2,
+            "audit_event": 1,
+        },
+        env="LANE_WEIGHTS",
+    )
+    lane_concurrency: Dict[str, int] = Field(default_factory=dict, env="LANE_CONCURRENCY")
+
+    # Prometheus-format /metrics endpoint (disabled unless metrics_port is set; shard k of a
+    # supervisor listens on metrics_port + k) and how often the queue-lag query runs.
+    metrics_port: Optional[int] = Field(None, env="METRICS_PORT")
+    metrics_host: str = Field("127.0.0.1", env="METRICS_HOST")
+    queue_lag_interval_seconds: float = Field(15.0, env="QUEUE_LAG_INTERVAL_SECONDS")
+
+    # Slow-op profiler (off unless slow_op_log_path is set): Postgres/Neo4j calls slower than the
+    # threshold are sampled into a rotating JSONL file; profile_rate of the sampled Cypher is
+    # re-run under PROFILE (writes explicitly rolled back; failed ops never re-run) to capture its plan.
+    slow_op_log_path: Optional[str] = Field(None, env="SLOW_OP_LOG_PATH")
+    slow_op_threshold_seconds: float = Field(1.0, env="SLOW_OP_THRESHOLD_SECONDS")
+    slow_op_sample_rate: float = Field(1.0, env="SLOW_OP_SAMPLE_RATE")
+    slow_op_profile_rate: float = Field(0.0, env="SLOW_OP_PROFILE_RATE")
+    slow_op_max_bytes: int = Field(10 * 1024 * 1024, env="SLOW_OP_MAX_BYTES")
+    slow_op_backups: int = Field(5, env="SLOW_OP_BACKUPS")
+
+    # Traffic capture (off unless capture_path is set): the share of batches whose events and
+    # loaded source rows are appended to a gzip JSONL file for `python -m src.bench.replay`.
+    capture_path: Optional[str] = Field(None, env="CAPTURE_PATH")
+    capture_sample_rate: float = Field(0.01, env="CAPTURE_SAMPLE_RATE")
+
+    # Outbox sharding: this worker only claims aggregates hashing to shard_index of shard_count.
+    shard_index: int = Field(0, env="SHARD_INDEX")
+    shard_count: int = Field(1, env="SHARD_COUNT")
+
+    # Lineage sync: "incremental" links only runs the entity is not linked to yet and prunes
+    # runs outside the retention window (entities with UPDATE/DELETE events are still rebuilt);
+    # "rebuild" re-links the latest runs on every event.
+    lineage_sync_mode: str = Field("incremental", env="LINEAGE_SYNC_MODE")
+
+    # Skip graph writes identical to the last one per node: LRU entries (0 disables) and an
+    # optional file the cache is loaded from at start and saved to on shutdown. Workers only
+    # use it with shard_count > 1, so each aggregate has a single writer.
+    write_cache_size: int = Field(100_000, env="WRITE_CACHE_SIZE")
+    write_cache_path: Optional[str] = Field(None, env="WRITE_CACHE_PATH")
+
+    # Vendor/product names for mapping loads: cached entries, and seconds before one is reloaded
+    # even if no outbox event invalidated it.
+    dimension_cache_size: int = Field(10_000, env="DIMENSION_CACHE_SIZE")
+    dimension_cache_ttl_seconds: float = Field(600.0, env="DIMENSION_CACHE_TTL_SECONDS")
+    # Minimum seconds between outbox reads that invalidate renamed vendors/products.
+    dimension_cache_refresh_seconds: float = Field(5.0, env="DIMENSION_CACHE_REFRESH_SECONDS")
+
+    # Backfill command: keys per streamed chunk and where its resume checkpoint lives.
+    backfill_chunk_size: int = Field(1000, env="BACKFILL_CHUNK_SIZE")
+    backfill_checkpoint_path: str = Field(".backfill_checkpoint.json", env="BACKFILL_CHECKPOINT_PATH")
+
+    # Compaction command: ChangeEvents older than the retention window (whole UTC days) are
+    # rolled up into per-day summaries and deleted, this many per transaction with a pause
+    # between transactions so the live worker's writes interleave.
+    change_event_retention_days: int = Field(90, env="CHANGE_EVENT_RETENTION_DAYS")
+    compaction_batch_size: int = Field(1000, env="COMPACTION_BATCH_SIZE")
+    compaction_pause_seconds: float = Field(0.2, env="COMPACTION_PAUSE_SECONDS")
+    compaction_checkpoint_path: str = Field(".compaction_checkpoint.json", env="COMPACTION_CHECKPOINT_PATH")
 
     class Config:
         env_file = ".env"
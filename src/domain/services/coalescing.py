@@ -0,0 +1,53 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from src.domain.models.events import OutboxEvent
+
+
+@dataclass
+class CoalescedBatch:
+    """One effective event per (aggregate_type, aggregate_id) plus the events folded into it."""
+
+    events: List[OutboxEvent]
+    superseded: Dict[str, List[OutboxEvent]] = field(default_factory=dict)
+
+    @property
+    def folded(self) -> int:
+        return sum(len(folded) for folded in self.superseded.values())
+
+    def ids_for(self, event: OutboxEvent) -> List[str]:
+        """The effective event id followed by every event id it superseded."""
+        return [event.id] + [folded.id for folded in self.superseded.get(event.id, [])]
+
+
+def _effective(events: List[OutboxEvent]) -> OutboxEvent:
+    """Pick the event that stands in for a group of events on one aggregate.
+
+    Pipelines reload current state from Supabase and ignore ``op`` whenever the source
+    row exists, so the latest event is enough. When the row is gone, a DELETE anywhere
+    in the group must win so the graph side is removed (and, for vendor mappings, so its
+    payload keys are available); the latest DELETE is used in that case. Otherwise an
+    edit (any op but INSERT) wins over inserts, so incremental lineage still sees that
+    runs it already synced may have changed.
+    """
+    deletes = [event for event in events if event.op.upper() == "DELETE"]
+    edits = [event for event in events if event.op.upper() != "INSERT"]
+    candidates = deletes or edits or events
+    return max(candidates, key=lambda event: event.created_at)
+
+
+def coalesce_events(events: List[OutboxEvent]) -> CoalescedBatch:
+    """Collapse duplicate aggregates, keeping the order in which each aggregate first appears."""
+    groups: Dict[Tuple[str, str], List[OutboxEvent]] = {}
+    for event in events:
+        groups.setdefault((event.aggregate_type, event.aggregate_id), []).append(event)
+
+    effective_events: List[OutboxEvent] = []
+    superseded: Dict[str, List[OutboxEvent]] = {}
+    for group in groups.values():
+        effective = _effective(group)
+        effective_events.append(effective)
+        folded = [event for event in group if event.id != effective.id]
+        if folded:
+            superseded[effective.id] = folded
+    return CoalescedBatch(events=effective_events, superseded=superseded)
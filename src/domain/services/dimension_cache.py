@@ -0,0 +1,139 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.adapters.supabase import async_db as apg
+from src.adapters.supabase import db as pg
+from src.utils.cache import TTLCache
+
+
+# Dimension tables whose names are cached -> the column holding the name.
+DIMENSION_TABLES = {
+    "vendors": "name",
+    "products": "name",
+}
+
+# Outbox rows are re-read this far behind the last one seen, so events from transactions that
+# committed late (created_at earlier than what was already read) still invalidate.
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+NOW_QUERY = "SELECT clock_timestamp() AS now;"
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Comparable timestamp: naive values (timestamp without time zone) are taken as UTC."""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class DimensionCache:
+    """Names of vendors/products keyed by id, with TTL + LRU eviction.
+
+    Lookups batch-fetch only the ids that are not cached. ``refresh`` reads (without claiming)
+    the outbox events recorded for the dimension tables since the last refresh and drops those
+    ids, at most once per ``refresh_seconds``, so renames show up within that interval; the
+    TTL bounds staleness if an event is missed.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float, refresh_seconds: float = 0.0):
+        self.invalidated = 0
+        self.refresh_seconds = refresh_seconds
+        self._names = TTLCache(maxsize, ttl_seconds)
+        self._seen_at: Optional[datetime] = None
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self._names.hits,
+            "misses": self._names.misses,
+            "invalidated": self.invalidated,
+            "size": len(self._names),
+        }
+
+    def _cached(self, table: str, ids: Iterable) -> Tuple[Dict[str, Optional[str]], List[str]]:
+        found: Dict[str, Optional[str]] = {}
+        missing = []
+        for key in {str(key) for key in ids if key is not None}:
+            entry = self._names.get((table, key))
+            if entry is None:
+                missing.append(key)
+            else:
+                found[key] = entry[0]
+        return found, missing
+
+    def _names_query(self, table: str, missing: List[str]) -> Tuple[str, tuple]:
+        # table/column come from DIMENSION_TABLES, never from input.
+        return f"SELECT id, {DIMENSION_TABLES[table]} AS name FROM {table} WHERE id = ANY(%s);", (missing,)
+
+    def _store(self, table: str, rows, found: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
+        for row in rows:
+            key = str(row["id"])
+            # Wrapped so a NULL name is still a cache hit.
+            self._names.put((table, key), (row["name"],))
+            found[key] = row["name"]
+        return found
+
+    def names(self, conn, table: str, ids: Iterable) -> Dict[str, Optional[str]]:
+        """``id -> name`` for every id that exists in ``table``; unknown ids are left out."""
+        found, missing = self._cached(table, ids)
+        if not missing:
+            return found
+        return self._store(table, pg.fetch_all(conn, *self._names_query(table, missing)), found)
+
+    async def names_async(self, conn, table: str, ids: Iterable) -> Dict[str, Optional[str]]:
+        """``names`` over an ``AsyncPostgresPool`` connection."""
+        found, missing = self._cached(table, ids)
+        if not missing:
+            return found
+        return self._store(table, await apg.fetch_all(conn, *self._names_query(table, missing)), found)
+
+    def invalidate(self, table: str, ids: Iterable) -> None:
+        for key in ids:
+            if self._names.pop((table, str(key))) is not None:
+                self.invalidated += 1
+
+    def _refresh_due(self) -> bool:
+        if self._seen_at is not None and time.monotonic() - self._refreshed_at < self.refresh_seconds:
+            return False
+        self._refreshed_at = time.monotonic()
+        return True
+
+    def _refresh_query(self) -> Tuple[str, tuple]:
+        sql = """
+        SELECT table_name, aggregate_id::text AS aggregate_id, MAX(created_at) AS created_at
+        FROM outbox_events
+        WHERE table_name = ANY(%s)
+          AND created_at > %s
+        GROUP BY table_name, aggregate_id;
+        """
+        return sql, (list(DIMENSION_TABLES), self._seen_at - REFRESH_OVERLAP)
+
+    def _apply_refresh(self, rows) -> None:
+        for row in rows:
+            self.invalidate(row["table_name"], [row["aggregate_id"]])
+            self._seen_at = max(self._seen_at, _as_utc(row["created_at"]))
+
+    def refresh(self, conn) -> None:
+        """Drop entries whose rows have outbox events newer than the last refresh."""
+        with self._refresh_lock:
+            if not self._refresh_due():
+                return
+            if self._seen_at is None:
+                # Nothing cached yet, so only the starting point matters.
+                self._seen_at = _as_utc(pg.fetch_one(conn, NOW_QUERY)["now"])
+                return
+            self._apply_refresh(pg.fetch_all(conn, *self._refresh_query()))
+
+    async def refresh_async(self, conn) -> None:
+        """``refresh`` over an ``AsyncPostgresPool`` connection.
+
+        The due check and the query are not under the thread lock; on one event loop the
+        check itself stops concurrent tasks from refreshing twice.
+        """
+        if not self._refresh_due():
+            return
+        if self._seen_at is None:
+            self._seen_at = _as_utc((await apg.fetch_one(conn, NOW_QUERY))["now"])
+            return
+        self._apply_refresh(await apg.fetch_all(conn, *self._refresh_query()))
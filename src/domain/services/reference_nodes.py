@@ -0,0 +1,80 @@
+from typing import Any, Dict, Hashable, List
+
+from src.adapters.neo4j.client import Neo4jClient
+from src.adapters.neo4j.templates import cypher_template
+from src.domain.services.write_cache import fingerprint
+from src.utils.cache import LRUCache
+
+
+# Low-cardinality nodes shared by many events -> the property they are keyed on.
+REFERENCE_KEYS = {
+    "SourceSystem": "name",
+    "InternalUser": "id",
+    "Vendor": "id",
+}
+
+
+class ReferenceNodeStage:
+    """Upsert each batch's distinct reference nodes once, up front, so main writes can MATCH.
+
+    Re-MERGEing the same SourceSystem/InternalUser/Vendor on every row makes concurrent
+    transactions contend for those node locks. Keys already upserted with the same
+    properties are remembered in-process and skipped on later batches. The cache trusts that
+    reference nodes are not deleted behind the worker's back; call ``forget`` if they are.
+    A stage built on an ``AsyncNeo4jClient`` is driven through ``ensure_async``.
+    """
+
+    def __init__(self, neo4j: Neo4jClient, cache_size: int = 10_000):
+        self.neo4j = neo4j
+        self.upserted = 0
+        self.skipped = 0
+        self._known = LRUCache(cache_size)
+
+    @cypher_template("reference.upsert")
+    def _upsert_cypher(self, label: str) -> str:
+        return f"""
+        UNWIND $rows AS row
+        MERGE (n:{label} {{{REFERENCE_KEYS[label]}: row.key}})
+        SET n += row.props
+        """
+
+    def _pending(self, label: str, nodes: Dict[Hashable, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if label not in REFERENCE_KEYS:
+            raise ValueError(f"Unknown reference label {label!r}")
+        pending = []
+        for key, props in nodes.items():
+            if key is None:
+                continue
+            if self._known.get((label, key)) == fingerprint(props):
+                self.skipped += 1
+                continue
+            pending.append({"key": key, "props": props})
+        return pending
+
+    def _remember(self, label: str, pending: List[Dict[str, Any]]) -> None:
+        for row in pending:
+            self._known.put((label, row["key"]), fingerprint(row["props"]))
+        self.upserted += len(pending)
+
+    def ensure(self, label: str, nodes: Dict[Hashable, Dict[str, Any]]) -> None:
+        """Make sure every ``key -> properties`` node exists; null keys are ignored.
+
+        Raises if the upsert fails, so callers can fail the rows that depend on it.
+        """
+        pending = self._pending(label, nodes)
+        if pending:
+            self.neo4j.write(self._upsert_cypher(label), {"rows": pending})
+            self._remember(label, pending)
+
+    async def ensure_async(self, label: str, nodes: Dict[Hashable, Dict[str, Any]]) -> None:
+        """``ensure`` for a stage built on ``AsyncNeo4jClient``."""
+        pending = self._pending(label, nodes)
+        if pending:
+            await self.neo4j.write(self._upsert_cypher(label), {"rows": pending})
+            self._remember(label, pending)
+
+    def forget(self, label: str, key: Hashable) -> None:
+        self._known.pop((label, key))
+
+    def stats(self) -> Dict[str, int]:
+        return {"upserted": self.upserted, "skipped": self.skipped, "known": len(self._known)}
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from src.utils.cache import LRUCache
+
+
+# (cache label, key, fields that end up in the graph) for one planned write
+CacheEntry = Tuple[str, str, Dict[str, Any]]
+
+
+def fingerprint(fields: Dict[str, Any]) -> str:
+    """Stable hash of written values; datetimes/decimals/UUIDs hash by their string form."""
+    encoded = json.dumps(fields, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class WriteSuppressionCache:
+    """Skip graph writes whose parameters match what was last written for the same node.
+
+    Entries are keyed by ``(label, key)`` and only recorded after a write succeeds; deletes
+    invalidate them. The cache assumes this worker is the only writer of those properties:
+    if the graph is restored or edited by hand, clear the persisted file (or restart without
+    ``WRITE_CACHE_PATH``) so suppressed writes are not mistaken for present data. Workers
+    only enable it when sharded, so every aggregate has exactly one writing process.
+    """
+
+    def __init__(self, maxsize: int, path: Optional[str] = None):
+        self.path = path
+        self.suppressed = 0
+        self._entries = LRUCache(maxsize)
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                for label, key, digest in json.load(handle):
+                    self._entries.put((label, key), digest)
+
+    @classmethod
+    def from_settings(cls, settings, log) -> Optional["WriteSuppressionCache"]:
+        """The worker's cache, or None when disabled or when the worker is not sharded.
+
+        Unsharded replicas claim the same aggregates, so one could suppress a write another
+        has since overwritten (A writes X, B writes Y, A skips X again and Y stays).
+        """
+        if settings.write_cache_size <= 0:
+            return None
+        if settings.shard_count <= 1:
+            log.warning(
+                "Write cache disabled: it needs SHARD_COUNT > 1 so each aggregate has one writer",
+                extra={"write_cache_size": settings.write_cache_size},
+            )
+            return None
+        path = settings.write_cache_path
+        if path:
+            # Each shard writes its own keys; a shared file would be overwritten by every process.
+            path = f"{path}.{settings.shard_index}"
+        return cls(settings.write_cache_size, path)
+
+    @property
+    def hits(self) -> int:
+        return self._entries.hits
+
+    @property
+    def misses(self) -> int:
+        return self._entries.misses
+
+    def stats(self) -> Dict[str, int]:
+        """``hits``/``misses`` count key lookups (for sizing); ``suppressed`` counts skipped writes."""
+        return {"hits": self.hits, "misses": self.misses, "suppressed": self.suppressed, "size": len(self._entries)}
+
+    def unchanged(self, label: str, key: str, fields: Dict[str, Any]) -> bool:
+        if self._entries.get((label, key)) == fingerprint(fields):
+            self.suppressed += 1
+            return True
+        return False
+
+    def remember(self, label: str, key: str, fields: Dict[str, Any]) -> None:
+        self._entries.put((label, key), fingerprint(fields))
+
+    def invalidate(self, label: str, key: str) -> None:
+        self._entries.pop((label, key))
+
+    def skip_unchanged(self, items: List[Tuple[Any, Dict]], entry: Callable[[Dict], CacheEntry]) -> List[Tuple[Any, Dict]]:
+        """Drop ``(event, params)`` items whose write would not change the graph."""
+        return [(event, params) for event, params in items if not self.unchanged(*entry(params))]
+
+    def record_written(
+        self,
+        items: List[Tuple[Any, Dict]],
+        failed: Sequence[Tuple[int, Exception]],
+        entry: Callable[[Dict], CacheEntry],
+        matched: Optional[Set[str]] = None,
+    ) -> None:
+        """Remember every item of a ``write_rows`` call except the indices that failed.
+
+        With ``matched``, only items whose key is in it are remembered: a MATCH that found no
+        node succeeds without writing, and the same write must run again once the node exists.
+        """
+        failed_indices = {index for index, _ in failed}
+        for index, (_, params) in enumerate(items):
+            if index in failed_indices:
+                continue
+            label, key, fields = entry(params)
+            if matched is not None and str(key) not in matched:
+                continue
+            self.remember(label, key, fields)
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump([[label, key, digest] for (label, key), digest in self._entries.items()], handle)
+        os.replace(tmp_path, self.path)
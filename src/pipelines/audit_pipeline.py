@@ -1,9 +1,14 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 from src.adapters.neo4j.client import Neo4jClient
+from src.adapters.neo4j.templates import cypher_template
+from src.adapters.supabase import async_db as apg
 from src.adapters.supabase import db as pg
 from src.config.settings import Settings
 from src.domain.models.events import OutboxEvent
+from src.domain.services.reference_nodes import ReferenceNodeStage
+from src.domain.services.write_cache import CacheEntry, WriteSuppressionCache
+from src.pipelines.batch_writes import WriteGroup, write_groups, write_groups_async
 from src.utils.logging import configure_logging
 
 
@@ -19,10 +24,20 @@ TABLE_TO_LABEL = {
 class AuditPipeline:
     """Create thin ChangeEvent nodes for selected tables."""
 
-    def __init__(self, settings: Settings, pg_pool: pg.PostgresPool, neo4j: Neo4jClient):
+    def __init__(
+        self,
+        settings: Settings,
+        pg_pool: pg.PostgresPool,
+        neo4j: Neo4jClient,
+        write_cache: Optional[WriteSuppressionCache] = None,
+        reference_nodes: Optional[ReferenceNodeStage] = None,
+    ):
         self.settings = settings
         self.pg_pool = pg_pool
         self.neo4j = neo4j
+        self.write_cache = write_cache
+        # Main writes MATCH reference nodes, so there is always a stage to create them.
+        self.reference_nodes = reference_nodes or ReferenceNodeStage(neo4j)
         self.log = configure_logging("audit_pipeline")
 
     def load_audit(self, conn, audit_id: str) -> Optional[Dict]:
@@ -33,6 +48,40 @@ class AuditPipeline:
         """
         return pg.fetch_one(conn, sql, (audit_id,))
 
+    def load_audit_many(self, conn, audit_ids: List[str]) -> Dict[str, Dict]:
+        """Audit rows for every id in one query, keyed by id."""
+        if not audit_ids:
+            return {}
+        return self.index_rows(pg.fetch_all(conn, *self.load_many_query(audit_ids)))
+
+    async def load_audit_many_async(self, conn, audit_ids: List[str]) -> Dict[str, Dict]:
+        if not audit_ids:
+            return {}
+        return self.index_rows(await apg.fetch_all(conn, *self.load_many_query(audit_ids)))
+
+    def load_many_query(self, audit_ids: List[str]) -> Tuple[str, tuple]:
+        sql = """
+        SELECT *
+        FROM audit_log
+        WHERE id = ANY(%s);
+        """
+        return sql, (list(audit_ids),)
+
+    def index_rows(self, rows) -> Dict[str, Dict]:
+        return {str(row["id"]): row for row in rows}
+
+    def backfill_query(self, after_key: Optional[str]) -> Tuple[str, tuple]:
+        """Every audit row after ``after_key``, ordered by id."""
+        where = "WHERE id > %s" if after_key is not None else ""
+        sql = f"""
+        SELECT *
+        FROM audit_log
+        {where}
+        ORDER BY id;
+        """
+        return sql, (after_key,) if after_key is not None else ()
+
+    @cypher_template("audit.upsert")
     def _upsert_cypher(self, label: Optional[str]) -> str:
         attach = ""
         if label:
@@ -41,9 +90,8 @@ class AuditPipeline:
             MATCH (e:{label} {{id: $record_id}})
             MERGE (ce)-[:AFFECTED]->(e)
             """
+        # InternalUser is upserted up front by the reference-node stage.
         return f"""
-        MERGE (u:InternalUser {{id: $changed_by}})
-
         MERGE (ce:ChangeEvent {{id: $id}})
         SET ce.table_name = $table_name,
             ce.record_id = $record_id,
@@ -52,27 +100,63 @@ class AuditPipeline:
             ce.ip_address = $ip_address,
             ce.user_agent = $user_agent
 
-        MERGE (u)-[:MADE_CHANGE]->(ce)
+        WITH ce
+        OPTIONAL MATCH (u:InternalUser {{id: $changed_by}})
+        FOREACH (_ IN CASE WHEN u IS NULL THEN [] ELSE [1] END |
+          MERGE (u)-[:MADE_CHANGE]->(ce)
+        )
         {attach}
         """
 
+    @cypher_template("audit.bulk_upsert")
+    def _bulk_upsert_cypher(self, label: Optional[str]) -> str:
+        attach = ""
+        if label:
+            attach = f"""
+            WITH ce, row
+            MATCH (e:{label} {{id: row.record_id}})
+            MERGE (ce)-[:AFFECTED]->(e)
+            """
+        # InternalUser is upserted up front by the reference-node stage.
+        return f"""
+        UNWIND $rows AS row
+        MERGE (ce:ChangeEvent {{id: row.id}})
+        SET ce.table_name = row.table_name,
+            ce.record_id = row.record_id,
+            ce.action = row.action,
+            ce.changed_at = datetime(row.changed_at),
+            ce.ip_address = row.ip_address,
+            ce.user_agent = row.user_agent
+
+        WITH ce, row
+        OPTIONAL MATCH (u:InternalUser {{id: row.changed_by}})
+        FOREACH (_ IN CASE WHEN u IS NULL THEN [] ELSE [1] END |
+          MERGE (u)-[:MADE_CHANGE]->(ce)
+        )
+        {attach}
+        RETURN row.id AS key
+        """
+
     def _delete_cypher(self) -> str:
         return "MATCH (ce:ChangeEvent {id: $id}) DETACH DELETE ce;"
 
-    def handle_event(self, event: OutboxEvent) -> None:
-        with self.pg_pool.connection() as conn:
-            audit_row = self.load_audit(conn, event.aggregate_id)
+    def _bulk_delete_cypher(self) -> str:
+        return """
+        UNWIND $rows AS row
+        MATCH (ce:ChangeEvent {id: row.id})
+        DETACH DELETE ce
+        """
+
+    def _plan(self, event: OutboxEvent, audit_row: Optional[Dict]) -> Optional[Tuple[str, Optional[str], Dict]]:
+        """Decide what to write for one event given its loaded row.
 
+        Returns ``(action, label, params)`` with action ``"upsert"`` or ``"delete"``, or None to skip.
+        """
         if audit_row is None:
             if event.op.upper() == "DELETE":
-                self.log.info("Deleting change event", extra={"id": event.aggregate_id})
-                self.neo4j.write(self._delete_cypher(), {"id": event.aggregate_id})
-            else:
-                self.log.warning("Audit row missing; skipping", extra={"id": event.aggregate_id, "op": event.op})
-            return
-
-        label = TABLE_TO_LABEL.get(audit_row["table_name"])
-        cypher = self._upsert_cypher(label)
+                return "delete", None, {"id": event.aggregate_id}
+            self.log.warning("Audit row missing; skipping", extra={"id": event.aggregate_id, "op": event.op})
+            return None
 
         params = {
             "id": audit_row["id"],
@@ -84,5 +168,98 @@ class AuditPipeline:
             "user_agent": audit_row["user_agent"],
             "changed_by": audit_row.get("changed_by"),
         }
-        self.neo4j.write(cypher, params)
-        self.log.info("Upserted change event", extra={"id": audit_row["id"], "table": audit_row["table_name"]})
+        return "upsert", TABLE_TO_LABEL.get(audit_row["table_name"]), params
+
+    def _cache_entry(self, params: Dict) -> CacheEntry:
+        return "ChangeEvent", str(params["id"]), params
+
+    def _references(self, rows: List[Dict]) -> Dict[str, Dict]:
+        return {"InternalUser": {row.get("changed_by"): {} for row in rows}}
+
+    def _ensure_references(self, rows: List[Dict]) -> None:
+        for label, nodes in self._references(rows).items():
+            self.reference_nodes.ensure(label, nodes)
+
+    def _write(self, action: str, label: Optional[str], params: Dict) -> None:
+        if action == "delete":
+            self.log.info("Deleting change event", extra={"id": params["id"]})
+            self.neo4j.write(self._delete_cypher(), params)
+            return
+        self._ensure_references([params])
+        self.neo4j.write(self._upsert_cypher(label), params)
+        self.log.info("Upserted change event", extra={"id": params["id"], "table": params["table_name"]})
+
+    def handle_event(self, event: OutboxEvent) -> None:
+        with self.pg_pool.connection() as conn:
+            audit_row = self.load_audit(conn, event.aggregate_id)
+
+        planned = self._plan(event, audit_row)
+        if planned is not None:
+            self._write(*planned)
+
+    def handle_batch(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, Exception]]:
+        """Handle audit events with one Supabase load and one UNWIND write per action/label.
+
+        Returns the events that failed; the rest were written or deliberately skipped.
+        """
+        with self.pg_pool.connection() as conn:
+            rows_by_id = self.load_audit_many(conn, list({event.aggregate_id for event in events}))
+        return self.apply_loaded(events, rows_by_id)
+
+    async def handle_batch_async(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, Exception]]:
+        """``handle_batch`` for a pipeline built on ``AsyncPostgresPool``/``AsyncNeo4jClient``."""
+        async with self.pg_pool.connection() as conn:
+            rows_by_id = await self.load_audit_many_async(conn, list({event.aggregate_id for event in events}))
+        return await self.apply_loaded_async(events, rows_by_id)
+
+    async def handle_event_async(self, event: OutboxEvent) -> None:
+        """Async single-event path: the batch statements over one event; raises its failure."""
+        failures = await self.handle_batch_async([event])
+        if failures:
+            raise failures[0][1]
+
+    def apply_loaded(self, events: List[OutboxEvent], rows_by_id: Dict[str, Dict]) -> List[Tuple[OutboxEvent, Exception]]:
+        """Plan and write events whose audit rows are already loaded; returns the failures."""
+        return write_groups(self.neo4j, self.reference_nodes, *self._groups(events, rows_by_id), self.log)
+
+    async def apply_loaded_async(self, events: List[OutboxEvent], rows_by_id: Dict[str, Dict]) -> List[Tuple[OutboxEvent, Exception]]:
+        return await write_groups_async(self.neo4j, self.reference_nodes, *self._groups(events, rows_by_id), self.log)
+
+    def _groups(
+        self,
+        events: List[OutboxEvent],
+        rows_by_id: Dict[str, Dict],
+    ) -> Tuple[List[WriteGroup], List[Tuple[OutboxEvent, Exception]]]:
+        """Plan a batch into one write group per action/label, minus unchanged rows; also returns planning failures."""
+        failures: List[Tuple[OutboxEvent, Exception]] = []
+        grouped: Dict[Tuple[str, Optional[str]], List[Tuple[OutboxEvent, Dict]]] = {}
+        for event in events:
+            if self.write_cache is not None and event.op.upper() == "DELETE":
+                self.write_cache.invalidate("ChangeEvent", event.aggregate_id)
+            try:
+                planned = self._plan(event, rows_by_id.get(event.aggregate_id))
+            except Exception as exc:  # noqa: BLE001
+                failures.append((event, exc))
+                continue
+            if planned is not None:
+                action, label, params = planned
+                grouped.setdefault((action, label), []).append((event, params))
+
+        groups: List[WriteGroup] = []
+        for (action, label), items in grouped.items():
+            cache = self.write_cache if action == "upsert" else None
+            if cache is not None:
+                items = cache.skip_unchanged(items, self._cache_entry)
+                if not items:
+                    continue
+            groups.append(WriteGroup(
+                self._bulk_delete_cypher() if action == "delete" else self._bulk_upsert_cypher(label),
+                items,
+                "Wrote change event batch",
+                {"action": action, "label": label, "events": len(items)},
+                references=self._references([params for _, params in items]) if action == "upsert" else {},
+                cache=cache,
+                cache_entry=self._cache_entry,
+                key_column="key",
+            ))
+        return groups, failures
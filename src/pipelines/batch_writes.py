@@ -0,0 +1,94 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from src.domain.models.events import OutboxEvent
+from src.domain.services.reference_nodes import ReferenceNodeStage
+from src.domain.services.write_cache import CacheEntry, WriteSuppressionCache
+
+
+@dataclass
+class WriteGroup:
+    """One planned ``write_rows`` call: the UNWIND statement and the ``(event, params)`` it writes.
+
+    ``references`` are the ``label -> {key: props}`` nodes the statement MATCHes, upserted
+    first; ``cache`` (with ``cache_entry``) remembers the rows that were written. When the
+    statement MATCHes nodes this worker does not create, it RETURNs ``key_column`` for the
+    rows that matched and only those are remembered. Pipelines build groups once and hand
+    them to ``write_groups`` or ``write_groups_async``, so the sync and async workers send
+    identical Cypher.
+    """
+
+    cypher: str
+    items: List[Tuple[OutboxEvent, Dict]]
+    message: str
+    extra: Dict[str, Any] = field(default_factory=dict)
+    references: Dict[str, Dict[Hashable, Dict[str, Any]]] = field(default_factory=dict)
+    cache: Optional[WriteSuppressionCache] = None
+    cache_entry: Optional[Callable[[Dict], CacheEntry]] = None
+    key_column: Optional[str] = None
+
+    def rows(self) -> List[Dict]:
+        return [params for _, params in self.items]
+
+    def settle(
+        self,
+        failed: List[Tuple[int, Exception]],
+        records: List[Dict],
+        failures: List[Tuple[OutboxEvent, Exception]],
+        log,
+    ) -> None:
+        failures.extend((self.items[index][0], exc) for index, exc in failed)
+        if self.cache is not None:
+            matched = None
+            if self.key_column is not None:
+                matched = {str(record[self.key_column]) for record in records}
+            self.cache.record_written(self.items, failed, self.cache_entry, matched)
+        log.info(self.message, extra={**self.extra, "failed": len(failed)})
+
+
+def write_groups(
+    neo4j,
+    reference_nodes: Optional[ReferenceNodeStage],
+    groups: List[WriteGroup],
+    failures: List[Tuple[OutboxEvent, Exception]],
+    log,
+) -> List[Tuple[OutboxEvent, Exception]]:
+    """Write every group through ``neo4j.write_rows``; returns ``failures`` extended with new ones.
+
+    The whole batch runs on one Neo4j session. If a group's reference upsert fails, every
+    event in that group fails with it.
+    """
+    with neo4j.session_scope():
+        for group in groups:
+            try:
+                for label, nodes in group.references.items():
+                    reference_nodes.ensure(label, nodes)
+            except Exception as exc:  # noqa: BLE001
+                failures.extend((event, exc) for event, _ in group.items)
+                continue
+            records: List[Dict] = []
+            failed = neo4j.write_rows(group.cypher, group.rows(), records=records)
+            group.settle(failed, records, failures, log)
+    return failures
+
+
+async def write_groups_async(
+    neo4j,
+    reference_nodes: Optional[ReferenceNodeStage],
+    groups: List[WriteGroup],
+    failures: List[Tuple[OutboxEvent, Exception]],
+    log,
+) -> List[Tuple[OutboxEvent, Exception]]:
+    """``write_groups`` through an ``AsyncNeo4jClient``."""
+    async with neo4j.session_scope():
+        for group in groups:
+            try:
+                for label, nodes in group.references.items():
+                    await reference_nodes.ensure_async(label, nodes)
+            except Exception as exc:  # noqa: BLE001
+                failures.extend((event, exc) for event, _ in group.items)
+                continue
+            records: List[Dict] = []
+            failed = await neo4j.write_rows(group.cypher, group.rows(), records=records)
+            group.settle(failed, records, failures, log)
+    return failures
@@ -1,9 +1,16 @@
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
 
 from src.adapters.neo4j.client import Neo4jClient
+from src.adapters.neo4j.templates import cypher_template
+from src.adapters.supabase import async_db as apg
 from src.adapters.supabase import db as pg
 from src.config.settings import Settings
 from src.domain.models.events import OutboxEvent
+from src.domain.services.reference_nodes import ReferenceNodeStage
+from src.domain.services.write_cache import CacheEntry, WriteSuppressionCache
+from src.pipelines.batch_writes import WriteGroup, write_groups, write_groups_async
 from src.utils.logging import configure_logging
 
 
@@ -14,15 +21,59 @@ ENTITY_LABELS = {
     "nutrition_fact": "NutritionFact",
 }
 
+LINEAGE_ROW_LIMIT = 5
+
+SYNC_MODES = ("incremental", "rebuild")
+
+# data_lineage columns that end up on LineageRun/SourceSystem/Bronze/Silver nodes
+LINEAGE_RUN_FIELDS = (
+    "id",
+    "source_system",
+    "transformation_applied",
+    "ingested_at",
+    "processed_at",
+    "created_at",
+    "bronze_record_id",
+    "silver_record_id",
+)
+
+
+@dataclass
+class SyncedRuns:
+    """The LineageRun ids an entity is linked to in the graph, and the oldest one's ``processed_at``."""
+
+    run_ids: Set[str]
+    oldest: Optional[datetime]
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Comparable timestamp: naive values (timestamp without time zone) are taken as UTC."""
+    if hasattr(value, "to_native"):
+        value = value.to_native()
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
 
 class LineagePipeline:
     """Build lineage subgraph around a Gold entity using data_lineage rows."""
 
-    def __init__(self, settings: Settings, pg_pool: pg.PostgresPool, neo4j: Neo4jClient):
+    def __init__(
+        self,
+        settings: Settings,
+        pg_pool: pg.PostgresPool,
+        neo4j: Neo4jClient,
+        write_cache: Optional[WriteSuppressionCache] = None,
+        reference_nodes: Optional[ReferenceNodeStage] = None,
+    ):
         self.settings = settings
         self.pg_pool = pg_pool
         self.neo4j = neo4j
+        self.write_cache = write_cache
+        # Main writes MATCH reference nodes, so there is always a stage to create them.
+        self.reference_nodes = reference_nodes or ReferenceNodeStage(neo4j)
         self.log = configure_logging("lineage_pipeline")
+        self.sync_mode = settings.lineage_sync_mode
+        if self.sync_mode not in SYNC_MODES:
+            raise ValueError(f"LINEAGE_SYNC_MODE must be one of {SYNC_MODES}, got {self.sync_mode!r}")
 
     def load_lineage_rows(self, conn, entity_id: str) -> List[Dict]:
         sql = """
@@ -30,61 +81,402 @@ class LineagePipeline:
         FROM data_lineage
         WHERE entity_id = %s
         ORDER BY processed_at DESC
-        LIMIT 5;
+        LIMIT %s;
+        """
+        return pg.fetch_all(conn, sql, (entity_id, LINEAGE_ROW_LIMIT))
+
+    def load_lineage_rows_many(self, conn, entity_ids: List[str]) -> Dict[str, List[Dict]]:
+        """Latest lineage rows for every entity in one query, keyed by entity_id."""
+        if not entity_ids:
+            return {}
+        return self.index_rows(pg.fetch_all(conn, *self.load_many_query(entity_ids)))
+
+    def load_lineage_rows_since(self, conn, entity_ids: List[str], since: datetime) -> Dict[str, List[Dict]]:
+        """Like ``load_lineage_rows_many`` but only rows processed at or after ``since``."""
+        if not entity_ids:
+            return {}
+        return self.index_rows(pg.fetch_all(conn, *self.load_many_query(entity_ids, since)))
+
+    async def load_lineage_rows_many_async(
+        self,
+        conn,
+        entity_ids: List[str],
+        since: Optional[datetime] = None,
+    ) -> Dict[str, List[Dict]]:
+        if not entity_ids:
+            return {}
+        return self.index_rows(await apg.fetch_all(conn, *self.load_many_query(entity_ids, since)))
+
+    def load_many_query(self, entity_ids: List[str], since: Optional[datetime] = None) -> Tuple[str, tuple]:
+        """Latest ``LINEAGE_ROW_LIMIT`` rows per entity, only those processed at or after ``since`` if given."""
+        newer = "AND dl.processed_at >= %s" if since is not None else ""
+        sql = f"""
+        SELECT *
+        FROM (
+            SELECT dl.*,
+                   ROW_NUMBER() OVER (PARTITION BY dl.entity_id ORDER BY dl.processed_at DESC) AS lineage_rank
+            FROM data_lineage dl
+            WHERE dl.entity_id = ANY(%s)
+              {newer}
+        ) ranked
+        WHERE lineage_rank <= %s
+        ORDER BY entity_id, lineage_rank;
+        """
+        params = (list(entity_ids),) + ((since,) if since is not None else ())
+        return sql, params + (LINEAGE_ROW_LIMIT,)
+
+    def index_rows(self, rows) -> Dict[str, List[Dict]]:
+        """Group ranked lineage rows by entity_id, dropping the rank column."""
+        rows_by_entity: Dict[str, List[Dict]] = {}
+        for row in rows:
+            row = dict(row)
+            row.pop("lineage_rank", None)
+            rows_by_entity.setdefault(str(row["entity_id"]), []).append(row)
+        return rows_by_entity
+
+    def backfill_query(self, after_key: Optional[str]) -> Tuple[str, tuple]:
+        """Latest lineage rows for every entity after ``after_key``, ordered by entity_id."""
+        where = "WHERE dl.entity_id > %s" if after_key is not None else ""
+        sql = f"""
+        SELECT *
+        FROM (
+            SELECT dl.*,
+                   ROW_NUMBER() OVER (PARTITION BY dl.entity_id ORDER BY dl.processed_at DESC) AS lineage_rank
+            FROM data_lineage dl
+            {where}
+        ) ranked
+        WHERE lineage_rank <= %s
+        ORDER BY entity_id, lineage_rank;
         """
-        return pg.fetch_all(conn, sql, (entity_id,))
+        params = (after_key,) if after_key is not None else ()
+        return sql, params + (LINEAGE_ROW_LIMIT,)
 
     def entity_label(self, entity_type: str) -> Optional[str]:
         return ENTITY_LABELS.get(entity_type.lower())
 
+    @cypher_template("lineage.synced_runs")
+    def _synced_runs_cypher(self) -> str:
+        # Lineage events don't carry the entity type, so look the id up under every label.
+        branches = "\n          UNION\n".join(
+            f"""          WITH entity_id
+          MATCH (e:{label} {{id: entity_id}})
+          RETURN e""" for label in sorted(set(ENTITY_LABELS.values()))
+        )
+        return f"""
+        UNWIND $entity_ids AS entity_id
+        CALL {{
+{branches}
+        }}
+        OPTIONAL MATCH (e)-[:PRODUCED_BY]->(lr:LineageRun)
+        RETURN entity_id, collect(lr.id) AS run_ids, min(lr.processed_at) AS oldest
+        """
+
+    def load_synced_runs(self, entity_ids: List[str]) -> Dict[str, SyncedRuns]:
+        """The runs each entity already has in the graph; entities with none are left out."""
+        return self._synced(self.neo4j.read(self._synced_runs_cypher(), {"entity_ids": list(entity_ids)}))
+
+    async def load_synced_runs_async(self, entity_ids: List[str]) -> Dict[str, SyncedRuns]:
+        return self._synced(await self.neo4j.read(self._synced_runs_cypher(), {"entity_ids": list(entity_ids)}))
+
+    def _synced(self, records) -> Dict[str, SyncedRuns]:
+        synced: Dict[str, SyncedRuns] = {}
+        for record in records:
+            if record.get("run_ids"):
+                oldest = _as_utc(record["oldest"]) if record.get("oldest") is not None else None
+                synced[str(record["entity_id"])] = SyncedRuns({str(run_id) for run_id in record["run_ids"]}, oldest)
+        return synced
+
+    @cypher_template("lineage.upsert")
     def _upsert_cypher(self, label: str) -> str:
-        # label interpolated; guard upstream.
+        # label is interpolated; the template registry checks it against the allowlist.
         return f"""
         MATCH (e:{label} {{id: $entity_id}})
 
         // Clear old lineage edges
         OPTIONAL MATCH (e)-[old:PRODUCED_BY]->(:LineageRun)
-        DELETE old;
+        DELETE old
+
+        WITH DISTINCT e
+        UNWIND $rows AS row
+        {self._lineage_run_cypher()}
+        """
+
+    @cypher_template("lineage.bulk_upsert")
+    def _bulk_upsert_cypher(self, label: str) -> str:
+        # One row per entity: {entity_id, rows}.
+        return f"""
+        UNWIND $rows AS entity
+        MATCH (e:{label} {{id: entity.entity_id}})
+
+        // Clear old lineage edges
+        OPTIONAL MATCH (e)-[old:PRODUCED_BY]->(:LineageRun)
+        DELETE old
+
+        WITH DISTINCT e, entity
+        UNWIND entity.rows AS row
+        {self._lineage_run_cypher()}
+        RETURN DISTINCT row.entity_id AS key
+        """
+
+    @cypher_template("lineage.bulk_incremental")
+    def _bulk_incremental_cypher(self, label: str) -> str:
+        # Rows are only runs the entity is not linked to yet; existing edges stay put and only
+        # runs that fell out of the newest-LINEAGE_ROW_LIMIT window are unlinked.
+        return f"""
+        UNWIND $rows AS entity
+        MATCH (e:{label} {{id: entity.entity_id}})
 
-        WITH e, $rows AS rows
-        UNWIND rows AS row
-          MERGE (ss:SourceSystem {{name: row.source_system}})
-          MERGE (lr:LineageRun {{id: row.id}})
+        WITH e, entity
+        CALL {{
+          WITH e, entity
+          UNWIND entity.rows AS row
+          {self._lineage_run_cypher()}
+        }}
+
+        WITH e, entity
+        MATCH (e)-[r:PRODUCED_BY]->(lr:LineageRun)
+        WITH e, entity, r, lr
+        ORDER BY lr.processed_at DESC
+        WITH e, entity, collect(r) AS runs
+        FOREACH (stale IN runs[{LINEAGE_ROW_LIMIT}..] | DELETE stale)
+        RETURN entity.entity_id AS key
+        """
+
+    def _lineage_run_cypher(self) -> str:
+        # SourceSystem is upserted up front by the reference-node stage and only MATCHed here,
+        # last, so a missing one drops the EMITTED_BY edge rather than the run.
+        return """
+          MERGE (lr:LineageRun {id: row.id})
           SET lr.transformation_applied = row.transformation_applied,
               lr.ingested_at = datetime(row.ingested_at),
               lr.processed_at = datetime(row.processed_at),
               lr.created_at = datetime(row.created_at)
           MERGE (e)-[:PRODUCED_BY]->(lr)
-          MERGE (lr)-[:EMITTED_BY]->(ss)
           FOREACH (_ IN CASE WHEN row.bronze_record_id IS NULL THEN [] ELSE [1] END |
-            MERGE (br:BronzeRecord {{id: row.bronze_record_id}})
+            MERGE (br:BronzeRecord {id: row.bronze_record_id})
             MERGE (lr)-[:CONSUMED]->(br)
           )
           FOREACH (_ IN CASE WHEN row.silver_record_id IS NULL THEN [] ELSE [1] END |
-            MERGE (sr:SilverRecord {{id: row.silver_record_id}})
+            MERGE (sr:SilverRecord {id: row.silver_record_id})
             MERGE (lr)-[:CONSUMED]->(sr)
-          );
+          )
+          WITH lr, row
+          MATCH (ss:SourceSystem {name: row.source_system})
+          MERGE (lr)-[:EMITTED_BY]->(ss)
         """
 
+    @cypher_template("lineage.delete")
     def _delete_cypher(self, label: str) -> str:
         return f"MATCH (e:{label} {{id: $entity_id}})-[r:PRODUCED_BY]->(:LineageRun) DELETE r;"
 
-    def handle_event(self, event: OutboxEvent) -> None:
+    def _plan(self, event: OutboxEvent, rows: List[Dict]) -> Optional[Tuple[str, Dict]]:
+        """Decide what to write for one event given its loaded rows; None means skip."""
         entity_id = event.aggregate_id
-        with self.pg_pool.connection() as conn:
-            rows = self.load_lineage_rows(conn, entity_id)
-
         if not rows:
             self.log.warning("No lineage rows for entity", extra={"entity_id": entity_id, "op": event.op})
-            return
+            return None
 
         entity_type = rows[0].get("entity_type")
         label = self.entity_label(entity_type)
         if not label:
             self.log.warning("Unsupported entity_type for lineage", extra={"entity_type": entity_type, "entity_id": entity_id})
-            return
+            return None
+
+        return label, {"entity_id": entity_id, "rows": rows}
+
+    def _cache_entry(self, params: Dict) -> CacheEntry:
+        rows = [{field: row.get(field) for field in LINEAGE_RUN_FIELDS} for row in params["rows"]]
+        return "Lineage", params["entity_id"], {"rows": rows}
+
+    def _references(self, entities: List[Dict]) -> Dict[str, Dict]:
+        names = {row.get("source_system") for entity in entities for row in entity["rows"]}
+        return {"SourceSystem": {name: {} for name in names}}
+
+    def _ensure_references(self, entities: List[Dict]) -> None:
+        for label, nodes in self._references(entities).items():
+            self.reference_nodes.ensure(label, nodes)
+
+    def _write(self, label: str, params: Dict) -> None:
+        self._ensure_references([params])
+        self.neo4j.write(self._upsert_cypher(label), params)
+        self.log.info("Upserted lineage", extra={"entity_id": params["entity_id"], "rows": len(params["rows"]), "label": label})
+
+    def handle_event(self, event: OutboxEvent) -> None:
+        with self.pg_pool.connection() as conn:
+            rows = self.load_lineage_rows(conn, event.aggregate_id)
+
+        planned = self._plan(event, rows)
+        if planned is not None:
+            self._write(*planned)
+
+    def handle_batch(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, Exception]]:
+        """Handle lineage events with one Supabase load and one UNWIND write per label.
+
+        In ``incremental`` mode entities with only INSERT events get just the runs in their
+        latest-runs window that the graph does not link yet, whatever their ``processed_at``
+        (late, backdated or tied runs included); an UPDATE or DELETE can change or remove runs
+        already linked, so those entities are rebuilt. ``rebuild`` re-links the latest runs of every
+        entity from scratch. Returns the events that failed; the rest were written or
+        deliberately skipped.
+        """
+        entity_ids = list({event.aggregate_id for event in events})
+        if self.sync_mode == "incremental":
+            return self._handle_incremental(events, entity_ids)
+
+        with self.pg_pool.connection() as conn:
+            rows_by_entity = self.load_lineage_rows_many(conn, entity_ids)
+        return self.apply_loaded(events, rows_by_entity)
+
+    def _handle_incremental(self, events: List[OutboxEvent], entity_ids: List[str]) -> List[Tuple[OutboxEvent, Exception]]:
+        rebuild_ids = self._rebuild_ids(events)
+        incremental_ids = [entity_id for entity_id in entity_ids if entity_id not in rebuild_ids]
+        synced = self.load_synced_runs(incremental_ids) if incremental_ids else {}
+        since = self._incremental_since(synced, incremental_ids)
+        full_rows: Dict[str, List[Dict]] = {}
+        new_rows: Dict[str, List[Dict]] = {}
+        with self.pg_pool.connection() as conn:
+            if rebuild_ids:
+                full_rows = self.load_lineage_rows_many(conn, sorted(rebuild_ids))
+            if incremental_ids and since is None:
+                new_rows = self.load_lineage_rows_many(conn, incremental_ids)
+            elif incremental_ids:
+                new_rows = self.load_lineage_rows_since(conn, incremental_ids, since)
+        groups, failures = self._incremental_groups(events, rebuild_ids, synced, full_rows, new_rows)
+        return write_groups(self.neo4j, self.reference_nodes, groups, failures, self.log)
+
+    async def handle_batch_async(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, Exception]]:
+        """``handle_batch`` for a pipeline built on ``AsyncPostgresPool``/``AsyncNeo4jClient``."""
+        entity_ids = list({event.aggregate_id for event in events})
+        if self.sync_mode == "incremental":
+            rebuild_ids = self._rebuild_ids(events)
+            incremental_ids = [entity_id for entity_id in entity_ids if entity_id not in rebuild_ids]
+            synced = await self.load_synced_runs_async(incremental_ids) if incremental_ids else {}
+            full_rows: Dict[str, List[Dict]] = {}
+            new_rows: Dict[str, List[Dict]] = {}
+            async with self.pg_pool.connection() as conn:
+                if rebuild_ids:
+                    full_rows = await self.load_lineage_rows_many_async(conn, sorted(rebuild_ids))
+                if incremental_ids:
+                    new_rows = await self.load_lineage_rows_many_async(
+                        conn, incremental_ids, self._incremental_since(synced, incremental_ids)
+                    )
+            groups, failures = self._incremental_groups(events, rebuild_ids, synced, full_rows, new_rows)
+            return await write_groups_async(self.neo4j, self.reference_nodes, groups, failures, self.log)
+
+        async with self.pg_pool.connection() as conn:
+            rows_by_entity = await self.load_lineage_rows_many_async(conn, entity_ids)
+        return await self.apply_loaded_async(events, rows_by_entity)
+
+    async def handle_event_async(self, event: OutboxEvent) -> None:
+        """Async single-event path: the batch statements over one event; raises its failure."""
+        failures = await self.handle_batch_async([event])
+        if failures:
+            raise failures[0][1]
+
+    def _incremental_since(self, synced: Dict[str, SyncedRuns], entity_ids: List[str]) -> Optional[datetime]:
+        # One query for the batch. An entity linked to a full window of runs only needs rows from
+        # its oldest linked run on: anything older falls outside the window. Any entity with a
+        # partial window needs all of it.
+        full = [synced.get(entity_id) for entity_id in entity_ids]
+        if not full or any(runs is None or runs.oldest is None or len(runs.run_ids) < LINEAGE_ROW_LIMIT for runs in full):
+            return None
+        return min(runs.oldest for runs in full)
+
+    def _rebuild_ids(self, events: List[OutboxEvent]) -> Set[str]:
+        # Only inserts are guaranteed to just add runs; anything else may edit or delete runs
+        # the graph already has.
+        return {event.aggregate_id for event in events if event.op.upper() != "INSERT"}
+
+    def _incremental_groups(
+        self,
+        events: List[OutboxEvent],
+        rebuild_ids: Set[str],
+        synced: Dict[str, SyncedRuns],
+        full_rows: Dict[str, List[Dict]],
+        new_rows: Dict[str, List[Dict]],
+    ) -> Tuple[List[WriteGroup], List[Tuple[OutboxEvent, Exception]]]:
+        """Rebuild groups for ``rebuild_ids`` plus incremental groups for everything else."""
+        rebuilt = [event for event in events if event.aggregate_id in rebuild_ids]
+        pending, unlinked = self._unlinked_runs(
+            [event for event in events if event.aggregate_id not in rebuild_ids], synced, new_rows
+        )
+        groups, failures = self._groups(rebuilt, full_rows, incremental=False)
+        incremental_groups, incremental_failures = self._groups(pending, unlinked, incremental=True)
+        return groups + incremental_groups, failures + incremental_failures
+
+    def _unlinked_runs(
+        self,
+        events: List[OutboxEvent],
+        synced: Dict[str, SyncedRuns],
+        rows_by_entity: Dict[str, List[Dict]],
+    ) -> Tuple[List[OutboxEvent], Dict[str, List[Dict]]]:
+        """Events whose entity has runs the graph does not link yet, and just those runs."""
+        pending: List[OutboxEvent] = []
+        new_rows: Dict[str, List[Dict]] = {}
+        for event in events:
+            runs = synced.get(event.aggregate_id)
+            rows = rows_by_entity.get(event.aggregate_id, [])
+            if runs is not None:
+                rows = [row for row in rows if str(row["id"]) not in runs.run_ids]
+                if not rows:
+                    continue  # already in sync
+            new_rows[event.aggregate_id] = rows
+            pending.append(event)
+        return pending, new_rows
+
+    def apply_loaded(
+        self,
+        events: List[OutboxEvent],
+        rows_by_entity: Dict[str, List[Dict]],
+        incremental: bool = False,
+    ) -> List[Tuple[OutboxEvent, Exception]]:
+        """Plan and write events whose lineage rows are already loaded; returns the failures."""
+        return write_groups(self.neo4j, self.reference_nodes, *self._groups(events, rows_by_entity, incremental), self.log)
+
+    async def apply_loaded_async(
+        self,
+        events: List[OutboxEvent],
+        rows_by_entity: Dict[str, List[Dict]],
+        incremental: bool = False,
+    ) -> List[Tuple[OutboxEvent, Exception]]:
+        groups, failures = self._groups(events, rows_by_entity, incremental)
+        return await write_groups_async(self.neo4j, self.reference_nodes, groups, failures, self.log)
+
+    def _groups(
+        self,
+        events: List[OutboxEvent],
+        rows_by_entity: Dict[str, List[Dict]],
+        incremental: bool,
+    ) -> Tuple[List[WriteGroup], List[Tuple[OutboxEvent, Exception]]]:
+        """Plan a batch into one write group per label, minus unchanged rows; also returns planning failures."""
+        failures: List[Tuple[OutboxEvent, Exception]] = []
+        by_label: Dict[str, List[Tuple[OutboxEvent, Dict]]] = {}
+        for event in events:
+            if self.write_cache is not None and event.op.upper() == "DELETE":
+                self.write_cache.invalidate("Lineage", event.aggregate_id)
+            try:
+                planned = self._plan(event, rows_by_entity.get(event.aggregate_id, []))
+            except Exception as exc:  # noqa: BLE001
+                failures.append((event, exc))
+                continue
+            if planned is not None:
+                label, params = planned
+                by_label.setdefault(label, []).append((event, params))
 
-        cypher = self._upsert_cypher(label)
-        params = {"entity_id": entity_id, "rows": rows}
-        self.neo4j.write(cypher, params)
-        self.log.info("Upserted lineage", extra={"entity_id": entity_id, "rows": len(rows), "label": label})
+        groups: List[WriteGroup] = []
+        for label, items in by_label.items():
+            if self.write_cache is not None:
+                items = self.write_cache.skip_unchanged(items, self._cache_entry)
+                if not items:
+                    continue
+            groups.append(WriteGroup(
+                self._bulk_incremental_cypher(label) if incremental else self._bulk_upsert_cypher(label),
+                items,
+                "Upserted lineage batch",
+                {"label": label, "entities": len(items), "incremental": incremental},
+                references=self._references([params for _, params in items]),
+                cache=self.write_cache,
+                cache_entry=self._cache_entry,
+                key_column="key",
+            ))
+        return groups, failures
@@ -1,9 +1,13 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 from src.adapters.neo4j.client import Neo4jClient
+from src.adapters.neo4j.templates import cypher_template
+from src.adapters.supabase import async_db as apg
 from src.adapters.supabase import db as pg
 from src.config.settings import Settings
 from src.domain.models.events import OutboxEvent
+from src.domain.services.write_cache import CacheEntry, WriteSuppressionCache
+from src.pipelines.batch_writes import WriteGroup, write_groups, write_groups_async
 from src.utils.logging import configure_logging
 
 
@@ -17,10 +21,17 @@ ENTITY_LABELS = {
 class QualityPipeline:
     """Attach data quality scores to entities."""
 
-    def __init__(self, settings: Settings, pg_pool: pg.PostgresPool, neo4j: Neo4jClient):
+    def __init__(
+        self,
+        settings: Settings,
+        pg_pool: pg.PostgresPool,
+        neo4j: Neo4jClient,
+        write_cache: Optional[WriteSuppressionCache] = None,
+    ):
         self.settings = settings
         self.pg_pool = pg_pool
         self.neo4j = neo4j
+        self.write_cache = write_cache
         self.log = configure_logging("quality_pipeline")
 
     def load_quality(self, conn, entity_id: str) -> Optional[Dict]:
@@ -33,6 +44,56 @@ class QualityPipeline:
         """
         return pg.fetch_one(conn, sql, (entity_id,))
 
+    def load_quality_many(self, conn, entity_ids: List[str]) -> Dict[str, Dict]:
+        """Latest quality row for every entity in one query, keyed by entity_id."""
+        if not entity_ids:
+            return {}
+        return self.index_rows(pg.fetch_all(conn, *self.load_many_query(entity_ids)))
+
+    async def load_quality_many_async(self, conn, entity_ids: List[str]) -> Dict[str, Dict]:
+        if not entity_ids:
+            return {}
+        return self.index_rows(await apg.fetch_all(conn, *self.load_many_query(entity_ids)))
+
+    def load_many_query(self, entity_ids: List[str]) -> Tuple[str, tuple]:
+        sql = """
+        SELECT *
+        FROM (
+            SELECT dq.*,
+                   ROW_NUMBER() OVER (PARTITION BY dq.entity_id ORDER BY dq.last_checked DESC) AS quality_rank
+            FROM data_quality_scores dq
+            WHERE dq.entity_id = ANY(%s)
+        ) ranked
+        WHERE quality_rank = 1;
+        """
+        return sql, (list(entity_ids),)
+
+    def index_rows(self, rows) -> Dict[str, Dict]:
+        """Key ranked quality rows by entity_id, dropping the rank column."""
+        rows_by_entity: Dict[str, Dict] = {}
+        for row in rows:
+            row = dict(row)
+            row.pop("quality_rank", None)
+            rows_by_entity[str(row["entity_id"])] = row
+        return rows_by_entity
+
+    def backfill_query(self, after_key: Optional[str]) -> Tuple[str, tuple]:
+        """Latest quality row for every entity after ``after_key``, ordered by entity_id."""
+        where = "WHERE dq.entity_id > %s" if after_key is not None else ""
+        sql = f"""
+        SELECT *
+        FROM (
+            SELECT dq.*,
+                   ROW_NUMBER() OVER (PARTITION BY dq.entity_id ORDER BY dq.last_checked DESC) AS quality_rank
+            FROM data_quality_scores dq
+            {where}
+        ) ranked
+        WHERE quality_rank = 1
+        ORDER BY entity_id;
+        """
+        return sql, (after_key,) if after_key is not None else ()
+
+    @cypher_template("quality.upsert")
     def _upsert_cypher(self, label: str) -> str:
         return f"""
         MATCH (e:{label} {{id: $entity_id}})
@@ -43,19 +104,30 @@ class QualityPipeline:
             e.dq_issues = $issues
         """
 
-    def handle_event(self, event: OutboxEvent) -> None:
-        entity_id = event.aggregate_id
-        with self.pg_pool.connection() as conn:
-            row = self.load_quality(conn, entity_id)
+    @cypher_template("quality.bulk_upsert")
+    def _bulk_upsert_cypher(self, label: str) -> str:
+        return f"""
+        UNWIND $rows AS row
+        MATCH (e:{label} {{id: row.entity_id}})
+        SET e.quality_score = row.quality_score,
+            e.completeness = row.completeness,
+            e.accuracy = row.accuracy,
+            e.dq_last_checked = datetime(row.last_checked),
+            e.dq_issues = row.issues
+        RETURN row.entity_id AS key
+        """
 
+    def _plan(self, event: OutboxEvent, row: Optional[Dict]) -> Optional[Tuple[str, Dict]]:
+        """Decide what to write for one event given its loaded row; None means skip."""
+        entity_id = event.aggregate_id
         if row is None:
             self.log.warning("No quality row for entity; skipping", extra={"entity_id": entity_id, "op": event.op})
-            return
+            return None
 
         label = ENTITY_LABELS.get(row["entity_type"])
         if not label:
             self.log.warning("Unsupported entity_type for quality", extra={"entity_type": row['entity_type'], "entity_id": entity_id})
-            return
+            return None
 
         params = {
             "entity_id": entity_id,
@@ -65,5 +137,88 @@ class QualityPipeline:
             "last_checked": row["last_checked"],
             "issues": row["issues"],
         }
+        return label, params
+
+    def _cache_entry(self, params: Dict) -> CacheEntry:
+        return "Quality", params["entity_id"], params
+
+    def _write(self, label: str, params: Dict) -> None:
         self.neo4j.write(self._upsert_cypher(label), params)
-        self.log.info("Updated quality on entity", extra={"entity_id": entity_id, "label": label})
+        self.log.info("Updated quality on entity", extra={"entity_id": params["entity_id"], "label": label})
+
+    def handle_event(self, event: OutboxEvent) -> None:
+        with self.pg_pool.connection() as conn:
+            row = self.load_quality(conn, event.aggregate_id)
+
+        planned = self._plan(event, row)
+        if planned is not None:
+            self._write(*planned)
+
+    def handle_batch(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, Exception]]:
+        """Handle quality events with one Supabase load and one UNWIND write per label.
+
+        Returns the events that failed; the rest were written or deliberately skipped.
+        """
+        with self.pg_pool.connection() as conn:
+            rows_by_entity = self.load_quality_many(conn, list({event.aggregate_id for event in events}))
+        return self.apply_loaded(events, rows_by_entity)
+
+    async def handle_batch_async(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, Exception]]:
+        """``handle_batch`` for a pipeline built on ``AsyncPostgresPool``/``AsyncNeo4jClient``."""
+        async with self.pg_pool.connection() as conn:
+            rows_by_entity = await self.load_quality_many_async(conn, list({event.aggregate_id for event in events}))
+        return await self.apply_loaded_async(events, rows_by_entity)
+
+    async def handle_event_async(self, event: OutboxEvent) -> None:
+        """Async single-event path: the batch statements over one event; raises its failure."""
+        failures = await self.handle_batch_async([event])
+        if failures:
+            raise failures[0][1]
+
+    def apply_loaded(self, events: List[OutboxEvent], rows_by_entity: Dict[str, Dict]) -> List[Tuple[OutboxEvent, Exception]]:
+        """Plan and write events whose quality rows are already loaded; returns the failures."""
+        return write_groups(self.neo4j, None, *self._groups(events, rows_by_entity), self.log)
+
+    async def apply_loaded_async(
+        self,
+        events: List[OutboxEvent],
+        rows_by_entity: Dict[str, Dict],
+    ) -> List[Tuple[OutboxEvent, Exception]]:
+        return await write_groups_async(self.neo4j, None, *self._groups(events, rows_by_entity), self.log)
+
+    def _groups(
+        self,
+        events: List[OutboxEvent],
+        rows_by_entity: Dict[str, Dict],
+    ) -> Tuple[List[WriteGroup], List[Tuple[OutboxEvent, Exception]]]:
+        """Plan a batch into one write group per label, minus unchanged rows; also returns planning failures."""
+        failures: List[Tuple[OutboxEvent, Exception]] = []
+        by_label: Dict[str, List[Tuple[OutboxEvent, Dict]]] = {}
+        for event in events:
+            if self.write_cache is not None and event.op.upper() == "DELETE":
+                self.write_cache.invalidate("Quality", event.aggregate_id)
+            try:
+                planned = self._plan(event, rows_by_entity.get(event.aggregate_id))
+            except Exception as exc:  # noqa: BLE001
+                failures.append((event, exc))
+                continue
+            if planned is not None:
+                label, params = planned
+                by_label.setdefault(label, []).append((event, params))
+
+        groups: List[WriteGroup] = []
+        for label, items in by_label.items():
+            if self.write_cache is not None:
+                items = self.write_cache.skip_unchanged(items, self._cache_entry)
+                if not items:
+                    continue
+            groups.append(WriteGroup(
+                self._bulk_upsert_cypher(label),
+                items,
+                "Updated quality batch",
+                {"label": label, "entities": len(items)},
+                cache=self.write_cache,
+                cache_entry=self._cache_entry,
+                key_column="key",
+            ))
+        return groups, failures
@@ -1,47 +1,166 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 from src.adapters.neo4j.client import Neo4jClient
+from src.adapters.supabase import async_db as apg
 from src.adapters.supabase import db as pg
 from src.config.settings import Settings
 from src.domain.models.events import OutboxEvent
+from src.domain.services.dimension_cache import DimensionCache
+from src.domain.services.reference_nodes import ReferenceNodeStage
+from src.domain.services.write_cache import CacheEntry, WriteSuppressionCache
+from src.pipelines.batch_writes import WriteGroup, write_groups, write_groups_async
 from src.utils.logging import configure_logging
 
 
+# mapping columns that end up on Vendor/Product/VendorProduct nodes and the MAPPED_TO edge
+MAPPING_FIELDS = (
+    "vendor_id",
+    "vendor_name",
+    "global_product_id",
+    "product_name",
+    "vendor_product_id",
+    "created_at",
+    "confidence_score",
+    "mapping_method",
+)
+
+
 class VendorMappingPipeline:
     """Upsert vendor_product_mappings as VendorProduct nodes mapped to canonical Products."""
 
-    def __init__(self, settings: Settings, pg_pool: pg.PostgresPool, neo4j: Neo4jClient):
+    def __init__(
+        self,
+        settings: Settings,
+        pg_pool: pg.PostgresPool,
+        neo4j: Neo4jClient,
+        write_cache: Optional[WriteSuppressionCache] = None,
+        reference_nodes: Optional[ReferenceNodeStage] = None,
+        dimension_cache: Optional[DimensionCache] = None,
+    ):
         self.settings = settings
         self.pg_pool = pg_pool
         self.neo4j = neo4j
+        self.write_cache = write_cache
+        # Main writes MATCH reference nodes, so there is always a stage to create them.
+        self.reference_nodes = reference_nodes or ReferenceNodeStage(neo4j)
+        self.dimension_cache = dimension_cache or DimensionCache(
+            settings.dimension_cache_size,
+            settings.dimension_cache_ttl_seconds,
+            settings.dimension_cache_refresh_seconds,
+        )
         self.log = configure_logging("vendor_mapping_pipeline")
 
     def load_mapping(self, conn, mapping_id: str) -> Optional[Dict]:
         sql = """
+        SELECT m.*
+        FROM vendor_product_mappings m
+        WHERE m.id = %s;
+        """
+        row = pg.fetch_one(conn, sql, (mapping_id,))
+        named = self.attach_names(conn, [row] if row is not None else [])
+        return named[0] if named else None
+
+    def load_mapping_many(self, conn, mapping_ids: List[str]) -> Dict[str, Dict]:
+        """Mappings for every id in one query, keyed by mapping id."""
+        if not mapping_ids:
+            return {}
+        return self.index_rows(self.attach_names(conn, pg.fetch_all(conn, *self.load_many_query(mapping_ids))))
+
+    async def load_mapping_many_async(self, conn, mapping_ids: List[str]) -> Dict[str, Dict]:
+        if not mapping_ids:
+            return {}
+        rows = await apg.fetch_all(conn, *self.load_many_query(mapping_ids))
+        return self.index_rows(await self.attach_names_async(conn, rows))
+
+    def load_many_query(self, mapping_ids: List[str]) -> Tuple[str, tuple]:
+        sql = """
+        SELECT m.*
+        FROM vendor_product_mappings m
+        WHERE m.id = ANY(%s);
+        """
+        return sql, (list(mapping_ids),)
+
+    def attach_names(self, conn, rows) -> List[Dict]:
+        """Add ``vendor_name``/``product_name`` from the dimension cache.
+
+        Rows whose vendor or product no longer exists are dropped, as the old JOIN did.
+        """
+        self.dimension_cache.refresh(conn)
+        vendor_names = self.dimension_cache.names(conn, "vendors", [row["vendor_id"] for row in rows])
+        product_names = self.dimension_cache.names(conn, "products", [row["global_product_id"] for row in rows])
+        return self._named(rows, vendor_names, product_names)
+
+    async def attach_names_async(self, conn, rows) -> List[Dict]:
+        await self.dimension_cache.refresh_async(conn)
+        vendor_names = await self.dimension_cache.names_async(conn, "vendors", [row["vendor_id"] for row in rows])
+        product_names = await self.dimension_cache.names_async(conn, "products", [row["global_product_id"] for row in rows])
+        return self._named(rows, vendor_names, product_names)
+
+    def _named(self, rows, vendor_names: Dict[str, Optional[str]], product_names: Dict[str, Optional[str]]) -> List[Dict]:
+        named = []
+        for row in rows:
+            vendor_id, product_id = str(row["vendor_id"]), str(row["global_product_id"])
+            if vendor_id not in vendor_names or product_id not in product_names:
+                continue
+            named.append({**row, "vendor_name": vendor_names[vendor_id], "product_name": product_names[product_id]})
+        return named
+
+    def index_rows(self, rows) -> Dict[str, Dict]:
+        return {str(row["id"]): row for row in rows}
+
+    def backfill_query(self, after_key: Optional[str]) -> Tuple[str, tuple]:
+        """Every mapping (with names) after ``after_key``, ordered by mapping id.
+
+        A full scan touches every vendor/product anyway, so it JOINs instead of using the cache.
+        """
+        where = "WHERE m.id > %s" if after_key is not None else ""
+        sql = f"""
         SELECT m.*, v.name AS vendor_name, p.name AS product_name
         FROM vendor_product_mappings m
         JOIN vendors v ON v.id = m.vendor_id
         JOIN products p ON p.id = m.global_product_id
-        WHERE m.id = %s;
+        {where}
+        ORDER BY m.id;
         """
-        return pg.fetch_one(conn, sql, (mapping_id,))
+        return sql, (after_key,) if after_key is not None else ()
 
     def _upsert_cypher(self) -> str:
+        # Vendor (with its name) is upserted up front by the reference-node stage.
         return """
-        MERGE (v:Vendor {id: $mapping.vendor_id})
-        SET v.name = $mapping.vendor_name
-
         MERGE (p:Product {id: $mapping.global_product_id})
         SET p.name = coalesce($mapping.product_name, p.name)
 
         MERGE (vp:VendorProduct {vendor_id: $mapping.vendor_id, vendor_product_id: $mapping.vendor_product_id})
         SET vp.created_at = datetime($mapping.created_at)
 
-        MERGE (v)-[:OWNS_SKU]->(vp)
         MERGE (vp)-[m:MAPPED_TO]->(p)
         SET m.confidence = $mapping.confidence_score,
             m.method = $mapping.mapping_method,
             m.created_at = datetime($mapping.created_at)
+
+        WITH vp
+        MATCH (v:Vendor {id: $mapping.vendor_id})
+        MERGE (v)-[:OWNS_SKU]->(vp)
+        """
+
+    def _bulk_upsert_cypher(self) -> str:
+        # Vendor (with its name) is upserted up front by the reference-node stage.
+        return """
+        UNWIND $rows AS mapping
+        MERGE (p:Product {id: mapping.global_product_id})
+        SET p.name = coalesce(mapping.product_name, p.name)
+
+        MERGE (vp:VendorProduct {vendor_id: mapping.vendor_id, vendor_product_id: mapping.vendor_product_id})
+        SET vp.created_at = datetime(mapping.created_at)
+
+        MERGE (vp)-[m:MAPPED_TO]->(p)
+        SET m.confidence = mapping.confidence_score,
+            m.method = mapping.mapping_method,
+            m.created_at = datetime(mapping.created_at)
+
+        WITH vp, mapping
+        MATCH (v:Vendor {id: mapping.vendor_id})
+        MERGE (v)-[:OWNS_SKU]->(vp)
         """
 
     def _delete_cypher(self) -> str:
@@ -50,25 +169,129 @@ class VendorMappingPipeline:
         DETACH DELETE vp;
         """
 
-    def handle_event(self, event: OutboxEvent) -> None:
-        with self.pg_pool.connection() as conn:
-            mapping = self.load_mapping(conn, event.aggregate_id)
+    def _bulk_delete_cypher(self) -> str:
+        return """
+        UNWIND $rows AS row
+        MATCH (vp:VendorProduct {vendor_id: row.vendor_id, vendor_product_id: row.vendor_product_id})
+        DETACH DELETE vp
+        """
+
+    def _plan(self, event: OutboxEvent, mapping: Optional[Dict]) -> Optional[Tuple[str, Dict]]:
+        """Decide what to write for one event given its loaded mapping.
 
+        Returns ``(action, params)`` with action ``"upsert"`` (params is the mapping row) or
+        ``"delete"`` (params carries the VendorProduct keys), or None to skip.
+        """
         if mapping is None:
             if event.op.upper() == "DELETE":
-                self.log.info("Deleting vendor mapping", extra={"id": event.aggregate_id})
                 # We need vendor_id/vendor_product_id to delete; attempt to get from payload if present
                 payload = event.payload or {}
                 vendor_id = payload.get("vendor_id")
                 vendor_product_id = payload.get("vendor_product_id")
                 if vendor_id and vendor_product_id:
-                    self.neo4j.write(self._delete_cypher(), {"vendor_id": vendor_id, "vendor_product_id": vendor_product_id})
-                else:
-                    self.log.warning("Cannot delete vendor mapping; missing keys", extra={"event_id": event.id})
+                    return "delete", {"id": event.aggregate_id, "vendor_id": vendor_id, "vendor_product_id": vendor_product_id}
+                self.log.warning("Cannot delete vendor mapping; missing keys", extra={"event_id": event.id})
             else:
                 self.log.warning("Vendor mapping missing in Supabase; skipping", extra={"id": event.aggregate_id, "op": event.op})
+            return None
+
+        return "upsert", mapping
+
+    def _cache_entry(self, params: Dict) -> CacheEntry:
+        key = f"{params['vendor_id']}:{params['vendor_product_id']}"
+        return "VendorProduct", key, {field: params.get(field) for field in MAPPING_FIELDS}
+
+    def _references(self, mappings: List[Dict]) -> Dict[str, Dict]:
+        return {"Vendor": {m["vendor_id"]: {"name": m.get("vendor_name")} for m in mappings}}
+
+    def _ensure_references(self, mappings: List[Dict]) -> None:
+        for label, nodes in self._references(mappings).items():
+            self.reference_nodes.ensure(label, nodes)
+
+    def _write(self, action: str, params: Dict) -> None:
+        if action == "delete":
+            self.log.info("Deleting vendor mapping", extra={"id": params["id"]})
+            self.neo4j.write(
+                self._delete_cypher(),
+                {"vendor_id": params["vendor_id"], "vendor_product_id": params["vendor_product_id"]},
+            )
             return
+        self._ensure_references([params])
+        self.neo4j.write(self._upsert_cypher(), {"mapping": params})
+        self.log.info("Upserted vendor mapping", extra={"id": params["id"]})
 
-        params = {"mapping": mapping}
-        self.neo4j.write(self._upsert_cypher(), params)
-        self.log.info("Upserted vendor mapping", extra={"id": event.aggregate_id})
+    def handle_event(self, event: OutboxEvent) -> None:
+        with self.pg_pool.connection() as conn:
+            mapping = self.load_mapping(conn, event.aggregate_id)
+
+        planned = self._plan(event, mapping)
+        if planned is not None:
+            self._write(*planned)
+
+    def handle_batch(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, Exception]]:
+        """Handle mapping events with one Supabase load and one UNWIND write per action.
+
+        Returns the events that failed; the rest were written or deliberately skipped.
+        """
+        with self.pg_pool.connection() as conn:
+            mappings = self.load_mapping_many(conn, list({event.aggregate_id for event in events}))
+        return self.apply_loaded(events, mappings)
+
+    async def handle_batch_async(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, Exception]]:
+        """``handle_batch`` for a pipeline built on ``AsyncPostgresPool``/``AsyncNeo4jClient``."""
+        async with self.pg_pool.connection() as conn:
+            mappings = await self.load_mapping_many_async(conn, list({event.aggregate_id for event in events}))
+        return await self.apply_loaded_async(events, mappings)
+
+    async def handle_event_async(self, event: OutboxEvent) -> None:
+        """Async single-event path: the batch statements over one event; raises its failure."""
+        failures = await self.handle_batch_async([event])
+        if failures:
+            raise failures[0][1]
+
+    def apply_loaded(self, events: List[OutboxEvent], mappings: Dict[str, Dict]) -> List[Tuple[OutboxEvent, Exception]]:
+        """Plan and write events whose mappings are already loaded; returns the failures."""
+        return write_groups(self.neo4j, self.reference_nodes, *self._groups(events, mappings), self.log)
+
+    async def apply_loaded_async(self, events: List[OutboxEvent], mappings: Dict[str, Dict]) -> List[Tuple[OutboxEvent, Exception]]:
+        return await write_groups_async(self.neo4j, self.reference_nodes, *self._groups(events, mappings), self.log)
+
+    def _groups(
+        self,
+        events: List[OutboxEvent],
+        mappings: Dict[str, Dict],
+    ) -> Tuple[List[WriteGroup], List[Tuple[OutboxEvent, Exception]]]:
+        """Plan a batch into one write group per action, minus unchanged rows; also returns planning failures."""
+        failures: List[Tuple[OutboxEvent, Exception]] = []
+        grouped: Dict[str, List[Tuple[OutboxEvent, Dict]]] = {}
+        for event in events:
+            try:
+                planned = self._plan(event, mappings.get(event.aggregate_id))
+            except Exception as exc:  # noqa: BLE001
+                failures.append((event, exc))
+                continue
+            if planned is not None:
+                action, params = planned
+                grouped.setdefault(action, []).append((event, params))
+
+        groups: List[WriteGroup] = []
+        for action, items in grouped.items():
+            if self.write_cache is not None:
+                if action == "delete":
+                    for _, params in items:
+                        self.write_cache.invalidate(*self._cache_entry(params)[:2])
+                else:
+                    items = self.write_cache.skip_unchanged(items, self._cache_entry)
+                    if not items:
+                        continue
+            upsert = action == "upsert"
+            groups.append(WriteGroup(
+                self._bulk_upsert_cypher() if upsert else self._bulk_delete_cypher(),
+                items,
+                "Wrote vendor mapping batch",
+                {"action": action, "events": len(items)},
+                references=self._references([params for _, params in items]) if upsert else {},
+                cache=self.write_cache if upsert else None,
+                cache_entry=self._cache_entry,
+            ))
+        return groups, failures
@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterator, Optional, Tuple
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe size-bounded LRU map with hit/miss counters."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = max(1, maxsize)
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            return self._data.pop(key, None)
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        """Snapshot of entries, least recently used first."""
+        with self._lock:
+            return iter(list(self._data.items()))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+    """LRU map whose entries also expire ``ttl_seconds`` after they were put."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__(maxsize)
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = super().get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires_at, value = entry
+        if self._clock() >= expires_at:
+            with self._lock:
+                self._data.pop(key, None)
+                # Count the expired lookup as a miss, not the hit LRUCache recorded.
+                self.hits -= 1
+                self.misses += 1
+            return default
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        super().put(key, (self._clock() + self.ttl_seconds, value))
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        entry = super().pop(key)
+        return entry[1] if entry is not None else None
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        now = self._clock()
+        return iter([(key, value) for key, (expires_at, value) in super().items() if now < expires_at])
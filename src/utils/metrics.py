@@ -0,0 +1,170 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+# Seconds; covers sub-millisecond cache-suppressed writes up to lease-length batches.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in (labels or {}).items()))
+
+
+class Recorder:
+    """Instrumentation surface; this base records nothing so disabled metrics cost ~nothing."""
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+        pass
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        pass
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        pass
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict[str, str]] = None) -> Iterator[None]:
+        """Observe the wall time of the block, also when it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, labels)
+
+
+class _Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class PrometheusRecorder(Recorder):
+    """In-process counters, gauges and histograms rendered in Prometheus text format.
+
+    One lock guards all series; updates are a dict lookup and a few additions, which is
+    negligible next to the Postgres/Neo4j round trips being measured.
+    """
+
+    def __init__(self, namespace: str = "utility_lineage", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def histogram_summary(self) -> Dict[str, Dict[str, float]]:
+        """``count``/``sum``/``mean`` per histogram series, keyed like the exposition name."""
+        with self._lock:
+            items = sorted(self._histograms.items(), key=lambda item: item[0])
+            return {
+                self._series(name, labels): {
+                    "count": histogram.count,
+                    "sum": round(histogram.total, 6),
+                    "mean": round(histogram.total / histogram.count, 6) if histogram.count else 0.0,
+                }
+                for (name, labels), histogram in items
+            }
+
+    def _series(self, name: str, labels: Labels, suffix: str = "", extra: Labels = ()) -> str:
+        pairs = ",".join(f'{key}="{value}"' for key, value in (*labels, *extra))
+        return f"{self.namespace}_{name}{suffix}" + (f"{{{pairs}}}" if pairs else "")
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+            histograms = sorted(
+                ((key, list(h.counts), h.total, h.count) for key, h in self._histograms.items()),
+                key=lambda item: item[0],
+            )
+
+        typed = set()
+        for kind, series in (("counter", counters), ("gauge", gauges)):
+            for (name, labels), value in series:
+                if name not in typed:
+                    lines.append(f"# TYPE {self.namespace}_{name} {kind}")
+                    typed.add(name)
+                lines.append(f"{self._series(name, labels)} {value}")
+
+        for (name, labels), counts, total, count in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {self.namespace}_{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self._series(name, labels, '_bucket', (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{self._series(name, labels, '_bucket', (('le', '+Inf'),))} {count}")
+            lines.append(f"{self._series(name, labels, '_sum')} {total}")
+            lines.append(f"{self._series(name, labels, '_count')} {count}")
+        return "\n".join(lines) + "\n"
+
+
+_recorder: Recorder = Recorder()
+
+
+def recorder() -> Recorder:
+    """The process-wide recorder; a no-op one until ``install`` is called."""
+    return _recorder
+
+
+def install(new_recorder: Recorder) -> Recorder:
+    global _recorder
+    _recorder = new_recorder
+    return new_recorder
+
+
+def serve(prometheus: PrometheusRecorder, host: str, port: int) -> ThreadingHTTPServer:
+    """Serve ``GET /metrics`` from a daemon thread; call ``shutdown()`` on the result to stop."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args) -> None:
+            pass  # scrapes every few seconds would drown the worker log
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,123 @@
+import json
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, Optional
+
+
+# Query text beyond this is cut; the generated UNWIND Cypher stays well under it.
+MAX_QUERY_CHARS = 4000
+
+
+def param_summary(params: Any) -> Dict[str, Any]:
+    """Shape of the parameters without their values (which may hold user data).
+
+    Mappings list each key with its type (and length for sequences); ``bytes`` is the size of
+    the JSON encoding, a proxy for what went over the wire.
+    """
+    encoded = json.dumps(params, default=str, separators=(",", ":"))
+    summary: Dict[str, Any] = {"bytes": len(encoded)}
+    if isinstance(params, dict):
+        summary["keys"] = {
+            key: f"{type(value).__name__}[{len(value)}]" if isinstance(value, (list, tuple)) else type(value).__name__
+            for key, value in params.items()
+        }
+    elif isinstance(params, (list, tuple)):
+        summary["items"] = len(params)
+    return summary
+
+
+def plan_summary(profile: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Compact operator tree from a Neo4j ``PROFILE`` result summary."""
+    if not profile:
+        return None
+    args = profile.get("args") or {}
+    return {
+        "operator": profile.get("operatorType"),
+        "details": args.get("Details"),
+        "rows": profile.get("rows"),
+        "db_hits": profile.get("dbHits"),
+        "children": [plan_summary(child) for child in profile.get("children") or []],
+    }
+
+
+class SlowOpProfiler:
+    """Record Postgres/Neo4j operations slower than ``threshold_seconds`` to rotating JSONL.
+
+    ``sample_rate`` is the fraction of slow operations written; ``profile_rate`` the fraction
+    of written Cypher operations re-run under ``PROFILE`` (in an explicitly rolled-back
+    transaction for writes, a read-access session for reads) to capture the plan; failed
+    operations are never re-run. Fast operations cost one comparison.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        threshold_seconds: float = 1.0,
+        sample_rate: float = 1.0,
+        profile_rate: float = 0.0,
+        max_bytes: int = 10 * 1024 * 1024,
+        backups: int = 5,
+    ):
+        self.threshold_seconds = threshold_seconds
+        self.sample_rate = sample_rate
+        self.profile_rate = profile_rate
+        self.recorded = 0
+        self._log = logging.getLogger(f"utility_lineage_slow_ops.{path}")
+        self._log.propagate = False
+        self._log.setLevel(logging.INFO)
+        if not self._log.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log.addHandler(handler)
+
+    def is_slow(self, seconds: float) -> bool:
+        return seconds >= self.threshold_seconds and random.random() < self.sample_rate
+
+    def wants_plan(self) -> bool:
+        return random.random() < self.profile_rate
+
+    def record(
+        self,
+        kind: str,
+        query: str,
+        params: Any,
+        seconds: float,
+        timings: Optional[Dict[str, Any]] = None,
+        plan: Optional[Callable[[], Optional[Dict[str, Any]]]] = None,
+    ) -> None:
+        """Write one record; ``plan`` is only called (and its cost only paid) when sampled."""
+        entry: Dict[str, Any] = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "kind": kind,
+            "seconds": round(seconds, 6),
+            "query": " ".join(query.split())[:MAX_QUERY_CHARS],
+            "params": param_summary(params),
+        }
+        if timings:
+            entry["timings"] = timings
+        if plan is not None and self.wants_plan():
+            started = time.perf_counter()
+            try:
+                entry["plan"] = plan()
+            except Exception as exc:  # noqa: BLE001
+                entry["plan_error"] = str(exc)
+            entry["plan_seconds"] = round(time.perf_counter() - started, 6)
+        self._log.info(json.dumps(entry, default=str))
+        self.recorded += 1
+
+
+_profiler: Optional[SlowOpProfiler] = None
+
+
+def profiler() -> Optional[SlowOpProfiler]:
+    """The process-wide profiler, or None when slow-op profiling is off."""
+    return _profiler
+
+
+def install(new_profiler: Optional[SlowOpProfiler]) -> Optional[SlowOpProfiler]:
+    global _profiler
+    _profiler = new_profiler
+    return new_profiler
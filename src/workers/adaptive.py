@@ -0,0 +1,90 @@
+from typing import Dict
+
+from src.adapters.neo4j.client import Neo4jClient
+from src.config.settings import Settings
+
+
+class AimdController:
+    """Additive-increase / multiplicative-decrease integer between ``floor`` and ``ceiling``."""
+
+    def __init__(self, initial: int, floor: int, ceiling: int, step: int, factor: float = 0.5):
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.step = max(1, step)
+        self.factor = factor
+        self.value = min(self.ceiling, max(self.floor, initial))
+
+    def increase(self) -> None:
+        self.value = min(self.ceiling, self.value + self.step)
+
+    def decrease(self) -> None:
+        self.value = max(self.floor, int(self.value * self.factor))
+
+
+class AdaptiveBatchSizer:
+    """Retune the claim batch size and Neo4j rows-per-transaction after every batch.
+
+    Transient/lock errors since the last batch halve both. A slow outbox claim halves the
+    batch size; slow write transactions halve the transaction size. Otherwise a full batch
+    (there is more work waiting) grows each by one step. Partial batches leave sizes alone,
+    so an idle queue doesn't ratchet them up. With ``adaptive_batching`` off the configured
+    sizes are used as-is.
+    """
+
+    def __init__(self, settings: Settings, neo4j: Neo4jClient):
+        self.enabled = settings.adaptive_batching
+        self.neo4j = neo4j
+        self.target_fetch_seconds = settings.adaptive_target_fetch_seconds
+        self.target_write_seconds = settings.adaptive_target_write_seconds
+        self.batch = AimdController(
+            settings.batch_size,
+            settings.batch_size_min,
+            settings.batch_size_max,
+            step=max(1, settings.batch_size_min),
+        )
+        self.tx = AimdController(
+            settings.neo4j_write_batch_size,
+            settings.neo4j_write_batch_size_min,
+            settings.neo4j_write_batch_size_max,
+            step=max(1, settings.neo4j_write_batch_size_min),
+        )
+        if not self.enabled:
+            self.batch.value, self.tx.value = settings.batch_size, settings.neo4j_write_batch_size
+        self.neo4j.write_batch_size = self.tx.value
+        self._last = neo4j.write_stats()
+
+    @property
+    def batch_size(self) -> int:
+        return self.batch.value
+
+    def observe(self, fetched: int, fetch_seconds: float) -> Dict[str, float]:
+        """Feed one batch's measurements; returns them with the sizes now in effect."""
+        current = self.neo4j.write_stats()
+        delta = {key: current[key] - self._last[key] for key in current}
+        self._last = current
+        write_latency = delta["write_seconds"] / delta["writes"] if delta["writes"] else 0.0
+
+        if self.enabled:
+            if delta["transient_errors"]:
+                self.batch.decrease()
+                self.tx.decrease()
+            else:
+                slow_fetch = fetch_seconds > self.target_fetch_seconds
+                slow_write = write_latency > self.target_write_seconds
+                if slow_fetch:
+                    self.batch.decrease()
+                if slow_write:
+                    self.tx.decrease()
+                if fetched >= self.batch.value and not (slow_fetch or slow_write):
+                    self.batch.increase()
+                    self.tx.increase()
+            self.neo4j.write_batch_size = self.tx.value
+
+        return {
+            "batch_size": self.batch.value,
+            "write_batch_size": self.tx.value,
+            "fetch_seconds": round(fetch_seconds, 4),
+            "write_latency_seconds": round(write_latency, 4),
+            "transient_errors": delta["transient_errors"],
+            "lock_errors": delta["lock_errors"],
+        }
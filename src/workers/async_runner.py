@@ -0,0 +1,361 @@
+import asyncio
+import signal
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Tuple
+
+from src.adapters.neo4j.async_client import AsyncNeo4jClient
+from src.adapters.neo4j.client import Neo4jClient
+from src.adapters.queue.notify import OutboxListener
+from src.adapters.queue.outbox import oldest_pending_age, release_claims
+from src.adapters.supabase import db as pg
+from src.adapters.supabase.async_db import AsyncPostgresPool
+from src.adapters.supabase.db import PostgresPool
+from src.config.settings import Settings
+from src.domain.models.events import OutboxEvent
+from src.domain.services.reference_nodes import ReferenceNodeStage
+from src.domain.services.write_cache import WriteSuppressionCache
+from src.pipelines.audit_pipeline import AuditPipeline
+from src.pipelines.lineage_pipeline import LineagePipeline
+from src.pipelines.quality_pipeline import QualityPipeline
+from src.pipelines.vendor_mapping_pipeline import VendorMappingPipeline
+from src.utils import metrics
+from src.utils.logging import configure_logging
+from src.workers.adaptive import AdaptiveBatchSizer
+from src.workers.backoff import IdleBackoff
+from src.workers.capture import TrafficCapture
+from src.workers.lanes import LaneScheduler
+from src.workers.leases import LeaseRenewer
+from src.workers.runner import (
+    AGG_TYPES,
+    TABLES,
+    claim_batch,
+    group_by_aggregate,
+    idle_wait,
+    prepare_batch,
+    settle_batch,
+    start_observability,
+)
+from src.workers.schema import verify_schema
+
+
+# The outbox itself stays on psycopg2, used from threads: claim, ack, and a lease heartbeat
+# each for the batch being written and the one prefetched behind it.
+QUEUE_POOL_MAXCONN = 4
+
+Claim = Tuple[List[OutboxEvent], int, float, ExitStack]
+
+
+def async_in_flight(settings: Settings) -> int:
+    """Partitions the async worker runs at once.
+
+    Each holds one Postgres connection while it loads and one Neo4j session while it writes.
+    Both async pools make extra callers wait instead of failing, so the cap only keeps tasks
+    from queueing on them.
+    """
+    return max(1, min(
+        settings.async_max_in_flight,
+        settings.pg_pool_maxconn,
+        settings.neo4j_max_connection_pool_size,
+    ))
+
+
+async def dispatch_events_async(
+    pipelines: Dict[str, object],
+    events: List[OutboxEvent],
+    log,
+    stop_event: Optional[threading.Event] = None,
+) -> Tuple[List[Tuple[OutboxEvent, Optional[Exception]]], List[OutboxEvent]]:
+    """``dispatch_events`` through the pipelines' ``handle_batch_async``."""
+    outcomes: List[Tuple[OutboxEvent, Optional[Exception]]] = []
+    unstarted: List[OutboxEvent] = []
+    for agg, group in group_by_aggregate(events).items():
+        if stop_event is not None and stop_event.is_set():
+            unstarted.extend(group)
+            continue
+
+        pipeline = pipelines.get(agg)
+        if pipeline is None:
+            for event in group:
+                log.warning("Unhandled aggregate type", extra={"aggregate_type": agg, "event_id": event.id})
+            unstarted.extend(group)
+            continue
+
+        try:
+            with metrics.recorder().timer("pipeline_batch_seconds", {"pipeline": agg}):
+                failures = await pipeline.handle_batch_async(group)
+        except Exception as exc:  # noqa: BLE001
+            # The batch load itself failed; every event in the group shares the error.
+            log.exception("Failed loading utility/lineage batch", extra={"aggregate_type": agg, "events": len(group)})
+            failures = [(event, exc) for event in group]
+
+        errors = {event.id: exc for event, exc in failures}
+        outcomes.extend((event, errors.get(event.id)) for event in group)
+    return outcomes, unstarted
+
+
+async def process_batch_async(
+    lineage_pipeline: LineagePipeline,
+    vendor_pipeline: VendorMappingPipeline,
+    audit_pipeline: AuditPipeline,
+    quality_pipeline: QualityPipeline,
+    events: List[OutboxEvent],
+    queue_pool: PostgresPool,
+    log,
+    worker_id: Optional[str] = None,
+    concurrency: int = 1,
+    stop_event: Optional[threading.Event] = None,
+    settings: Optional[Settings] = None,
+    lanes: Optional[LaneScheduler] = None,
+) -> Counter:
+    """``process_batch`` with partitions as tasks, at most ``concurrency`` of them in flight.
+
+    Coalescing, partitioning and the ack flush are the sync worker's; the ack runs on
+    ``queue_pool`` in a thread.
+    """
+    pipelines = {
+        "lineage_entity": lineage_pipeline,
+        "vendor_product_mapping": vendor_pipeline,
+        "audit_event": audit_pipeline,
+        "data_quality_entity": quality_pipeline,
+    }
+    batch, partitions, stats = prepare_batch(events, log, concurrency, lanes)
+    in_flight = asyncio.Semaphore(concurrency)
+
+    async def run_partition(partition: List[OutboxEvent]):
+        async with in_flight:
+            return await dispatch_events_async(pipelines, partition, log, stop_event)
+
+    results = await asyncio.gather(*(run_partition(partition) for partition in partitions if partition))
+    return await asyncio.to_thread(settle_batch, events, batch, list(results), stats, queue_pool, log, worker_id, settings)
+
+
+async def _claim(
+    queue_pool: PostgresPool,
+    lanes: LaneScheduler,
+    settings: Settings,
+    batch_size: int,
+    shard: Optional[Tuple[int, int]],
+    log,
+) -> Claim:
+    """Claim a batch in a thread and start its lease heartbeat straight away.
+
+    A prefetched batch waits while the current one is written, so its leases are renewed from
+    the claim on, not from when it starts. Close the returned stack to stop the heartbeat.
+    """
+    events, claimed, seconds = await asyncio.to_thread(claim_batch, queue_pool, lanes, settings, batch_size, shard)
+    leases = ExitStack()
+    if events:
+        leases.enter_context(
+            LeaseRenewer(queue_pool, settings.worker_id, [event.id for event in events], settings.lease_seconds, log)
+        )
+    return events, claimed, seconds, leases
+
+
+async def _release_prefetched(claim: "asyncio.Task[Claim]", queue_pool: PostgresPool, worker_id: str, log) -> None:
+    """Hand a prefetched batch that will not be processed straight back to the queue."""
+    try:
+        events, _, _, leases = await claim
+    except Exception:  # noqa: BLE001
+        log.exception("Failed prefetching outbox batch")
+        return
+    await asyncio.to_thread(leases.close)
+    if not events:
+        return
+
+    def release() -> None:
+        with queue_pool.connection() as conn:
+            release_claims(conn, worker_id, [event.id for event in events])
+
+    await asyncio.to_thread(release)
+    log.info("Released prefetched events", extra={"events": len(events)})
+
+
+def _queue_lag(queue_pool: PostgresPool) -> float:
+    with queue_pool.connection() as conn:
+        lag = oldest_pending_age(conn, TABLES)
+        conn.rollback()
+    return lag
+
+
+def _verify_schema(settings: Settings, log) -> None:
+    # verify_schema reads through the sync client; a short-lived one is enough at startup.
+    neo4j = Neo4jClient.from_settings(settings, max_connection_pool_size=1)
+    try:
+        verify_schema(neo4j, settings.schema_check, log)
+    finally:
+        neo4j.close()
+
+
+async def run_async(settings: Settings) -> None:
+    """``runner.run`` on asyncio: Supabase loads and Neo4j writes overlap across partitions.
+
+    The next batch is claimed while the current one is written (``ASYNC_PREFETCH``). Outbox
+    claims, acks and lease heartbeats stay on a small psycopg2 pool in threads.
+    """
+    log = configure_logging("utility_lineage_async_worker")
+    in_flight = async_in_flight(settings)
+    shard = (settings.shard_index, settings.shard_count) if settings.shard_count > 1 else None
+    log.info(
+        "Starting async utility/lineage worker",
+        extra={
+            "pipeline": settings.pipeline_name,
+            "worker_id": settings.worker_id,
+            "in_flight": in_flight,
+            "prefetch": settings.async_prefetch,
+            "shard": shard,
+        },
+    )
+
+    # Install before the pools are built so their capacity gauges land in the real recorder.
+    metrics_server = start_observability(settings, shard, log)
+    recorder = metrics.recorder()
+
+    # Finish the in-flight batch on SIGTERM/SIGINT, ack what completed, release the rest.
+    stop_event = threading.Event()
+
+    def _request_stop(signum: int) -> None:
+        log.info("Shutdown requested; finishing in-flight events", extra={"signal": signum})
+        stop_event.set()
+
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, _request_stop, signum)
+
+    queue_pool = PostgresPool(settings.supabase_dsn, 1, QUEUE_POOL_MAXCONN)
+    pg_pool = AsyncPostgresPool(settings.supabase_dsn, settings.pg_pool_minconn, settings.pg_pool_maxconn)
+    neo4j = AsyncNeo4jClient.from_settings(settings)
+    try:
+        await pg_pool.open()
+        await asyncio.to_thread(_verify_schema, settings, log)
+    except Exception:
+        await neo4j.close()
+        await pg_pool.close()
+        queue_pool.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        raise
+
+    write_cache = WriteSuppressionCache.from_settings(settings, log)
+    reference_nodes = ReferenceNodeStage(neo4j)
+    lineage_pipeline = LineagePipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    vendor_pipeline = VendorMappingPipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    audit_pipeline = AuditPipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    quality_pipeline = QualityPipeline(settings, pg_pool, neo4j, write_cache)
+
+    listener = OutboxListener(settings.supabase_dsn, settings.listen_channel) if settings.listen_enabled else None
+    # With LISTEN the idle wait is only a safety net for missed notifications and retries.
+    idle = IdleBackoff(
+        settings.idle_backoff_min_seconds,
+        settings.listen_idle_max_seconds if listener else settings.poll_interval_seconds,
+    )
+    sizer = AdaptiveBatchSizer(settings, neo4j)
+    capture = None
+    if settings.capture_path:
+        # Shards share the setting, so each writes its own file.
+        capture_path = f"{settings.capture_path}.{settings.shard_index}" if shard else settings.capture_path
+        capture = TrafficCapture(capture_path, settings.capture_sample_rate)
+        log.info("Capturing outbox traffic", extra={"path": capture_path, "sample_rate": settings.capture_sample_rate})
+    # Every handled aggregate type gets a lane; types missing from LANE_WEIGHTS weigh 1.
+    lanes = LaneScheduler(
+        {agg: settings.lane_weights.get(agg, 1) for agg in AGG_TYPES},
+        settings.lane_concurrency,
+        table_names=TABLES,
+    )
+
+    totals: Counter = Counter()
+    lag_checked_at = 0.0
+    next_claim: Optional["asyncio.Task[Claim]"] = None
+    try:
+        while not stop_event.is_set():
+            if metrics_server is not None and time.monotonic() - lag_checked_at >= settings.queue_lag_interval_seconds:
+                lag_checked_at = time.monotonic()
+                try:
+                    recorder.set("queue_lag_seconds", await asyncio.to_thread(_queue_lag, queue_pool))
+                except Exception:  # noqa: BLE001
+                    log.exception("Failed measuring outbox queue lag")
+
+            if next_claim is None:
+                next_claim = asyncio.create_task(_claim(queue_pool, lanes, settings, sizer.batch_size, shard, log))
+            claim, next_claim = next_claim, None
+            events, claimed, fetch_seconds, leases = await claim
+            recorder.observe("stage_seconds", fetch_seconds, {"stage": "claim"})
+
+            if not events:
+                if await asyncio.to_thread(idle_wait, listener, idle.next_delay(), stop_event):
+                    idle.reset()
+                continue
+
+            # Busy: reset the idle delay and claim the next batch while this one is written.
+            idle.reset()
+            if listener is not None:
+                listener.saw_events()
+            if settings.async_prefetch:
+                next_claim = asyncio.create_task(_claim(queue_pool, lanes, settings, sizer.batch_size, shard, log))
+
+            captured = capture is not None and capture.start_batch()
+            if captured:
+                pg.set_row_sink(capture.record_rows)
+            batch_started = time.perf_counter()
+            try:
+                stats = await process_batch_async(
+                    lineage_pipeline,
+                    vendor_pipeline,
+                    audit_pipeline,
+                    quality_pipeline,
+                    events,
+                    queue_pool,
+                    log,
+                    worker_id=settings.worker_id,
+                    concurrency=in_flight,
+                    stop_event=stop_event,
+                    settings=settings,
+                    lanes=lanes,
+                )
+            finally:
+                await asyncio.to_thread(leases.close)
+            if captured:
+                pg.set_row_sink(None)
+                capture.finish_batch(events)
+            totals.update(stats)
+            sizing = sizer.observe(claimed, fetch_seconds)
+            recorder.set("events_per_second", stats["processed"] / max(time.perf_counter() - batch_started, 1e-6))
+            recorder.set("batch_size", sizing["batch_size"])
+            recorder.set("write_batch_size", sizing["write_batch_size"])
+            log.info(
+                "Processed batch",
+                extra={
+                    "batch": dict(stats),
+                    "sizing": sizing,
+                    "totals": dict(totals),
+                    "write_cache": write_cache.stats() if write_cache is not None else None,
+                    "reference_nodes": reference_nodes.stats(),
+                    "dimension_cache": vendor_pipeline.dimension_cache.stats(),
+                },
+            )
+    finally:
+        if next_claim is not None:
+            await _release_prefetched(next_claim, queue_pool, settings.worker_id, log)
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if capture is not None:
+            pg.set_row_sink(None)
+            capture.close()
+        if listener is not None:
+            listener.close()
+        if write_cache is not None:
+            write_cache.save()
+        await neo4j.close()
+        await pg_pool.close()
+        queue_pool.close()
+        log.info("Stopped async utility/lineage worker", extra={"totals": dict(totals)})
+
+
+def main():
+    asyncio.run(run_async(Settings()))
+
+
+if __name__ == "__main__":
+    main()
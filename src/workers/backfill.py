@@ -0,0 +1,166 @@
+import argparse
+import signal
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.adapters.neo4j.client import Neo4jClient
+from src.adapters.supabase import db as pg
+from src.config.settings import Settings
+from src.domain.models.events import OutboxEvent
+from src.pipelines.audit_pipeline import AuditPipeline
+from src.pipelines.lineage_pipeline import LineagePipeline
+from src.pipelines.quality_pipeline import QualityPipeline
+from src.pipelines.vendor_mapping_pipeline import VendorMappingPipeline
+from src.utils.logging import configure_logging
+from src.workers.checkpoint import Checkpoint
+
+
+# source name -> (aggregate_type, table_name, key column the stream is ordered by)
+SOURCES: Dict[str, Tuple[str, str, str]] = {
+    "lineage": ("lineage_entity", "data_lineage", "entity_id"),
+    "vendor_mappings": ("vendor_product_mapping", "vendor_product_mappings", "id"),
+    "audit": ("audit_event", "audit_log", "id"),
+    "quality": ("data_quality_entity", "data_quality_scores", "entity_id"),
+}
+
+
+def key_chunks(rows: Iterable[Dict], key_column: str, chunk_size: int) -> Iterator[Tuple[List[Dict], str]]:
+    """Cut a key-ordered row stream into chunks of ``chunk_size`` keys.
+
+    Chunks only break between keys, so every row for one key lands in the same chunk and the
+    chunk's last key is a safe resume point.
+    """
+    chunk: List[Dict] = []
+    keys = 0
+    last_key: Optional[str] = None
+    for row in rows:
+        key = str(row[key_column])
+        if key != last_key:
+            if keys >= chunk_size:
+                yield chunk, last_key
+                chunk, keys = [], 0
+            keys += 1
+            last_key = key
+        chunk.append(row)
+    if chunk:
+        yield chunk, last_key
+
+
+def backfill_events(source: str, keys: Iterable[str]) -> List[OutboxEvent]:
+    """Synthetic ``BACKFILL`` events, one per key, for the source's pipeline."""
+    aggregate_type, table_name, _ = SOURCES[source]
+    created_at = datetime.now(timezone.utc)
+    return [
+        OutboxEvent(
+            id=f"backfill:{source}:{key}",
+            aggregate_type=aggregate_type,
+            table_name=table_name,
+            op="BACKFILL",
+            aggregate_id=key,
+            payload=None,
+            created_at=created_at,
+        )
+        for key in keys
+    ]
+
+
+def retry_failed(source: str, pipeline, checkpoint: Checkpoint, chunk_size: int, log) -> None:
+    """Reload and rewrite the keys earlier runs failed on; keys that fail again stay recorded."""
+    keys = checkpoint.failed_keys(source)
+    if not keys:
+        return
+    log.info("Retrying failed backfill keys", extra={"source": source, "keys": len(keys)})
+    for start in range(0, len(keys), chunk_size):
+        events = backfill_events(source, keys[start:start + chunk_size])
+        failures = pipeline.handle_batch(events)
+        failed = {event.aggregate_id for event, _ in failures}
+        for event, exc in failures:
+            log.error("Backfill retry failed", exc_info=exc, extra={"source": source, "key": event.aggregate_id})
+        checkpoint.resolve(source, [event.aggregate_id for event in events if event.aggregate_id not in failed])
+
+
+def backfill_source(
+    source: str,
+    pipeline,
+    pg_pool: pg.PostgresPool,
+    checkpoint: Checkpoint,
+    chunk_size: int,
+    stop_event: threading.Event,
+    log,
+) -> bool:
+    """Stream one source table through its pipeline; returns False if interrupted."""
+    _, _, key_column = SOURCES[source]
+    retry_failed(source, pipeline, checkpoint, chunk_size, log)
+    after_key = checkpoint.last_key(source)
+    log.info("Backfilling source", extra={"source": source, "resume_after": after_key})
+
+    sql, params = pipeline.backfill_query(after_key)
+    with pg_pool.connection() as conn:
+        try:
+            for chunk_rows, last_key in key_chunks(pg.stream_rows(conn, sql, params, itersize=chunk_size), key_column, chunk_size):
+                rows_by_key = pipeline.index_rows(chunk_rows)
+                events = backfill_events(source, rows_by_key)
+                failures = pipeline.apply_loaded(events, rows_by_key)
+                for event, exc in failures:
+                    log.error("Backfill write failed", exc_info=exc, extra={"source": source, "key": event.aggregate_id})
+                # Failed keys are stored with the checkpoint and retried at the start of the next run.
+                failed_keys = [event.aggregate_id for event, _ in failures]
+                checkpoint.save(source, last_key, written=len(events) - len(failures), failed_keys=failed_keys)
+                log.info("Backfilled chunk", extra={"source": source, "keys": len(events), "failed": len(failures), "last_key": last_key})
+                if stop_event.is_set():
+                    log.info("Backfill interrupted; checkpoint saved", extra={"source": source, "last_key": last_key})
+                    return False
+        finally:
+            # End the read transaction that held the server-side cursor.
+            conn.rollback()
+    return True
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Stream Supabase source tables into Neo4j with resumable checkpoints.")
+    parser.add_argument("--source", action="append", choices=sorted(SOURCES), help="source to backfill (repeatable; default all)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="keys per chunk / UNWIND batch (default BACKFILL_CHUNK_SIZE)")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default BACKFILL_CHECKPOINT_PATH)")
+    parser.add_argument("--reset", action="store_true", help="ignore saved checkpoints for the selected sources")
+    args = parser.parse_args(argv)
+
+    settings = Settings()
+    log = configure_logging("utility_lineage_backfill")
+    chunk_size = args.chunk_size or settings.backfill_chunk_size
+    checkpoint = Checkpoint(args.checkpoint or settings.backfill_checkpoint_path)
+    sources = args.source or list(SOURCES)
+    if args.reset:
+        for source in sources:
+            checkpoint.reset(source)
+
+    stop_event = threading.Event()
+
+    def _request_stop(signum, _frame):
+        log.info("Shutdown requested; stopping after the current chunk", extra={"signal": signum})
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    pg_pool = pg.PostgresPool(settings.supabase_dsn, settings.pg_pool_minconn, settings.pg_pool_maxconn)
+    neo4j = Neo4jClient.from_settings(settings)
+    pipelines = {
+        "lineage": LineagePipeline(settings, pg_pool, neo4j),
+        "vendor_mappings": VendorMappingPipeline(settings, pg_pool, neo4j),
+        "audit": AuditPipeline(settings, pg_pool, neo4j),
+        "quality": QualityPipeline(settings, pg_pool, neo4j),
+    }
+    try:
+        for source in sources:
+            if not backfill_source(source, pipelines[source], pg_pool, checkpoint, chunk_size, stop_event, log):
+                break
+        else:
+            log.info("Backfill finished", extra={"sources": sources, "checkpoint": checkpoint.state})
+    finally:
+        neo4j.close()
+        pg_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+class IdleBackoff:
+    """Exponential idle delay: starts at ``minimum``, doubles per empty poll, caps at ``maximum``."""
+
+    def __init__(self, minimum: float, maximum: float, factor: float = 2.0):
+        self.minimum = max(0.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.factor = factor
+        self._next = self.minimum
+
+    def reset(self) -> None:
+        self._next = self.minimum
+
+    def next_delay(self) -> float:
+        delay = self._next
+        self._next = min(self.maximum, max(delay, 0.01) * self.factor)
+        return delay
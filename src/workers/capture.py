@@ -0,0 +1,106 @@
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import asdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List
+
+from src.domain.models.events import OutboxEvent
+
+
+# Source tables whose rows are captured -> the column replay looks them up by.
+CAPTURED_TABLES = {
+    "data_lineage": "entity_id",
+    "data_quality_scores": "entity_id",
+    "audit_log": "id",
+    "vendor_product_mappings": "id",
+    "vendors": "id",
+    "products": "id",
+}
+
+_TABLE_RE = re.compile(r"\bFROM\s+(" + "|".join(CAPTURED_TABLES) + r")\b")
+
+
+def encode_value(value: Any) -> Any:
+    """JSON default hook that keeps datetimes and decimals typed across a capture round trip."""
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"$decimal": str(value)}
+    # UUIDs and anything exotic are captured as text; pipelines str() keys anyway.
+    return str(value)
+
+
+def decode_value(obj: Dict[str, Any]) -> Any:
+    if "$datetime" in obj:
+        return datetime.fromisoformat(obj["$datetime"])
+    if "$decimal" in obj:
+        return Decimal(obj["$decimal"])
+    return obj
+
+
+class TrafficCapture:
+    """Append sampled batches (events plus the source rows loaded for them) to gzip JSONL.
+
+    One line per batch: ``{"offset": seconds since capture start, "events": [...],
+    "rows": {table: [row, ...]}}``. Rows arrive through ``pg.set_row_sink`` while a sampled
+    batch is in flight, from whichever dispatch thread loaded them. Each run appends a new
+    gzip member, which ``gzip.open`` reads back as one stream.
+    """
+
+    def __init__(self, path: str, sample_rate: float = 1.0):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.batches = 0
+        self._started = time.monotonic()
+        self._rows: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self._handle = gzip.open(path, "at", encoding="utf-8")
+
+    def start_batch(self) -> bool:
+        """Decide whether the next batch is captured; rows are collected until ``finish_batch``."""
+        self._rows = {}
+        return random.random() < self.sample_rate
+
+    def record_rows(self, query: str, rows: List) -> None:
+        match = _TABLE_RE.search(query)
+        if match is None or not rows:
+            return
+        with self._lock:
+            self._rows.setdefault(match.group(1), []).extend(dict(row) for row in rows)
+
+    def finish_batch(self, events: List[OutboxEvent]) -> None:
+        with self._lock:
+            rows, self._rows = self._rows, {}
+        record = {
+            "offset": round(time.monotonic() - self._started, 6),
+            "events": [asdict(event) for event in events],
+            "rows": rows,
+        }
+        self._handle.write(json.dumps(record, default=encode_value, separators=(",", ":")) + "\n")
+        self._handle.flush()
+        self.batches += 1
+
+    def close(self) -> None:
+        self._handle.close()
+
+
+def read_capture(path: str) -> Iterator[Dict[str, Any]]:
+    """Captured batches in order, with ``events`` rebuilt as ``OutboxEvent``s.
+
+    A worker killed mid-write leaves a truncated last member; reading stops there.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        try:
+            for line in handle:
+                if not line.endswith("\n"):
+                    return
+                record = json.loads(line, object_hook=decode_value)
+                record["events"] = [OutboxEvent(**event) for event in record["events"]]
+                yield record
+        except (EOFError, gzip.BadGzipFile):
+            return
@@ -0,0 +1,59 @@
+import json
+import os
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class Checkpoint:
+    """Per-source resume point for the batch commands, persisted as JSON and replaced atomically.
+
+    ``written`` counts what each source has processed. Keys that failed are kept with the
+    entry, so moving the resume point past them does not lose them; backfill retries them
+    first on the next run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.state: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as handle:
+                self.state = json.load(handle)
+
+    def last_key(self, source: str) -> Optional[str]:
+        return self.state.get(source, {}).get("last_key")
+
+    def failed_keys(self, source: str) -> List[str]:
+        return list(self.state.get(source, {}).get("failed_keys", []))
+
+    def save(self, source: str, last_key: Optional[str], written: int, failed_keys: Iterable[str] = ()) -> None:
+        """Record a finished chunk (``last_key`` None keeps the resume point) and its failed keys."""
+        entry = self.state.setdefault(source, {"written": 0})
+        if last_key is not None:
+            entry["last_key"] = last_key
+        entry["written"] += written
+        failed = set(entry.get("failed_keys", [])) | set(failed_keys)
+        if failed or "failed_keys" in entry:
+            self._set_failed(entry, failed)
+        self._write(entry)
+
+    def resolve(self, source: str, keys: Iterable[str]) -> None:
+        """Drop ``keys`` from the failed keys once a retry has written them."""
+        entry = self.state.get(source)
+        if entry is None:
+            return
+        self._set_failed(entry, set(entry.get("failed_keys", [])) - set(keys))
+        self._write(entry)
+
+    def _set_failed(self, entry: Dict, keys: Set[str]) -> None:
+        entry["failed_keys"] = sorted(keys)
+        entry["failed"] = len(keys)
+
+    def _write(self, entry: Dict) -> None:
+        entry["updated_at"] = datetime.now(timezone.utc).isoformat()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.state, handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, source: str) -> None:
+        self.state.pop(source, None)
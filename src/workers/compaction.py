@@ -0,0 +1,223 @@
+import argparse
+import signal
+import threading
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional
+
+from neo4j import Transaction
+
+from src.adapters.neo4j.client import Neo4jClient
+from src.config.settings import Settings
+from src.utils import metrics
+from src.utils.logging import configure_logging
+from src.workers.checkpoint import Checkpoint
+
+
+# Checkpoint entry; its last_key is the last UTC day fully compacted.
+CHECKPOINT_SOURCE = "change_events"
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+OLDEST_CYPHER = """
+MATCH (ce:ChangeEvent)
+WHERE ce.changed_at >= datetime($after) AND ce.changed_at < datetime($cutoff)
+RETURN min(ce.changed_at).epochMillis AS oldest_ms
+"""
+
+# One bounded batch of a day's events: add them to their day/table/user summaries and delete
+# them in the same transaction, so summary counts always match what was removed and an
+# interrupted run never counts an event twice.
+COMPACT_CYPHER = """
+MATCH (ce:ChangeEvent)
+WHERE ce.changed_at >= datetime($day_start) AND ce.changed_at < datetime($day_end)
+WITH ce LIMIT $batch_size
+OPTIONAL MATCH (u:InternalUser)-[:MADE_CHANGE]->(ce)
+WITH ce, head(collect(u.id)) AS user_id
+WITH coalesce(ce.table_name, '') AS table_name, user_id, collect(ce) AS events
+MERGE (s:ChangeEventSummary {id: $day + '|' + table_name + '|' + coalesce(user_id, '')})
+ON CREATE SET s.day = date($day),
+    s.table_name = table_name,
+    s.user_id = user_id,
+    s.events = 0,
+    s.inserts = 0,
+    s.updates = 0,
+    s.deletes = 0,
+    s.other_actions = 0
+WITH s, user_id, events, [e IN events | toUpper(coalesce(e.action, ''))] AS actions
+SET s.events = s.events + size(events),
+    s.inserts = s.inserts + size([a IN actions WHERE a = 'INSERT']),
+    s.updates = s.updates + size([a IN actions WHERE a = 'UPDATE']),
+    s.deletes = s.deletes + size([a IN actions WHERE a = 'DELETE']),
+    s.other_actions = s.other_actions + size([a IN actions WHERE NOT a IN ['INSERT', 'UPDATE', 'DELETE']]),
+    s.first_changed_at = reduce(m = s.first_changed_at, e IN events |
+        CASE WHEN m IS NULL OR e.changed_at < m THEN e.changed_at ELSE m END),
+    s.last_changed_at = reduce(m = s.last_changed_at, e IN events |
+        CASE WHEN m IS NULL OR e.changed_at > m THEN e.changed_at ELSE m END),
+    s.compacted_at = datetime()
+WITH s, user_id, events
+OPTIONAL MATCH (u:InternalUser {id: user_id})
+FOREACH (_ IN CASE WHEN u IS NULL THEN [] ELSE [1] END |
+  MERGE (u)-[:MADE_CHANGES]->(s)
+)
+FOREACH (e IN events | DETACH DELETE e)
+RETURN sum(size(events)) AS compacted, count(s) AS summaries
+"""
+
+PREVIEW_CYPHER = """
+MATCH (ce:ChangeEvent)
+WHERE ce.changed_at >= datetime($day_start) AND ce.changed_at < datetime($day_end)
+OPTIONAL MATCH (u:InternalUser)-[:MADE_CHANGE]->(ce)
+WITH ce, head(collect(u.id)) AS user_id
+RETURN count(ce) AS events, count(DISTINCT [coalesce(ce.table_name, ''), coalesce(user_id, '')]) AS summaries
+"""
+
+
+def retention_cutoff(retention_days: int, now: Optional[datetime] = None) -> datetime:
+    """Start of the oldest UTC day kept; only whole days before it are compacted."""
+    today = (now or datetime.now(timezone.utc)).astimezone(timezone.utc).date()
+    return datetime.combine(today - timedelta(days=retention_days), time(), tzinfo=timezone.utc)
+
+
+def next_day(neo4j: Neo4jClient, after: datetime, cutoff: datetime) -> Optional[date]:
+    """UTC day of the oldest ChangeEvent in ``[after, cutoff)``, or None when there is none."""
+    rows = neo4j.read(OLDEST_CYPHER, {"after": after.isoformat(), "cutoff": cutoff.isoformat()})
+    oldest_ms = rows[0]["oldest_ms"] if rows else None
+    if oldest_ms is None:
+        return None
+    return datetime.fromtimestamp(oldest_ms / 1000, tz=timezone.utc).date()
+
+
+def _day_window(day: date) -> Dict[str, str]:
+    start = datetime.combine(day, time(), tzinfo=timezone.utc)
+    return {"day": day.isoformat(), "day_start": start.isoformat(), "day_end": (start + timedelta(days=1)).isoformat()}
+
+
+def _compact_batch(tx: Transaction, parameters: Dict) -> Dict[str, int]:
+    return tx.run(COMPACT_CYPHER, **parameters).single().data()
+
+
+def compact_day(
+    neo4j: Neo4jClient,
+    day: date,
+    batch_size: int,
+    pause_seconds: float,
+    stop_event: threading.Event,
+    log,
+) -> Optional[int]:
+    """Compact every ChangeEvent of one UTC day; returns how many, or None if interrupted first.
+
+    Each batch is its own short transaction. The pause between batches lets the live worker's
+    writes to the same InternalUser and entity nodes through instead of queueing behind ours.
+    """
+    parameters = {**_day_window(day), "batch_size": batch_size}
+    compacted = 0
+    while True:
+        result = neo4j.write_transaction(_compact_batch, parameters)
+        compacted += result["compacted"]
+        metrics.recorder().inc("change_events_compacted_total", result["compacted"])
+        if result["compacted"] < batch_size:
+            return compacted
+        log.info("Compacted change event batch", extra={"day": parameters["day"], **result})
+        if stop_event.wait(pause_seconds):
+            return None
+
+
+def preview_day(neo4j: Neo4jClient, day: date) -> Dict[str, int]:
+    """What ``compact_day`` would do, read-only: events to delete and summaries to touch."""
+    rows = neo4j.read(PREVIEW_CYPHER, _day_window(day))
+    return rows[0] if rows else {"events": 0, "summaries": 0}
+
+
+def compact(
+    neo4j: Neo4jClient,
+    cutoff: datetime,
+    checkpoint: Checkpoint,
+    batch_size: int,
+    pause_seconds: float,
+    stop_event: threading.Event,
+    log,
+    dry_run: bool = False,
+) -> bool:
+    """Compact day by day, oldest first, up to ``cutoff``; returns False if interrupted.
+
+    The checkpoint is saved after each finished day and the next run starts after it. A dry
+    run reports the same days without writing anything, the checkpoint included.
+    """
+    last_day = checkpoint.last_key(CHECKPOINT_SOURCE)
+    after = EPOCH
+    if last_day is not None:
+        after = datetime.combine(date.fromisoformat(last_day) + timedelta(days=1), time(), tzinfo=timezone.utc)
+    log.info("Compacting change events", extra={"cutoff": cutoff.isoformat(), "resume_after": last_day, "dry_run": dry_run})
+
+    totals = {"days": 0, "events": 0, "summaries": 0}
+    while not stop_event.is_set():
+        day = next_day(neo4j, after, cutoff)
+        if day is None:
+            log.info("Compaction finished", extra={"dry_run": dry_run, **totals})
+            return True
+        after = datetime.combine(day + timedelta(days=1), time(), tzinfo=timezone.utc)
+        totals["days"] += 1
+
+        if dry_run:
+            preview = preview_day(neo4j, day)
+            totals["events"] += preview["events"]
+            totals["summaries"] += preview["summaries"]
+            log.info("Would compact day", extra={"day": day.isoformat(), **preview})
+            continue
+
+        compacted = compact_day(neo4j, day, batch_size, pause_seconds, stop_event, log)
+        if compacted is None:
+            break
+        totals["events"] += compacted
+        checkpoint.save(CHECKPOINT_SOURCE, day.isoformat(), written=compacted)
+        log.info("Compacted day", extra={"day": day.isoformat(), "events": compacted})
+
+    log.info("Compaction interrupted; checkpoint saved", extra={"last_day": checkpoint.last_key(CHECKPOINT_SOURCE), **totals})
+    return False
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Roll old ChangeEvents up into per-day summaries and delete them.")
+    parser.add_argument("--retention-days", type=int, default=None, help="days of ChangeEvents to keep (default CHANGE_EVENT_RETENTION_DAYS)")
+    parser.add_argument("--batch-size", type=int, default=None, help="events per transaction (default COMPACTION_BATCH_SIZE)")
+    parser.add_argument("--checkpoint", default=None, help="checkpoint file (default COMPACTION_CHECKPOINT_PATH)")
+    parser.add_argument("--reset", action="store_true", help="ignore the saved checkpoint and rescan from the oldest event")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be compacted")
+    args = parser.parse_args(argv)
+
+    settings = Settings()
+    log = configure_logging("utility_lineage_compaction")
+    retention_days = settings.change_event_retention_days if args.retention_days is None else args.retention_days
+    if retention_days < 1:
+        parser.error("retention must be at least one day")
+    checkpoint = Checkpoint(args.checkpoint or settings.compaction_checkpoint_path)
+    if args.reset:
+        checkpoint.reset(CHECKPOINT_SOURCE)
+
+    stop_event = threading.Event()
+
+    def _request_stop(signum, _frame):
+        log.info("Shutdown requested; stopping after the current batch", extra={"signal": signum})
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    neo4j = Neo4jClient.from_settings(settings)
+    try:
+        compact(
+            neo4j,
+            retention_cutoff(retention_days),
+            checkpoint,
+            args.batch_size or settings.compaction_batch_size,
+            settings.compaction_pause_seconds,
+            stop_event,
+            log,
+            dry_run=args.dry_run,
+        )
+    finally:
+        neo4j.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+from typing import Optional
+
+from src.adapters.queue.outbox import dead_letter_exhausted, list_dead_letters, requeue_dead_letters
+from src.adapters.supabase import db as pg
+from src.config.settings import Settings
+from src.utils.logging import configure_logging
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect and requeue dead-lettered outbox events.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    show = commands.add_parser("list", help="show the most recently dead-lettered events")
+    show.add_argument("--limit", type=int, default=50)
+    show.add_argument("--table", help="only events for this source table")
+
+    requeue = commands.add_parser("requeue", help="move events back to the outbox with attempts reset")
+    requeue.add_argument("ids", nargs="*", help="event ids; omit with --all to requeue everything selected")
+    requeue.add_argument("--table", help="only events for this source table")
+    requeue.add_argument("--all", action="store_true", help="requeue every selected event")
+
+    commands.add_parser("sweep", help="dead-letter exhausted events left in the outbox (e.g. from before the migration)")
+    args = parser.parse_args(argv)
+
+    settings = Settings()
+    log = configure_logging("utility_lineage_dead_letters")
+    pg_pool = pg.PostgresPool(settings.supabase_dsn, 1, 1)
+    try:
+        with pg_pool.connection() as conn:
+            if args.command == "list":
+                for row in list_dead_letters(conn, args.limit, args.table):
+                    log.info("Dead-lettered event", extra={key: str(value) for key, value in row.items()})
+            elif args.command == "requeue":
+                if not args.ids and not args.all:
+                    parser.error("requeue needs event ids or --all")
+                requeued = requeue_dead_letters(conn, args.ids or None, args.table)
+                log.info("Requeued dead-lettered events", extra={"requeued": requeued})
+            else:
+                moved = dead_letter_exhausted(conn, settings.max_attempts)
+                log.info("Swept exhausted events", extra={"dead_lettered": moved, "max_attempts": settings.max_attempts})
+    finally:
+        pg_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import zlib
+from typing import List
+
+from src.config.settings import Settings
+from src.domain.models.events import OutboxEvent
+
+
+def partition_key(event: OutboxEvent) -> int:
+    """Stable hash of the event's entity; unlike ``hash()`` it is the same in every process."""
+    return zlib.crc32(f"{event.aggregate_type}:{event.aggregate_id}".encode("utf-8"))
+
+
+def partition_events(events: List[OutboxEvent], partitions: int) -> List[List[OutboxEvent]]:
+    """Hash-partition events by entity, keeping fetch order within each partition.
+
+    Every event for one ``(aggregate_type, aggregate_id)`` lands in the same partition, so a
+    partition processed sequentially preserves per-entity order while partitions run in parallel.
+    """
+    buckets: List[List[OutboxEvent]] = [[] for _ in range(max(1, partitions))]
+    for event in events:
+        buckets[partition_key(event) % len(buckets)].append(event)
+    return buckets
+
+
+def dispatch_concurrency(settings: Settings) -> int:
+    """Worker threads the pools can actually feed.
+
+    Each in-flight partition holds one Postgres connection while it loads and one Neo4j
+    session while it writes; one Postgres connection is kept back for the lease heartbeat.
+    ``ThreadedConnectionPool`` raises instead of blocking when exhausted, so never exceed it.
+    """
+    return max(1, min(
+        settings.dispatch_concurrency,
+        settings.pg_pool_maxconn - 1,
+        settings.neo4j_max_connection_pool_size,
+    ))
@@ -0,0 +1,44 @@
+import threading
+from typing import List, Sequence
+
+from src.adapters.queue.outbox import renew_leases
+from src.adapters.supabase.db import PostgresPool
+
+
+class LeaseRenewer:
+    """Background heartbeat that keeps a claimed batch leased while it is processed.
+
+    Renews every third of the lease so one missed beat doesn't lose the claim. Events whose
+    lease was lost (another worker reclaimed them) are logged; their writes are idempotent,
+    so finishing them here only costs duplicate work.
+    """
+
+    def __init__(self, pg_pool: PostgresPool, worker_id: str, event_ids: Sequence, lease_seconds: int, log):
+        self.pg_pool = pg_pool
+        self.worker_id = worker_id
+        self.event_ids: List = list(event_ids)
+        self.lease_seconds = lease_seconds
+        self.log = log
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="outbox-lease-renewer", daemon=True)
+
+    def __enter__(self) -> "LeaseRenewer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        interval = max(1.0, self.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            try:
+                with self.pg_pool.connection() as conn:
+                    held = renew_leases(conn, self.worker_id, self.event_ids, self.lease_seconds)
+            except Exception:  # noqa: BLE001
+                self.log.exception("Failed renewing outbox leases", extra={"events": len(self.event_ids)})
+                continue
+            if len(held) < len(self.event_ids):
+                self.log.warning("Lost outbox leases", extra={"held": len(held), "claimed": len(self.event_ids)})
+                self.event_ids = held
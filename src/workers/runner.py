@@ -1,16 +1,33 @@
+import signal
+import threading
 import time
-from typing import List
+from collections import Counter
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from src.adapters.neo4j.client import Neo4jClient
-from src.adapters.queue.outbox import fetch_pending_events, mark_failed, mark_processed
+from src.adapters.queue.notify import OutboxListener
+from src.adapters.queue.outbox import ack_events, claim_superseded_events, oldest_pending_age, release_claims
+from src.adapters.supabase import db as pg
 from src.adapters.supabase.db import PostgresPool
 from src.config.settings import Settings
 from src.domain.models.events import OutboxEvent
+from src.domain.services.coalescing import CoalescedBatch, coalesce_events
+from src.domain.services.reference_nodes import ReferenceNodeStage
+from src.domain.services.write_cache import WriteSuppressionCache
 from src.pipelines.audit_pipeline import AuditPipeline
 from src.pipelines.lineage_pipeline import LineagePipeline
 from src.pipelines.quality_pipeline import QualityPipeline
 from src.pipelines.vendor_mapping_pipeline import VendorMappingPipeline
+from src.utils import metrics, profiler
 from src.utils.logging import configure_logging
+from src.workers.adaptive import AdaptiveBatchSizer
+from src.workers.backoff import IdleBackoff
+from src.workers.capture import TrafficCapture
+from src.workers.dispatch import dispatch_concurrency, partition_events
+from src.workers.lanes import LaneScheduler
+from src.workers.leases import LeaseRenewer
+from src.workers.schema import verify_schema
 
 
 TABLES = [
@@ -23,6 +40,133 @@ TABLES = [
 AGG_TYPES = ["lineage_entity", "vendor_product_mapping", "audit_event", "data_quality_entity"]
 
 
+def group_by_aggregate(events: List[OutboxEvent]) -> Dict[str, List[OutboxEvent]]:
+    """Group events by aggregate type, keeping fetch order within each group."""
+    groups: Dict[str, List[OutboxEvent]] = {}
+    for event in events:
+        groups.setdefault(event.aggregate_type, []).append(event)
+    return groups
+
+
+def dispatch_events(
+    pipelines: Dict[str, object],
+    events: List[OutboxEvent],
+    log,
+    stop_event: Optional[threading.Event] = None,
+) -> Tuple[List[Tuple[OutboxEvent, Optional[Exception]]], List[OutboxEvent]]:
+    """Run events through their pipelines one aggregate group at a time.
+
+    Returns ``(outcomes, unstarted)``: the exception (or None) for every event that ran, and
+    the events left untouched because shutdown was requested or no pipeline handles them.
+    """
+    outcomes: List[Tuple[OutboxEvent, Optional[Exception]]] = []
+    unstarted: List[OutboxEvent] = []
+    for agg, group in group_by_aggregate(events).items():
+        if stop_event is not None and stop_event.is_set():
+            unstarted.extend(group)
+            continue
+
+        pipeline = pipelines.get(agg)
+        if pipeline is None:
+            for event in group:
+                log.warning("Unhandled aggregate type", extra={"aggregate_type": agg, "event_id": event.id})
+            unstarted.extend(group)
+            continue
+
+        try:
+            with metrics.recorder().timer("pipeline_batch_seconds", {"pipeline": agg}):
+                failures = pipeline.handle_batch(group)
+        except Exception as exc:  # noqa: BLE001
+            # The batch load itself failed; every event in the group shares the error.
+            log.exception("Failed loading utility/lineage batch", extra={"aggregate_type": agg, "events": len(group)})
+            failures = [(event, exc) for event in group]
+
+        errors = {event.id: exc for event, exc in failures}
+        outcomes.extend((event, errors.get(event.id)) for event in group)
+    return outcomes, unstarted
+
+
+def prepare_batch(
+    events: List[OutboxEvent],
+    log,
+    parallelism: int,
+    lanes: Optional[LaneScheduler] = None,
+) -> Tuple[CoalescedBatch, List[List[OutboxEvent]], Counter]:
+    """Coalesce a fetched batch and split it into ``parallelism`` dispatch partitions.
+
+    With ``lanes`` each aggregate type is partitioned within its own concurrency limit,
+    priority lanes first. Returns the batch, its partitions and the initial stats.
+    """
+    stats: Counter = Counter()
+    batch = coalesce_events(events)
+    stats["fetched"] = len(events)
+    stats["folded"] = batch.folded
+    if batch.folded:
+        log.info("Coalesced outbox events", extra={"fetched": len(events), "effective": len(batch.events), "folded": batch.folded})
+
+    if lanes is not None:
+        partitions = lanes.partitions(batch.events, parallelism)
+    else:
+        partitions = partition_events(batch.events, parallelism)
+    return batch, partitions, stats
+
+
+def settle_batch(
+    events: List[OutboxEvent],
+    batch: CoalescedBatch,
+    results: List[Tuple[List[Tuple[OutboxEvent, Optional[Exception]]], List[OutboxEvent]]],
+    stats: Counter,
+    pg_pool: PostgresPool,
+    log,
+    worker_id: Optional[str] = None,
+    settings: Optional[Settings] = None,
+) -> Counter:
+    """Ack the ``dispatch_events`` results of a batch in one flush; returns the outcome counts.
+
+    Superseded events share the outcome of the event that stood in for them; unstarted events
+    are released back to the queue.
+    """
+    processed_ids: List[str] = []
+    failed: List[Tuple[str, str]] = []
+    released_ids: List[str] = []
+    for outcomes, unstarted in results:
+        for event, exc in outcomes:
+            if exc is None:
+                processed_ids.extend(batch.ids_for(event))
+                continue
+            log.error(
+                "Failed processing utility/lineage event",
+                exc_info=exc,
+                extra={"event_id": event.id, "aggregate_id": event.aggregate_id},
+            )
+            failed.extend((event_id, str(exc)) for event_id in batch.ids_for(event))
+        for event in unstarted:
+            released_ids.extend(batch.ids_for(event))
+
+    # One ack flush per batch; if it fails nothing is acked and the batch is replayed.
+    with pg_pool.connection() as conn, metrics.recorder().timer("stage_seconds", {"stage": "ack"}):
+        retry = (
+            {}
+            if settings is None
+            else {
+                "max_attempts": settings.max_attempts,
+                "retry_base_seconds": settings.retry_base_seconds,
+                "retry_max_seconds": settings.retry_max_seconds,
+            }
+        )
+        stats["dead_lettered"] = ack_events(conn, processed_ids, failed, worker_id=worker_id, **retry)
+        if worker_id and released_ids:
+            release_claims(conn, worker_id, released_ids)
+    stats["processed"] = len(processed_ids)
+    stats["failed"] = len(failed)
+    stats["released"] = len(released_ids)
+    stats["retried"] = sum(1 for event in events if event.attempts > 0)
+    for outcome in ("processed", "failed", "released", "folded", "dead_lettered", "retried"):
+        if stats[outcome]:
+            metrics.recorder().inc("events_total", stats[outcome], {"outcome": outcome})
+    return stats
+
+
 def process_batch(
     lineage_pipeline: LineagePipeline,
     vendor_pipeline: VendorMappingPipeline,
@@ -31,64 +175,285 @@ def process_batch(
     events: List[OutboxEvent],
     pg_pool: PostgresPool,
     log,
-):
-    for event in events:
-        try:
-            agg = event.aggregate_type
-            if agg == "lineage_entity":
-                lineage_pipeline.handle_event(event)
-            elif agg == "vendor_product_mapping":
-                vendor_pipeline.handle_event(event)
-            elif agg == "audit_event":
-                audit_pipeline.handle_event(event)
-            elif agg == "data_quality_entity":
-                quality_pipeline.handle_event(event)
-            else:
-                log.warning("Unhandled aggregate type", extra={"aggregate_type": agg, "event_id": event.id})
-                continue
+    worker_id: Optional[str] = None,
+    executor: Optional[Executor] = None,
+    concurrency: int = 1,
+    stop_event: Optional[threading.Event] = None,
+    settings: Optional[Settings] = None,
+    lanes: Optional[LaneScheduler] = None,
+) -> Counter:
+    """Coalesce, dispatch and ack a fetched batch; returns outcome counts.
 
-            with pg_pool.connection() as conn:
-                mark_processed(conn, event.id)
-        except Exception as exc:  # noqa: BLE001
-            log.exception("Failed processing utility/lineage event", extra={"event_id": event.id, "aggregate_id": event.aggregate_id})
-            with pg_pool.connection() as conn:
-                mark_failed(conn, event.id, str(exc))
+    With an ``executor`` and ``concurrency > 1`` the batch is hash-partitioned by entity and
+    partitions run in parallel. Only events that finished are acked; events not started
+    before ``stop_event`` was set are released back to the queue. With ``settings`` failures
+    follow its retry schedule and are dead-lettered after ``max_attempts``. With ``lanes``
+    each aggregate type is partitioned within its own concurrency limit, priority lanes first.
+    """
+    pipelines = {
+        "lineage_entity": lineage_pipeline,
+        "vendor_product_mapping": vendor_pipeline,
+        "audit_event": audit_pipeline,
+        "data_quality_entity": quality_pipeline,
+    }
+    batch, partitions, stats = prepare_batch(events, log, concurrency if executor is not None else 1, lanes)
 
+    if executor is None or concurrency <= 1:
+        ordered = [event for partition in partitions for event in partition]
+        results = [dispatch_events(pipelines, ordered, log, stop_event)]
+    else:
+        futures = [
+            executor.submit(dispatch_events, pipelines, partition, log, stop_event)
+            for partition in partitions
+            if partition
+        ]
+        results = [future.result() for future in futures]
 
-def main():
-    settings = Settings()
+    return settle_batch(events, batch, results, stats, pg_pool, log, worker_id, settings)
+
+
+def idle_wait(listener: Optional[OutboxListener], delay: float, stop_event: threading.Event) -> bool:
+    """Wait out an idle delay in short slices so shutdown stays prompt; True if notified."""
+    if listener is None:
+        stop_event.wait(delay)
+        return False
+    deadline = time.monotonic() + delay
+    while not stop_event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        if listener.wait(min(remaining, 1.0)):
+            return True
+    return False
+
+
+def start_observability(settings: Settings, shard: Optional[Tuple[int, int]], log):
+    """Install the metrics recorder (serving it if ``METRICS_PORT`` is set) and the slow-op profiler.
+
+    Returns the metrics HTTP server, or None; the caller shuts it down.
+    """
+    metrics_server = None
+    if settings.metrics_port is not None:
+        port = settings.metrics_port + (settings.shard_index if shard else 0)
+        metrics_server = metrics.serve(metrics.install(metrics.PrometheusRecorder()), settings.metrics_host, port)
+        log.info("Serving metrics", extra={"host": settings.metrics_host, "port": port, "path": "/metrics"})
+    if settings.slow_op_log_path:
+        # Shards share the setting, so each writes its own file.
+        path = f"{settings.slow_op_log_path}.{settings.shard_index}" if shard else settings.slow_op_log_path
+        profiler.install(
+            profiler.SlowOpProfiler(
+                path,
+                threshold_seconds=settings.slow_op_threshold_seconds,
+                sample_rate=settings.slow_op_sample_rate,
+                profile_rate=settings.slow_op_profile_rate,
+                max_bytes=settings.slow_op_max_bytes,
+                backups=settings.slow_op_backups,
+            )
+        )
+        log.info("Recording slow operations", extra={"path": path, "threshold": settings.slow_op_threshold_seconds})
+    return metrics_server
+
+
+def claim_batch(
+    pg_pool: PostgresPool,
+    lanes: LaneScheduler,
+    settings: Settings,
+    batch_size: int,
+    shard: Optional[Tuple[int, int]],
+) -> Tuple[List[OutboxEvent], int, float]:
+    """Claim the next batch plus its superseded events and commit the claim.
+
+    Returns ``(events, claimed, seconds)``: ``claimed`` counts the lane claim alone, without
+    the superseded events pulled in for coalescing.
+    """
+    claim_started = time.perf_counter()
+    with pg_pool.connection() as conn:
+        conn.autocommit = False
+        events = lanes.claim(
+            conn,
+            settings.worker_id,
+            batch_size,
+            settings.lease_seconds,
+            settings.max_attempts,
+            shard=shard,
+        )
+        claimed = len(events)
+        if events:
+            events += claim_superseded_events(
+                conn,
+                settings.worker_id,
+                events,
+                settings.coalesce_lookahead,
+                settings.lease_seconds,
+                settings.max_attempts,
+            )
+        # Commit the claim; the lease keeps other workers off these events from here on.
+        conn.commit()
+    return events, claimed, time.perf_counter() - claim_started
+
+
+def run(settings: Settings) -> None:
+    """Claim and process batches until SIGTERM/SIGINT; owns its own pools and clients."""
     log = configure_logging("utility_lineage_worker")
-    log.info("Starting utility/lineage worker", extra={"pipeline": settings.pipeline_name})
+    concurrency = dispatch_concurrency(settings)
+    shard = (settings.shard_index, settings.shard_count) if settings.shard_count > 1 else None
+    log.info(
+        "Starting utility/lineage worker",
+        extra={
+            "pipeline": settings.pipeline_name,
+            "worker_id": settings.worker_id,
+            "concurrency": concurrency,
+            "shard": shard,
+        },
+    )
+    if concurrency < settings.dispatch_concurrency:
+        log.warning(
+            "Dispatch concurrency capped by connection pools",
+            extra={
+                "requested": settings.dispatch_concurrency,
+                "effective": concurrency,
+                "pg_pool_maxconn": settings.pg_pool_maxconn,
+                "neo4j_max_connection_pool_size": settings.neo4j_max_connection_pool_size,
+            },
+        )
 
-    pg_pool = PostgresPool(settings.supabase_dsn)
-    neo4j = Neo4jClient(settings.neo4j_uri, settings.neo4j_user, settings.neo4j_password)
+    # Install before the pools are built so their capacity gauges land in the real recorder.
+    metrics_server = start_observability(settings, shard, log)
+    recorder = metrics.recorder()
 
-    lineage_pipeline = LineagePipeline(settings, pg_pool, neo4j)
-    vendor_pipeline = VendorMappingPipeline(settings, pg_pool, neo4j)
-    audit_pipeline = AuditPipeline(settings, pg_pool, neo4j)
-    quality_pipeline = QualityPipeline(settings, pg_pool, neo4j)
+    # Finish the in-flight batch on SIGTERM/SIGINT, ack what completed, release the rest.
+    stop_event = threading.Event()
 
+    def _request_stop(signum, _frame):
+        log.info("Shutdown requested; finishing in-flight events", extra={"signal": signum})
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    pg_pool = PostgresPool(settings.supabase_dsn, settings.pg_pool_minconn, settings.pg_pool_maxconn)
+    neo4j = Neo4jClient.from_settings(settings)
     try:
-        while True:
-            with pg_pool.connection() as conn:
-                conn.autocommit = False
-                events = fetch_pending_events(
-                    conn,
-                    settings.batch_size,
-                    settings.max_attempts,
-                    table_names=TABLES,
-                    aggregate_types=AGG_TYPES,
-                )
-                conn.commit()
+        verify_schema(neo4j, settings.schema_check, log)
+    except Exception:
+        neo4j.close()
+        pg_pool.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        raise
+
+    write_cache = WriteSuppressionCache.from_settings(settings, log)
+    reference_nodes = ReferenceNodeStage(neo4j)
+    lineage_pipeline = LineagePipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    vendor_pipeline = VendorMappingPipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    audit_pipeline = AuditPipeline(settings, pg_pool, neo4j, write_cache, reference_nodes)
+    quality_pipeline = QualityPipeline(settings, pg_pool, neo4j, write_cache)
+
+    listener = OutboxListener(settings.supabase_dsn, settings.listen_channel) if settings.listen_enabled else None
+    # With LISTEN the idle wait is only a safety net for missed notifications and retries.
+    idle = IdleBackoff(
+        settings.idle_backoff_min_seconds,
+        settings.listen_idle_max_seconds if listener else settings.poll_interval_seconds,
+    )
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="dispatch") if concurrency > 1 else None
+    sizer = AdaptiveBatchSizer(settings, neo4j)
+    capture = None
+    if settings.capture_path:
+        # Shards share the setting, so each writes its own file.
+        capture_path = f"{settings.capture_path}.{settings.shard_index}" if shard else settings.capture_path
+        capture = TrafficCapture(capture_path, settings.capture_sample_rate)
+        log.info("Capturing outbox traffic", extra={"path": capture_path, "sample_rate": settings.capture_sample_rate})
+    # Every handled aggregate type gets a lane; types missing from LANE_WEIGHTS weigh 1.
+    lanes = LaneScheduler(
+        {agg: settings.lane_weights.get(agg, 1) for agg in AGG_TYPES},
+        settings.lane_concurrency,
+        table_names=TABLES,
+    )
+
+    totals: Counter = Counter()
+    lag_checked_at = 0.0
+    try:
+        while not stop_event.is_set():
+            if metrics_server is not None and time.monotonic() - lag_checked_at >= settings.queue_lag_interval_seconds:
+                lag_checked_at = time.monotonic()
+                try:
+                    with pg_pool.connection() as conn:
+                        recorder.set("queue_lag_seconds", oldest_pending_age(conn, TABLES))
+                        conn.rollback()
+                except Exception:  # noqa: BLE001
+                    log.exception("Failed measuring outbox queue lag")
+
+            events, claimed, fetch_seconds = claim_batch(pg_pool, lanes, settings, sizer.batch_size, shard)
+            recorder.observe("stage_seconds", fetch_seconds, {"stage": "claim"})
 
             if not events:
-                time.sleep(settings.poll_interval_seconds)
+                if idle_wait(listener, idle.next_delay(), stop_event):
+                    idle.reset()
                 continue
 
-            process_batch(lineage_pipeline, vendor_pipeline, audit_pipeline, quality_pipeline, events, pg_pool, log)
+            # Busy: reset the idle delay and go straight back for the next batch after this one.
+            idle.reset()
+            if listener is not None:
+                listener.saw_events()
+
+            captured = capture is not None and capture.start_batch()
+            if captured:
+                pg.set_row_sink(capture.record_rows)
+            batch_started = time.perf_counter()
+            with LeaseRenewer(pg_pool, settings.worker_id, [event.id for event in events], settings.lease_seconds, log):
+                stats = process_batch(
+                    lineage_pipeline,
+                    vendor_pipeline,
+                    audit_pipeline,
+                    quality_pipeline,
+                    events,
+                    pg_pool,
+                    log,
+                    worker_id=settings.worker_id,
+                    executor=executor,
+                    concurrency=concurrency,
+                    stop_event=stop_event,
+                    settings=settings,
+                    lanes=lanes,
+                )
+            if captured:
+                pg.set_row_sink(None)
+                capture.finish_batch(events)
+            totals.update(stats)
+            sizing = sizer.observe(claimed, fetch_seconds)
+            recorder.set("events_per_second", stats["processed"] / max(time.perf_counter() - batch_started, 1e-6))
+            recorder.set("batch_size", sizing["batch_size"])
+            recorder.set("write_batch_size", sizing["write_batch_size"])
+            log.info(
+                "Processed batch",
+                extra={
+                    "batch": dict(stats),
+                    "sizing": sizing,
+                    "totals": dict(totals),
+                    "write_cache": write_cache.stats() if write_cache is not None else None,
+                    "reference_nodes": reference_nodes.stats(),
+                    "dimension_cache": vendor_pipeline.dimension_cache.stats(),
+                },
+            )
     finally:
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if capture is not None:
+            pg.set_row_sink(None)
+            capture.close()
+        if listener is not None:
+            listener.close()
+        if write_cache is not None:
+            write_cache.save()
         neo4j.close()
         pg_pool.close()
+        log.info("Stopped utility/lineage worker", extra={"totals": dict(totals)})
+
+
+def main():
+    run(Settings())
 
 
 if __name__ == "__main__":
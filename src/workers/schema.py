@@ -0,0 +1,56 @@
+import argparse
+import sys
+from typing import Optional
+
+from src.adapters.neo4j.client import Neo4jClient
+from src.adapters.neo4j.schema import REQUIREMENTS, ensure_schema, missing_requirements
+from src.config.settings import Settings
+from src.utils.logging import configure_logging
+
+
+def verify_schema(neo4j: Neo4jClient, mode: str, log) -> None:
+    """Startup check for the worker: ``strict`` refuses to run, ``warn`` logs, ``off`` skips."""
+    if mode == "off":
+        return
+    missing = missing_requirements(neo4j)
+    if not missing:
+        return
+    names = [requirement.name for requirement in missing]
+    if mode == "strict":
+        raise RuntimeError(
+            f"Neo4j schema is missing {names}; run `python -m src.workers.schema` or set SCHEMA_CHECK=warn"
+        )
+    log.warning(
+        "Neo4j schema is missing constraints/indexes; MERGEs will fall back to label scans",
+        extra={"missing": names, "fix": "python -m src.workers.schema"},
+    )
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Create the Neo4j constraints and indexes the pipelines depend on.")
+    parser.add_argument("--check", action="store_true", help="only report missing items; exit 1 if any are missing")
+    args = parser.parse_args(argv)
+
+    settings = Settings()
+    log = configure_logging("utility_lineage_schema")
+    neo4j = Neo4jClient.from_settings(settings)
+    try:
+        if args.check:
+            missing = missing_requirements(neo4j)
+            for requirement in missing:
+                log.warning("Missing schema item", extra={"name": requirement.name, "cypher": requirement.create_cypher()})
+            log.info("Schema check finished", extra={"required": len(REQUIREMENTS), "missing": len(missing)})
+            if missing:
+                sys.exit(1)
+            return
+
+        created = ensure_schema(neo4j)
+        for requirement in created:
+            log.info("Created schema item", extra={"name": requirement.name, "label": requirement.label})
+        log.info("Schema bootstrap finished", extra={"required": len(REQUIREMENTS), "created": len(created)})
+    finally:
+        neo4j.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import argparse
+import multiprocessing
+import signal
+import time
+from typing import Dict, Optional
+
+from src.config.settings import Settings
+from src.utils.logging import configure_logging
+from src.workers import runner
+
+
+# A child that stays up this long is considered healthy again and its restart delay resets.
+HEALTHY_UPTIME_SECONDS = 60
+MAX_RESTART_DELAY_SECONDS = 60
+
+
+def _run_shard(shard_index: int, shard_count: int) -> None:
+    """Child entry point: one worker process with its own pools, claiming one shard."""
+    # Drop the supervisor's handlers inherited through fork until the runner installs its own.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    base = Settings()
+    settings = Settings(
+        shard_index=shard_index,
+        shard_count=shard_count,
+        worker_id=f"{base.worker_id}/shard-{shard_index}",
+    )
+    runner.run(settings)
+
+
+class Supervisor:
+    """Fork one worker process per shard, restart crashed ones, fan out shutdown signals."""
+
+    def __init__(self, shards: int, stop_timeout: float):
+        self.shards = shards
+        self.stop_timeout = stop_timeout
+        self.log = configure_logging("utility_lineage_supervisor")
+        self._ctx = multiprocessing.get_context("fork")
+        self._children: Dict[int, multiprocessing.Process] = {}
+        self._started_at: Dict[int, float] = {}
+        self._restart_delay: Dict[int, float] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._stopping = False
+
+    def _start(self, shard_index: int) -> None:
+        child = self._ctx.Process(
+            target=_run_shard,
+            args=(shard_index, self.shards),
+            name=f"utility-lineage-shard-{shard_index}",
+        )
+        child.start()
+        self._children[shard_index] = child
+        self._started_at[shard_index] = time.monotonic()
+        self.log.info("Started shard worker", extra={"shard": shard_index, "pid": child.pid})
+
+    def _request_stop(self, signum, _frame) -> None:
+        if not self._stopping:
+            self.log.info("Shutdown requested; stopping shard workers", extra={"signal": signum})
+        self._stopping = True
+
+    def _check_children(self) -> None:
+        now = time.monotonic()
+        for shard_index, child in list(self._children.items()):
+            if child.is_alive():
+                continue
+            restart_at = self._restart_at.get(shard_index)
+            if restart_at is None:
+                uptime = now - self._started_at[shard_index]
+                delay = 1.0 if uptime >= HEALTHY_UPTIME_SECONDS else min(
+                    MAX_RESTART_DELAY_SECONDS, self._restart_delay.get(shard_index, 0.5) * 2
+                )
+                self._restart_delay[shard_index] = delay
+                self._restart_at[shard_index] = now + delay
+                self.log.error(
+                    "Shard worker exited; scheduling restart",
+                    extra={"shard": shard_index, "exitcode": child.exitcode, "restart_in": delay},
+                )
+            elif now >= restart_at:
+                del self._restart_at[shard_index]
+                self._start(shard_index)
+
+    def _stop_children(self) -> None:
+        for child in self._children.values():
+            if child.is_alive():
+                child.terminate()  # SIGTERM: the worker finishes its in-flight batch
+        deadline = time.monotonic() + self.stop_timeout
+        for shard_index, child in self._children.items():
+            child.join(max(0.0, deadline - time.monotonic()))
+            if child.is_alive():
+                self.log.warning("Shard worker did not stop in time; killing", extra={"shard": shard_index})
+                child.kill()
+                child.join()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        for shard_index in range(self.shards):
+            self._start(shard_index)
+        try:
+            while not self._stopping:
+                self._check_children()
+                time.sleep(1.0)
+        finally:
+            self._stop_children()
+            self.log.info("Supervisor stopped", extra={"shards": self.shards})
+
+
+def main(argv: Optional[list] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run N sharded utility/lineage worker processes.")
+    parser.add_argument("--shards", type=int, required=True, help="number of worker processes / outbox shards")
+    parser.add_argument(
+        "--stop-timeout",
+        type=float,
+        default=60.0,
+        help="seconds to wait for workers to finish in-flight batches before killing them",
+    )
+    args = parser.parse_args(argv)
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    Supervisor(args.shards, args.stop_timeout).run()
+
+
+if __name__ == "__main__":
+    main()
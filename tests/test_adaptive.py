@@ -0,0 +1,84 @@
+from src.bench.suite import bench_settings
+from src.workers.adaptive import AdaptiveBatchSizer, AimdController
+
+
+class StatsNeo4j:
+    """Exposes hand-set cumulative ``write_stats`` like ``Neo4jClient``."""
+
+    def __init__(self):
+        self.write_batch_size = 0
+        self.stats = {"writes": 0, "write_seconds": 0.0, "transient_errors": 0, "lock_errors": 0}
+
+    def write_stats(self):
+        return dict(self.stats)
+
+    def add(self, writes=0, write_seconds=0.0, transient_errors=0):
+        self.stats["writes"] += writes
+        self.stats["write_seconds"] += write_seconds
+        self.stats["transient_errors"] += transient_errors
+
+
+def sizer(**overrides):
+    neo4j = StatsNeo4j()
+    settings = bench_settings(batch_size=100, batch_size_min=10, batch_size_max=200,
+                              neo4j_write_batch_size=500, neo4j_write_batch_size_min=50,
+                              neo4j_write_batch_size_max=1000, **overrides)
+    return AdaptiveBatchSizer(settings, neo4j), neo4j
+
+
+def test_aimd_stays_within_bounds():
+    controller = AimdController(initial=5, floor=4, ceiling=10, step=4)
+
+    controller.increase()
+    controller.increase()
+    assert controller.value == 10
+    controller.decrease()
+    assert controller.value == 5
+    controller.decrease()
+    assert controller.value == 4
+
+
+def test_full_fast_batch_grows_both_sizes():
+    adaptive, neo4j = sizer()
+    neo4j.add(writes=2, write_seconds=0.2)
+
+    observed = adaptive.observe(fetched=100, fetch_seconds=0.01)
+
+    assert (observed["batch_size"], observed["write_batch_size"]) == (110, 550)
+    assert neo4j.write_batch_size == 550
+
+
+def test_partial_batch_leaves_sizes_alone():
+    adaptive, _ = sizer()
+
+    observed = adaptive.observe(fetched=40, fetch_seconds=0.01)
+
+    assert (observed["batch_size"], observed["write_batch_size"]) == (100, 500)
+
+
+def test_slow_writes_only_shrink_the_transaction_size():
+    adaptive, neo4j = sizer()
+    neo4j.add(writes=1, write_seconds=5.0)
+
+    observed = adaptive.observe(fetched=100, fetch_seconds=0.01)
+
+    assert (observed["batch_size"], observed["write_batch_size"]) == (100, 250)
+
+
+def test_transient_errors_halve_both_sizes():
+    adaptive, neo4j = sizer()
+    neo4j.add(writes=1, write_seconds=0.1, transient_errors=1)
+
+    observed = adaptive.observe(fetched=100, fetch_seconds=0.01)
+
+    assert (observed["batch_size"], observed["write_batch_size"]) == (50, 250)
+
+
+def test_disabled_keeps_configured_sizes():
+    adaptive, neo4j = sizer(adaptive_batching=False)
+    neo4j.add(writes=1, write_seconds=0.1, transient_errors=1)
+
+    observed = adaptive.observe(fetched=100, fetch_seconds=10)
+
+    assert (observed["batch_size"], observed["write_batch_size"]) == (100, 500)
+    assert neo4j.write_batch_size == 500
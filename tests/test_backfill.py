@@ -0,0 +1,66 @@
+import logging
+
+from src.workers.backfill import key_chunks, retry_failed
+from src.workers.checkpoint import Checkpoint
+
+
+log = logging.getLogger("tests.backfill")
+
+
+def test_key_chunks_never_split_a_key():
+    rows = [{"k": key} for key in ["a", "a", "b", "c", "c", "c", "d"]]
+
+    chunks = list(key_chunks(rows, "k", 2))
+
+    assert [[row["k"] for row in chunk] for chunk, _ in chunks] == [["a", "a", "b"], ["c", "c", "c", "d"]]
+    assert [last_key for _, last_key in chunks] == ["b", "d"]
+
+
+def test_key_chunks_empty_stream():
+    assert list(key_chunks([], "k", 10)) == []
+
+
+def test_checkpoint_round_trip_keeps_failed_keys(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = Checkpoint(path)
+    checkpoint.save("audit", "10", written=8, failed_keys=["3", "7"])
+    checkpoint.save("audit", "20", written=10, failed_keys=["15"])
+
+    reloaded = Checkpoint(path)
+
+    assert reloaded.last_key("audit") == "20"
+    assert reloaded.failed_keys("audit") == ["15", "3", "7"]
+    assert reloaded.state["audit"]["written"] == 18
+    assert reloaded.state["audit"]["failed"] == 3
+
+
+def test_checkpoint_resolve_drops_recovered_keys(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.save("audit", "10", written=0, failed_keys=["3", "7"])
+
+    checkpoint.resolve("audit", ["3"])
+
+    assert checkpoint.failed_keys("audit") == ["7"]
+    assert checkpoint.last_key("audit") == "10"
+
+
+class FlakyPipeline:
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.seen = []
+
+    def handle_batch(self, events):
+        self.seen.extend(event.aggregate_id for event in events)
+        return [(event, RuntimeError("boom")) for event in events if event.aggregate_id in self.failing]
+
+
+def test_retry_failed_keeps_only_keys_that_fail_again(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.save("quality", "e9", written=0, failed_keys=["e1", "e2", "e3"])
+    pipeline = FlakyPipeline(failing=["e2"])
+
+    retry_failed("quality", pipeline, checkpoint, chunk_size=2, log=log)
+
+    assert sorted(pipeline.seen) == ["e1", "e2", "e3"]
+    assert checkpoint.failed_keys("quality") == ["e2"]
+    assert checkpoint.last_key("quality") == "e9"
@@ -0,0 +1,25 @@
+import pytest
+
+from src.bench.fakes import DataShape, FakePostgresPool, RecordingNeo4jClient, SyntheticSource
+from src.bench.suite import bench_settings
+from src.pipelines.audit_pipeline import AuditPipeline
+from src.pipelines.quality_pipeline import QualityPipeline
+
+
+@pytest.mark.parametrize(
+    "pipeline_class, aggregate_type",
+    [(AuditPipeline, "audit_event"), (QualityPipeline, "data_quality_entity")],
+)
+def test_batch_is_loaded_with_one_query(pipeline_class, aggregate_type):
+    source = SyntheticSource(DataShape(entities=100, delete_ratio=0.0))
+    events = [event for event in source.events(400) if event.aggregate_type == aggregate_type]
+    pg_pool = FakePostgresPool(source)
+    neo4j = RecordingNeo4jClient()
+
+    failures = pipeline_class(bench_settings(), pg_pool, neo4j).handle_batch(events)
+
+    assert failures == []
+    assert len(events) > 1
+    assert pg_pool.counts["round_trips"] == 1
+    # UNWIND writes per statement, not one transaction per event.
+    assert neo4j.counts["transactions"] < len(events)
@@ -0,0 +1,34 @@
+from src.bench.fakes import RecordingNeo4jClient
+
+
+def test_write_rows_chunks_and_returns_matched_keys():
+    neo4j = RecordingNeo4jClient(write_batch_size=2)
+    records = []
+
+    failed = neo4j.write_rows("UNWIND $rows AS row MATCH (e:Product {id: row.id}) RETURN row.id AS key",
+                              [{"id": "a"}, {"id": "b"}, {"id": "c"}], records=records)
+
+    assert failed == []
+    assert sorted(record["key"] for record in records) == ["a", "b", "c"]
+    assert neo4j.counts["transactions"] == 2
+    assert neo4j.counts["sessions"] == 1
+    assert neo4j.write_stats()["writes"] == 2
+
+
+def test_reads_are_empty_unless_seeded():
+    neo4j = RecordingNeo4jClient()
+    neo4j.respond(r"AS run_ids", lambda parameters: [{"entity_id": key, "run_ids": ["r1"]} for key in parameters["entity_ids"]])
+
+    assert neo4j.read("SHOW INDEXES", {}) == []
+    assert neo4j.read("RETURN entity_id, collect(lr.id) AS run_ids", {"entity_ids": ["p1"]}) == [{"entity_id": "p1", "run_ids": ["r1"]}]
+    assert neo4j.counts["reads"] == 2
+
+
+def test_write_transaction_passes_a_recording_transaction():
+    neo4j = RecordingNeo4jClient()
+    neo4j.respond(r"DETACH DELETE", lambda parameters: [{"deleted": parameters["limit"]}])
+
+    result = neo4j.write_transaction(lambda tx, limit: tx.run("MATCH (n) DETACH DELETE n", limit=limit).single().data(), 5)
+
+    assert result == {"deleted": 5}
+    assert neo4j.counts["transactions"] == 1
@@ -0,0 +1,63 @@
+from src.utils.cache import LRUCache, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert [key for key, _ in cache.items()] == ["a", "c"]
+
+
+def test_lru_counts_hits_and_misses():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("missing", "default") == "default"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_lru_pop():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_entries_expire_as_misses():
+    clock = Clock()
+    cache = TTLCache(10, ttl_seconds=5, clock=clock)
+    cache.put("a", 1)
+
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(cache) == 0
+
+
+def test_ttl_items_skip_expired_entries():
+    clock = Clock()
+    cache = TTLCache(10, ttl_seconds=5, clock=clock)
+    cache.put("old", 1)
+    clock.now = 3
+    cache.put("new", 2)
+    clock.now = 6
+
+    assert list(cache.items()) == [("new", 2)]
+    assert cache.pop("new") == 2
@@ -0,0 +1,78 @@
+import gzip
+import json
+from dataclasses import asdict
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from src.bench.fakes import RecordingNeo4jClient
+from src.bench.replay import replay
+from src.bench.suite import bench_settings
+from src.domain.models.events import OutboxEvent
+from src.workers.capture import TrafficCapture, encode_value, read_capture
+
+
+CHANGED_AT = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def audit_event(audit_id: str) -> OutboxEvent:
+    return OutboxEvent(
+        id=f"event-{audit_id}",
+        aggregate_type="audit_event",
+        table_name="audit_log",
+        op="INSERT",
+        aggregate_id=audit_id,
+        payload=None,
+        created_at=CHANGED_AT,
+    )
+
+
+def audit_row(audit_id: str) -> dict:
+    return {
+        "id": audit_id,
+        "table_name": "products",
+        "record_id": "p1",
+        "action": "UPDATE",
+        "changed_by": "u1",
+        "changed_at": CHANGED_AT,
+        "ip_address": "10.0.0.1",
+        "user_agent": "tests",
+    }
+
+
+def test_capture_round_trip_keeps_types(tmp_path):
+    path = str(tmp_path / "capture.jsonl.gz")
+    capture = TrafficCapture(path)
+    assert capture.start_batch()
+    capture.record_rows("SELECT * FROM audit_log WHERE id = ANY(%s)", [{"id": "a1", "score": Decimal("0.5"), "at": CHANGED_AT}])
+    capture.record_rows("SELECT * FROM outbox_events", [{"id": "ignored"}])
+    capture.finish_batch([audit_event("a1")])
+    capture.close()
+
+    records = list(read_capture(path))
+
+    assert len(records) == 1
+    assert records[0]["events"] == [audit_event("a1")]
+    assert records[0]["rows"] == {"audit_log": [{"id": "a1", "score": Decimal("0.5"), "at": CHANGED_AT}]}
+
+
+def test_read_capture_stops_at_a_truncated_line(tmp_path):
+    path = str(tmp_path / "capture.jsonl.gz")
+    line = json.dumps({"offset": 0, "events": [asdict(audit_event("a1"))], "rows": {}}, default=encode_value)
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        handle.write(line + "\n" + line[:20])
+
+    assert len(list(read_capture(path))) == 1
+
+
+def test_paced_replay_starts_at_the_first_record(tmp_path):
+    path = str(tmp_path / "capture.jsonl.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as handle:
+        # Sampling skipped the first hour of the capture.
+        for offset, audit_id in ((3600.0, "a1"), (3600.05, "a2")):
+            record = {"offset": offset, "events": [asdict(audit_event(audit_id))], "rows": {"audit_log": [audit_row(audit_id)]}}
+            handle.write(json.dumps(record, default=encode_value) + "\n")
+
+    report = replay(path, bench_settings(), RecordingNeo4jClient(), paced=True)
+
+    assert report["batches"] == 2
+    assert 0.05 <= report["seconds"] < 5
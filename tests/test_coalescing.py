@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta, timezone
+
+from src.domain.models.events import OutboxEvent
+from src.domain.services.coalescing import coalesce_events
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def event(event_id: str, aggregate_id: str, op: str, minute: int, aggregate_type: str = "audit_event") -> OutboxEvent:
+    return OutboxEvent(
+        id=event_id,
+        aggregate_type=aggregate_type,
+        table_name="audit_log",
+        op=op,
+        aggregate_id=aggregate_id,
+        payload=None,
+        created_at=START + timedelta(minutes=minute),
+    )
+
+
+def test_latest_event_stands_in_for_its_aggregate():
+    batch = coalesce_events([event("e1", "a1", "INSERT", 0), event("e2", "a2", "INSERT", 1), event("e3", "a1", "UPDATE", 2)])
+
+    assert [e.id for e in batch.events] == ["e3", "e2"]
+    assert batch.ids_for(batch.events[0]) == ["e3", "e1"]
+    assert batch.folded == 1
+
+
+def test_delete_wins_over_later_events():
+    batch = coalesce_events([
+        event("e1", "a1", "UPDATE", 0),
+        event("e2", "a1", "delete", 1),
+        event("e3", "a1", "DELETE", 2),
+        event("e4", "a1", "INSERT", 3),
+    ])
+
+    assert [e.id for e in batch.events] == ["e3"]
+    assert sorted(batch.ids_for(batch.events[0])) == ["e1", "e2", "e3", "e4"]
+
+
+def test_same_id_in_different_aggregate_types_is_not_folded():
+    batch = coalesce_events([event("e1", "1", "INSERT", 0), event("e2", "1", "INSERT", 1, aggregate_type="lineage_entity")])
+
+    assert [e.id for e in batch.events] == ["e1", "e2"]
+    assert batch.superseded == {}
+
+
+def test_edit_wins_over_a_later_insert():
+    batch = coalesce_events([event("e1", "a1", "UPDATE", 0), event("e2", "a1", "INSERT", 1)])
+
+    assert [e.op for e in batch.events] == ["UPDATE"]
+    assert sorted(batch.ids_for(batch.events[0])) == ["e1", "e2"]
@@ -0,0 +1,81 @@
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+
+from src.bench.fakes import RecordingNeo4jClient
+from src.workers.checkpoint import Checkpoint
+from src.workers.compaction import CHECKPOINT_SOURCE, compact, retention_cutoff
+
+
+log = logging.getLogger("tests.compaction")
+
+
+def day_ms(day: str) -> int:
+    return int(datetime.fromisoformat(day).replace(hour=6, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def seeded_neo4j(days, events_per_day, batch_size):
+    """A ChangeEvent store holding ``events_per_day`` events on each of ``days``."""
+    neo4j = RecordingNeo4jClient()
+    remaining = {day: events_per_day for day in days}
+
+    def oldest(parameters):
+        after = parameters["after"][:10]
+        pending = sorted(day for day, left in remaining.items() if left and after <= day < parameters["cutoff"][:10])
+        return [{"oldest_ms": day_ms(pending[0]) if pending else None}]
+
+    def compact_batch(parameters):
+        taken = min(batch_size, remaining[parameters["day"]])
+        remaining[parameters["day"]] -= taken
+        return [{"compacted": taken, "summaries": 1 if taken else 0}]
+
+    neo4j.respond(r"AS oldest_ms", oldest)
+    neo4j.respond(r"AS compacted", compact_batch)
+    neo4j.respond(r"AS events", lambda parameters: [{"events": remaining[parameters["day"]], "summaries": 1}])
+    return neo4j, remaining
+
+
+def test_retention_cutoff_is_start_of_day():
+    now = datetime(2024, 3, 10, 17, 30, tzinfo=timezone.utc)
+
+    assert retention_cutoff(7, now) == datetime(2024, 3, 3, tzinfo=timezone.utc)
+
+
+def test_compact_checkpoints_each_day(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    neo4j, remaining = seeded_neo4j(["2024-01-01", "2024-01-02"], events_per_day=5, batch_size=2)
+    cutoff = datetime(2024, 1, 3, tzinfo=timezone.utc)
+
+    finished = compact(neo4j, cutoff, Checkpoint(path), 2, 0, threading.Event(), log)
+
+    assert finished
+    assert remaining == {"2024-01-01": 0, "2024-01-02": 0}
+    # 5 events in batches of 2: three transactions per day.
+    assert neo4j.counts["transactions"] == 6
+    with open(path, encoding="utf-8") as handle:
+        entry = json.load(handle)[CHECKPOINT_SOURCE]
+    assert entry["last_key"] == "2024-01-02"
+    assert entry["written"] == 10
+    assert "failed_keys" not in entry
+
+
+def test_compact_resumes_after_checkpoint(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "checkpoint.json"))
+    checkpoint.save(CHECKPOINT_SOURCE, "2024-01-01", written=5)
+    neo4j, remaining = seeded_neo4j(["2024-01-01", "2024-01-02"], events_per_day=3, batch_size=10)
+
+    compact(neo4j, datetime(2024, 1, 3, tzinfo=timezone.utc), checkpoint, 10, 0, threading.Event(), log)
+
+    assert remaining == {"2024-01-01": 3, "2024-01-02": 0}
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    neo4j, remaining = seeded_neo4j(["2024-01-01"], events_per_day=3, batch_size=10)
+
+    compact(neo4j, datetime(2024, 1, 3, tzinfo=timezone.utc), Checkpoint(str(path)), 10, 0, threading.Event(), log, dry_run=True)
+
+    assert remaining == {"2024-01-01": 3}
+    assert neo4j.counts["transactions"] == 0
+    assert not path.exists()
@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+
+from src.bench.fakes import FakePostgresPool
+from src.domain.services.dimension_cache import DimensionCache
+
+
+class NameSource:
+    def __init__(self, names):
+        self.names_by_table = names
+
+    def names(self, table, keys):
+        return [{"id": key, "name": self.names_by_table[table][key]} for key in keys if key in self.names_by_table[table]]
+
+
+def test_names_only_fetches_uncached_ids():
+    pool = FakePostgresPool(NameSource({"vendors": {"v1": "Acme", "v2": None}}))
+    cache = DimensionCache(maxsize=10, ttl_seconds=60)
+
+    with pool.connection() as conn:
+        assert cache.names(conn, "vendors", ["v1", "v2", "v3"]) == {"v1": "Acme", "v2": None}
+        # v1 and v2 (a NULL name) are cached; only the unknown v3 is looked up again.
+        assert cache.names(conn, "vendors", ["v1", "v2"]) == {"v1": "Acme", "v2": None}
+        cache.names(conn, "vendors", ["v1", "v3"])
+
+    assert pool.counts["round_trips"] == 2
+    assert cache.stats()["hits"] == 3
+
+
+def test_invalidate_forces_a_reload():
+    pool = FakePostgresPool(NameSource({"products": {"p1": "Widget"}}))
+    cache = DimensionCache(maxsize=10, ttl_seconds=60)
+
+    with pool.connection() as conn:
+        cache.names(conn, "products", ["p1"])
+        pool.source.names_by_table["products"]["p1"] = "Gadget"
+        cache.invalidate("products", ["p1"])
+        assert cache.names(conn, "products", ["p1"]) == {"p1": "Gadget"}
+
+    assert cache.invalidated == 1
+
+
+class OutboxCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, query, params=None):
+        if "clock_timestamp()" in query:
+            self.rows = [{"now": self.conn.now}]
+        elif "FROM outbox_events" in query:
+            self.rows = self.conn.outbox_rows
+        else:
+            self.rows = [{"id": key, "name": f"name {key}"} for key in params[0]]
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+
+class OutboxConnection:
+    """Serves clock_timestamp(), dimension outbox rows and names as ``DimensionCache`` reads them."""
+
+    def __init__(self, now, outbox_rows):
+        self.now = now
+        self.outbox_rows = outbox_rows
+
+    def cursor(self, cursor_factory=None):
+        return OutboxCursor(self)
+
+
+def test_refresh_accepts_naive_outbox_timestamps():
+    cache = DimensionCache(maxsize=10, ttl_seconds=60)
+    # created_at as read from a "timestamp without time zone" column.
+    conn = OutboxConnection(
+        datetime(2024, 1, 1, 12, tzinfo=timezone.utc),
+        [{"table_name": "vendors", "aggregate_id": "v1", "created_at": datetime(2024, 1, 1, 12, 5)}],
+    )
+    cache.refresh(conn)
+    cache.names(conn, "vendors", ["v1"])
+
+    cache.refresh(conn)
+
+    assert cache.invalidated == 1
+    assert cache._seen_at == datetime(2024, 1, 1, 12, 5, tzinfo=timezone.utc)
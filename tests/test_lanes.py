@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+from src.domain.models.events import OutboxEvent
+from src.workers import lanes
+from src.workers.lanes import LaneScheduler, lane_quotas
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def events_of(aggregate_type: str, count: int):
+    return [
+        OutboxEvent(
+            id=f"{aggregate_type}-{index}",
+            aggregate_type=aggregate_type,
+            table_name=aggregate_type,
+            op="INSERT",
+            aggregate_id=f"{aggregate_type}-{index}",
+            payload=None,
+            created_at=START + timedelta(seconds=index),
+        )
+        for index in range(count)
+    ]
+
+
+def test_quotas_are_weighted_and_add_up():
+    quotas = lane_quotas(10, {"audit_event": 1, "lineage_entity": 3})
+
+    assert quotas == {"lineage_entity": 8, "audit_event": 2}
+
+
+def test_every_lane_gets_at_least_one():
+    assert lane_quotas(2, {"a": 100, "b": 1, "c": 0}) == {"a": 1, "b": 1, "c": 1}
+
+
+def test_claim_offers_unused_share_to_full_lanes(monkeypatch):
+    pending = {"lineage_entity": events_of("lineage_entity", 20), "audit_event": events_of("audit_event", 1)}
+    requested = []
+
+    def claim_pending_events(conn, worker_id, limit, *args, aggregate_types, **kwargs):
+        requested.append((aggregate_types[0], limit))
+        queue = pending[aggregate_types[0]]
+        claimed, pending[aggregate_types[0]] = queue[:limit], queue[limit:]
+        return claimed
+
+    monkeypatch.setattr(lanes, "claim_pending_events", claim_pending_events)
+    scheduler = LaneScheduler({"lineage_entity": 1, "audit_event": 1})
+
+    claimed = scheduler.claim(None, "worker", batch_size=10, lease_seconds=60)
+
+    assert len(claimed) == 10
+    assert requested == [("lineage_entity", 5), ("audit_event", 5), ("lineage_entity", 4)]
+    assert claimed == sorted(claimed, key=lambda event: event.created_at)
+
+
+def test_partitions_respect_lane_concurrency():
+    scheduler = LaneScheduler({"lineage_entity": 1, "audit_event": 1}, concurrency={"lineage_entity": 1})
+
+    partitions = scheduler.partitions(events_of("lineage_entity", 8) + events_of("audit_event", 8) + events_of("other", 2), 4)
+
+    types = [{event.aggregate_type for event in partition} for partition in partitions]
+    assert all(len(partition_types) == 1 for partition_types in types)
+    assert [t for (t,) in types].count("lineage_entity") == 1
+    assert 1 < [t for (t,) in types].count("audit_event") <= 4
+    assert sum(len(partition) for partition in partitions) == 18
@@ -0,0 +1,29 @@
+import logging
+import threading
+
+from src.bench.fakes import FakePostgresPool
+from src.workers import leases
+from src.workers.leases import LeaseRenewer
+
+
+log = logging.getLogger("tests.leases")
+
+
+def test_renewer_stops_renewing_lost_leases(monkeypatch):
+    calls = []
+    renewed_twice = threading.Event()
+
+    def renew_leases(conn, worker_id, event_ids, lease_seconds):
+        calls.append(list(event_ids))
+        if len(calls) == 2:
+            renewed_twice.set()
+        # Another worker reclaimed e2 after its lease ran out.
+        return [event_id for event_id in event_ids if event_id != "e2"]
+
+    monkeypatch.setattr(leases, "renew_leases", renew_leases)
+
+    with LeaseRenewer(FakePostgresPool(None), "w1", ["e1", "e2", "e3"], lease_seconds=3, log=log) as renewer:
+        assert renewed_twice.wait(5)
+
+    assert calls[:2] == [["e1", "e2", "e3"], ["e1", "e3"]]
+    assert renewer.event_ids == ["e1", "e3"]
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+from src.bench.fakes import FakePostgresPool, RecordingNeo4jClient
+from src.bench.suite import bench_settings
+from src.domain.models.events import OutboxEvent
+from src.domain.services.coalescing import coalesce_events
+from src.pipelines.lineage_pipeline import LINEAGE_ROW_LIMIT, LineagePipeline, SyncedRuns
+
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+
+def event(entity_id: str, op: str, created_at: datetime = NOW) -> OutboxEvent:
+    return OutboxEvent(
+        id=f"{entity_id}:{op}",
+        aggregate_type="lineage_entity",
+        table_name="data_lineage",
+        op=op,
+        aggregate_id=entity_id,
+        payload=None,
+        created_at=created_at,
+    )
+
+
+def run(run_id: str, entity_id: str, processed_at: datetime) -> dict:
+    return {
+        "id": run_id,
+        "entity_id": entity_id,
+        "entity_type": "product",
+        "source_system": "erp",
+        "processed_at": processed_at,
+    }
+
+
+def pipeline() -> LineagePipeline:
+    return LineagePipeline(bench_settings(lineage_sync_mode="incremental"), pg_pool=None, neo4j=None)
+
+
+def synced(*run_ids, oldest=NOW) -> SyncedRuns:
+    return SyncedRuns(set(run_ids), oldest)
+
+
+def test_update_and_delete_events_are_rebuilt_even_if_already_linked():
+    lineage = pipeline()
+    events = [event("p1", "UPDATE"), event("p2", "INSERT"), event("p3", "DELETE")]
+    rebuild_ids = lineage._rebuild_ids(events)
+    linked = {"p1": synced("r1"), "p2": synced("r0"), "p3": synced("r3")}
+    # p1's corrected run is already linked; incremental mode alone would skip it.
+    full_rows = {"p1": [run("r1", "p1", NOW - timedelta(days=2))], "p3": [run("r3", "p3", NOW - timedelta(days=3))]}
+    new_rows = {"p2": [run("r2", "p2", NOW), run("r0", "p2", NOW - timedelta(days=1))]}
+
+    groups, failures = lineage._incremental_groups(events, rebuild_ids, linked, full_rows, new_rows)
+
+    assert rebuild_ids == {"p1", "p3"}
+    assert failures == []
+    by_cypher = {group.cypher: sorted(e.aggregate_id for e, _ in group.items) for group in groups}
+    assert by_cypher == {
+        lineage._bulk_upsert_cypher("Product"): ["p1", "p3"],
+        lineage._bulk_incremental_cypher("Product"): ["p2"],
+    }
+
+
+def test_linked_runs_are_skipped():
+    lineage = pipeline()
+    new_rows = {"p1": [run("r1", "p1", NOW)]}
+
+    groups, failures = lineage._incremental_groups([event("p1", "INSERT")], set(), {"p1": synced("r1")}, {}, new_rows)
+
+    assert groups == [] and failures == []
+
+
+def test_late_and_tied_runs_are_linked():
+    lineage = pipeline()
+    # r2 ties the newest linked run; r3 was backdated behind it.
+    new_rows = {"p1": [run("r1", "p1", NOW), run("r2", "p1", NOW), run("r3", "p1", NOW - timedelta(hours=1))]}
+
+    groups, _ = lineage._incremental_groups([event("p1", "INSERT")], set(), {"p1": synced("r1")}, {}, new_rows)
+
+    assert [[row["id"] for row in params["rows"]] for _, params in groups[0].items] == [["r2", "r3"]]
+
+
+def test_rows_are_loaded_from_the_oldest_run_of_full_windows_only():
+    lineage = pipeline()
+    window = [f"r{index}" for index in range(LINEAGE_ROW_LIMIT)]
+    full = {"p1": synced(*window, oldest=NOW - timedelta(days=2)), "p2": synced(*window, oldest=NOW)}
+
+    assert lineage._incremental_since(full, ["p1", "p2"]) == NOW - timedelta(days=2)
+    # p3 links fewer runs than the window holds, so an older row may still belong in it.
+    assert lineage._incremental_since({**full, "p3": synced("r9")}, ["p1", "p2", "p3"]) is None
+    assert lineage._incremental_since(full, ["p1", "p4"]) is None
+
+
+class LineageSource:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def lineage_rows(self, entity_id):
+        return [row for row in self.rows if row["entity_id"] == entity_id]
+
+
+def test_update_folded_into_a_later_insert_still_rebuilds():
+    # r1 was edited in place (UPDATE), then r2 was appended (INSERT); r1 is already linked.
+    source = LineageSource([run("r2", "p1", NOW), run("r1", "p1", NOW - timedelta(days=2))])
+    neo4j = RecordingNeo4jClient()
+    neo4j.respond(r"AS run_ids", lambda parameters: [{"entity_id": "p1", "run_ids": ["r1"], "oldest": NOW - timedelta(days=2)}])
+    rebuilt = []
+    neo4j.respond(r"DELETE old", lambda parameters: rebuilt.extend(parameters["rows"]) or [])
+    lineage = LineagePipeline(bench_settings(lineage_sync_mode="incremental"), FakePostgresPool(source), neo4j)
+
+    batch = coalesce_events([event("p1", "UPDATE"), event("p1", "INSERT", NOW + timedelta(seconds=1))])
+    failures = lineage.handle_batch(batch.events)
+
+    assert failures == []
+    assert [[row["id"] for row in entity["rows"]] for entity in rebuilt] == [["r2", "r1"]]
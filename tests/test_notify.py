@@ -0,0 +1,50 @@
+import logging
+
+from src.adapters.queue import notify
+from src.adapters.queue.notify import MISSED_WAKEUPS_WARNING, OutboxListener
+
+
+class SilentConnection:
+    """Connection whose LISTEN channel never receives a notification."""
+
+    closed = False
+
+    def __init__(self):
+        self.notifies = []
+
+
+def test_warns_once_when_events_arrive_without_notifications(monkeypatch, caplog):
+    listener = OutboxListener("postgresql://unused", "renamed_channel")
+    monkeypatch.setattr(listener, "_connect", SilentConnection)
+    monkeypatch.setattr(notify.select, "select", lambda r, w, x, timeout: ([], [], []))
+    monkeypatch.setattr(listener.log, "propagate", True)
+
+    with caplog.at_level(logging.WARNING, logger=listener.log.name):
+        for _ in range(MISSED_WAKEUPS_WARNING + 2):
+            assert listener.wait(0.01) is False
+            listener.saw_events()
+            # A busy claim straight after does not follow a wait, so it is not a miss.
+            listener.saw_events()
+
+    assert listener.missed == MISSED_WAKEUPS_WARNING + 2
+    warnings = [record for record in caplog.records if record.levelno == logging.WARNING]
+    assert len(warnings) == 1
+    assert warnings[0].channel == "renamed_channel"
+
+
+def test_no_warning_once_a_notification_was_heard(monkeypatch, caplog):
+    listener = OutboxListener("postgresql://unused", "outbox_events")
+    conn = SilentConnection()
+    conn.notifies.append("outbox")
+    monkeypatch.setattr(listener, "_connect", lambda: conn)
+    monkeypatch.setattr(notify.select, "select", lambda r, w, x, timeout: ([], [], []))
+    monkeypatch.setattr(listener.log, "propagate", True)
+
+    assert listener.wait(0.01) is True
+    with caplog.at_level(logging.WARNING, logger=listener.log.name):
+        for _ in range(MISSED_WAKEUPS_WARNING + 1):
+            listener.wait(0.01)
+            listener.saw_events()
+
+    assert listener.heard == 1
+    assert not [record for record in caplog.records if record.levelno == logging.WARNING]
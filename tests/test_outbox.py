@@ -0,0 +1,90 @@
+from typing import Optional
+
+import pytest
+
+from src.adapters.queue.outbox import _pending_filters, _retry_delay_sql, ack_events
+from src.bench.fakes import FakePostgresPool
+
+
+class StatementPool(FakePostgresPool):
+    """Keeps every statement sent; one containing ``fail_on`` raises instead."""
+
+    def __init__(self, fail_on: Optional[str] = None):
+        super().__init__(source=None)
+        self.fail_on = fail_on
+        self.statements = []
+
+    def round_trip(self, sql: str) -> None:
+        self.statements.append(" ".join(sql.split()))
+        if self.fail_on and self.fail_on in sql:
+            raise RuntimeError("connection lost")
+        super().round_trip(sql)
+
+
+def test_shard_filter_hashes_the_aggregate():
+    filters, params = _pending_filters(max_attempts=5, shard=(1, 4))
+
+    assert filters[-1] == "mod(hashtext(aggregate_id::text) & 2147483647, %s) = %s"
+    assert params == [5, 4, 1]
+
+
+def test_single_shard_adds_no_filter():
+    assert _pending_filters(shard=(0, 1)) == _pending_filters()
+
+
+def test_retry_delay_is_capped_exponential_with_jitter():
+    sql = _retry_delay_sql(5, 900, "o.attempts")
+
+    assert "LEAST(900.0, 5.0 * power(2, o.attempts))" in sql
+    assert "(0.5 + random() * 0.5)" in sql
+
+
+def test_pending_filters_skip_events_waiting_for_retry():
+    filters, params = _pending_filters(max_attempts=3)
+
+    assert "(next_attempt_at IS NULL OR next_attempt_at <= NOW())" in filters
+    assert "attempts < %s" in filters
+    assert params == [3]
+
+
+def test_ack_dead_letters_only_the_batch_failures():
+    pool = StatementPool()
+
+    with pool.connection() as conn:
+        ack_events(conn, ["e1"], [("e2", "boom")], worker_id="w1", max_attempts=3)
+
+    moved = [sql for sql in pool.statements if "INSERT INTO outbox_dead_letters" in sql]
+    assert len(moved) == 1 and "id = ANY(%s::uuid[])" in moved[0]
+    assert pool.counts["commit"] == 1
+
+
+def test_ack_flushes_a_batch_in_one_transaction():
+    pool = StatementPool()
+
+    with pool.connection() as conn:
+        ack_events(conn, ["e1", "e2", "e3"], [("e4", "boom"), ("e5", "boom")])
+
+    assert pool.counts["update"] == 2
+    assert pool.counts["commit"] == 1
+
+
+def test_ack_rolls_back_everything_if_the_flush_fails():
+    pool = StatementPool(fail_on="VALUES")
+
+    with pool.connection() as conn:
+        with pytest.raises(RuntimeError):
+            ack_events(conn, ["e1"], [("e2", "boom")])
+
+    assert pool.counts["commit"] == 0
+    assert pool.counts["rollback"] == 1
+
+
+def test_processed_ack_releases_the_claim():
+    pool = StatementPool()
+
+    with pool.connection() as conn:
+        ack_events(conn, ["e1"], [])
+
+    (processed,) = pool.statements
+    assert "claimed_by = NULL" in processed and "lease_expires_at = NULL" in processed
+    assert "WHERE id = ANY(%s::uuid[])" in processed
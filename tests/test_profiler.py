@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from src.bench.fakes import RecordingNeo4jClient
+from src.utils import profiler
+from src.utils.profiler import SlowOpProfiler
+
+
+@pytest.fixture
+def slow_ops(tmp_path):
+    path = str(tmp_path / "slow.jsonl")
+    installed = profiler.install(SlowOpProfiler(path, threshold_seconds=0.0, profile_rate=1.0))
+    try:
+        yield path
+    finally:
+        profiler.install(None)
+        for handler in installed._log.handlers:
+            handler.close()
+
+
+def recorded(path):
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle]
+
+
+def test_write_profile_is_rolled_back_never_committed():
+    neo4j = RecordingNeo4jClient()
+
+    neo4j.profile("MATCH (n:Product) SET n.hits = n.hits + 1", {})
+
+    assert neo4j.counts["rollbacks"] == 1
+    assert neo4j.counts["commits"] == 0
+
+
+def test_slow_write_is_profiled(slow_ops):
+    neo4j = RecordingNeo4jClient()
+
+    neo4j.write("MATCH (n:Product) SET n.hits = n.hits + 1", {})
+
+    assert "plan" in recorded(slow_ops)[0]
+    assert (neo4j.counts["rollbacks"], neo4j.counts["commits"]) == (1, 0)
+
+
+def test_failed_write_is_not_run_again_for_a_plan(slow_ops):
+    neo4j = RecordingNeo4jClient()
+
+    def violate(parameters):
+        raise RuntimeError("constraint violation")
+
+    neo4j.respond(r"CREATE", violate)
+    with pytest.raises(RuntimeError):
+        neo4j.write("CREATE (n:Product {id: $id})", {"id": "p1"})
+
+    entry = recorded(slow_ops)[0]
+    assert entry["timings"] == {"error": "RuntimeError"}
+    assert "plan" not in entry
+    assert neo4j.counts["statements"] == 1
@@ -0,0 +1,111 @@
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from src.bench.suite import bench_settings
+from src.domain.services.write_cache import WriteSuppressionCache, fingerprint
+from src.pipelines.batch_writes import WriteGroup, write_groups
+
+
+log = logging.getLogger("tests.write_cache")
+
+
+def entry(params):
+    return "Quality", params["entity_id"], params
+
+
+def items(*entity_ids):
+    return [(f"event-{entity_id}", {"entity_id": entity_id, "score": 1}) for entity_id in entity_ids]
+
+
+def test_fingerprint_ignores_key_order_and_stringifies_values():
+    when = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    assert fingerprint({"a": 1, "b": when}) == fingerprint({"b": when, "a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+
+
+def test_skip_unchanged_only_drops_identical_writes():
+    cache = WriteSuppressionCache(10)
+    cache.remember(*entry({"entity_id": "p1", "score": 1}))
+
+    kept = cache.skip_unchanged(items("p1", "p2") + [("event-p1b", {"entity_id": "p1", "score": 2})], entry)
+
+    assert [params["entity_id"] for _, params in kept] == ["p2", "p1"]
+    assert cache.suppressed == 1
+
+
+def test_record_written_skips_failed_rows():
+    cache = WriteSuppressionCache(10)
+    written = items("p1", "p2")
+
+    cache.record_written(written, [(1, RuntimeError("boom"))], entry)
+
+    assert cache.skip_unchanged(written, entry) == written[1:]
+
+
+def test_record_written_skips_rows_whose_match_found_nothing():
+    cache = WriteSuppressionCache(10)
+    written = items("p1", "p2")
+
+    cache.record_written(written, [], entry, matched={"p2"})
+
+    assert cache.skip_unchanged(written, entry) == written[:1]
+
+
+def test_invalidate_forgets_entry():
+    cache = WriteSuppressionCache(10)
+    written = items("p1")
+    cache.record_written(written, [], entry)
+
+    cache.invalidate("Quality", "p1")
+
+    assert cache.skip_unchanged(written, entry) == written
+
+
+def test_save_and_reload(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = WriteSuppressionCache(10, path)
+    written = items("p1")
+    cache.record_written(written, [], entry)
+    cache.save()
+
+    assert WriteSuppressionCache(10, path).skip_unchanged(written, entry) == []
+
+
+class MatchingNeo4j:
+    """Returns keys only for rows whose entity exists, like ``MATCH ... RETURN row.entity_id AS key``."""
+
+    def __init__(self, existing):
+        self.existing = set(existing)
+
+    @contextmanager
+    def session_scope(self):
+        yield
+
+    def write_rows(self, cypher, rows, batch_size=None, records=None):
+        records.extend({"key": row["entity_id"]} for row in rows if row["entity_id"] in self.existing)
+        return []
+
+
+def test_write_groups_does_not_remember_unmatched_entities():
+    cache = WriteSuppressionCache(10)
+    written = items("exists", "missing")
+    group = WriteGroup("UNWIND ...", written, "Wrote", cache=cache, cache_entry=entry, key_column="key")
+
+    failures = write_groups(MatchingNeo4j(["exists"]), None, [group], [], log)
+
+    assert failures == []
+    # The write for the missing entity must run again once the node exists.
+    assert cache.skip_unchanged(written, entry) == written[1:]
+
+
+def test_unsharded_workers_run_without_the_cache():
+    assert WriteSuppressionCache.from_settings(bench_settings(shard_count=1), log) is None
+
+
+def test_each_shard_gets_its_own_cache_file(tmp_path):
+    settings = bench_settings(shard_count=4, shard_index=2, write_cache_path=str(tmp_path / "cache.json"))
+
+    cache = WriteSuppressionCache.from_settings(settings, log)
+
+    assert cache.path == str(tmp_path / "cache.json.2")